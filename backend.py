@@ -1,24 +1,37 @@
 import os
 import re
+import gzip
+import hashlib
 import json
 import logging
+import contextvars
+import threading
 import time
-import requests
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, date
 from functools import wraps
 from io import StringIO
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import chain
+import httpx
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 from dotenv import load_dotenv
-from flask import Flask, redirect, url_for, request, jsonify, make_response
+from flask import Flask, Response, g, has_app_context, redirect, url_for, request, jsonify, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from supabase import create_client, Client
 from cachetools import TTLCache
 from redis_client import get_redis, redis_health_check, is_redis_enabled
 from cache import (
     cache_get_json, cache_set_json, cache_get_gzip_json, cache_set_gzip_json,
-    cache_get_str, cache_set_str, cache_delete, cache_delete_pattern
+    cache_get_str, cache_set_str, cache_delete, cache_delete_pattern,
+    cache_get_json_swr, cache_get_gzip_raw_swr,
+    set_cache_namespace, reset_cache_namespace,
+    cache_get_or_lock, cache_try_lock, cache_release_lock, cache_rebuild_timer,
+    cache_l1_observe_dump_date, cache_l1_stats, cache_codec_stats
 )
+import serialization
 
 # Import backend modules
 # Note: When running backend.py as a script, Python adds the current directory to sys.path
@@ -26,8 +39,22 @@ from cache import (
 try:
     from backend.config import Config
     from backend.auth import setup_auth, login_route_handler, logout_route_handler, me_route_handler, require_auth, optional_auth
-    from backend.rate_limit import setup_rate_limiter
+    from backend.rate_limit import PREWARM_ENVIRON_KEY, setup_rate_limiter
     from backend.cache_manager import SQLCacheManager, SupabaseCacheManager
+    from backend.sql_dump import DumpDownload, DumpUnchanged
+    from backend.dump_cache import DumpCache
+    from backend.ingest import BatchUpserter, IngestStats
+    from backend.delta import DumpDelta, diff_dumps
+    from backend.snapshot import VillageSnapshot, distinct, filter_rows, iter_filtered, materialize, scan
+    from backend.sql_convert import SQL_COLUMNS, parse_int, sql_rows_to_snapshot
+    from backend.snapshot_store import SnapshotStore
+    from backend.worlds import World, WorldRegistry, bind_world, current_world, unbind_world
+    from backend.scheduler import IngestScheduler
+    from backend.supabase_paging import fetch_keyset, fetch_sorted, iter_keyset
+    from backend.projections import ALLIANCES, ALLIANCE_TAGS, MARKERS, REGIONS, select_list
+    from backend.circuit_breaker import CircuitBreaker
+    from backend.single_flight import SingleFlight
+    from backend.village_query import VillageQuery, select_local
 except ImportError as e:
     # Fallback: try adding current directory to path if import fails
     import sys
@@ -37,8 +64,22 @@ except ImportError as e:
         sys.path.insert(0, parent_dir)
     from backend.config import Config
     from backend.auth import setup_auth, login_route_handler, logout_route_handler, me_route_handler, require_auth, optional_auth
-    from backend.rate_limit import setup_rate_limiter
+    from backend.rate_limit import PREWARM_ENVIRON_KEY, setup_rate_limiter
     from backend.cache_manager import SQLCacheManager, SupabaseCacheManager
+    from backend.sql_dump import DumpDownload, DumpUnchanged
+    from backend.dump_cache import DumpCache
+    from backend.ingest import BatchUpserter, IngestStats
+    from backend.delta import DumpDelta, diff_dumps
+    from backend.snapshot import VillageSnapshot, distinct, filter_rows, iter_filtered, materialize, scan
+    from backend.sql_convert import SQL_COLUMNS, parse_int, sql_rows_to_snapshot
+    from backend.snapshot_store import SnapshotStore
+    from backend.worlds import World, WorldRegistry, bind_world, current_world, unbind_world
+    from backend.scheduler import IngestScheduler
+    from backend.supabase_paging import fetch_keyset, fetch_sorted, iter_keyset
+    from backend.projections import ALLIANCES, ALLIANCE_TAGS, MARKERS, REGIONS, select_list
+    from backend.circuit_breaker import CircuitBreaker
+    from backend.single_flight import SingleFlight
+    from backend.village_query import VillageQuery, select_local
 
 # Load environment variables
 load_dotenv()
@@ -220,6 +261,79 @@ def paginated_response(items: List[Any], page: int, per_page: int, total: int) -
         'timestamp': datetime.utcnow().isoformat()
     }
 
+def gzip_json_response(body: bytes) -> Response:
+    """
+    Send a cached gzip-compressed JSON body without decoding it.
+    
+    Clients that accept gzip get the stored bytes as-is with
+    Content-Encoding: gzip; others get them decompressed, which still skips
+    json.loads and re-serialization.
+    
+    Args:
+        body: gzip-compressed JSON (cache_get_gzip_raw_swr())
+        
+    Returns:
+        application/json response
+    """
+    if request.accept_encodings["gzip"]:
+        response = make_response(body)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = make_response(gzip.decompress(body))
+    response.mimetype = "application/json"
+    response.vary.add("Accept-Encoding")
+    return response
+
+STREAM_FORMATS = ("ndjson", "json-stream")
+
+def stream_json_response(items: Iterator[Any], fmt: str) -> Response:
+    """
+    Stream items as NDJSON or as one chunked JSON array.
+    
+    Items are serialized one at a time and sent in chunks of about
+    STREAM_CHUNK_BYTES, so neither the item list nor the whole body is ever
+    held in memory. The iterator is consumed after the view returns, outside
+    the request context (see iter_marker_rows).
+    
+    Args:
+        items: JSON-serializable values, e.g. village dicts
+        fmt: "ndjson" (one JSON document per line, application/x-ndjson) or
+            "json-stream" (a JSON array, application/json)
+        
+    Returns:
+        Streamed response
+    """
+    ndjson = fmt == "ndjson"
+    default = app.json.default
+    limit = config.STREAM_CHUNK_BYTES
+
+    def generate() -> Iterator[bytes]:
+        buf: List[bytes] = [] if ndjson else [b"["]
+        size = 0
+        sep = b"\n" if ndjson else b","
+        first = True
+        for item in items:
+            body = serialization.dumps(item, default=default)
+            if ndjson:
+                buf.append(body)
+                buf.append(sep)
+            else:
+                if not first:
+                    buf.append(sep)
+                buf.append(body)
+            first = False
+            size += len(body) + 1
+            if size >= limit:
+                yield b"".join(buf)
+                buf, size = [], 0
+        if not ndjson:
+            buf.append(b"]")
+        if buf:
+            yield b"".join(buf)
+
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+    return Response(generate(), mimetype=mimetype)
+
 # -------------------- Caching -------------------- #
 class CacheManager:
     """
@@ -291,14 +405,43 @@ class CacheManager:
 supabase_cache = CacheManager(ttl=config.CACHE_TTL)
 sql_cache = CacheManager(ttl=config.SQL_CACHE_TTL)
 
-from urllib.parse import urlparse
+from urllib.parse import quote, urlparse
 import socket
 
 # -------------------- Logging -------------------- #
 # (Logging is already configured above, this section removed to avoid duplication) 
 # -------------------- Flask & CORS Setup (MUST be before any @app.route) -------------------- #
 # -------------------- Flask & CORS Setup -------------------- #
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by serialization (orjson or msgspec when installed).
+    
+    jsonify() output is compact UTF-8 with keys in insertion order, like the
+    bodies cache.py stores. Debug mode (indented output) and dumps() calls
+    with other json.dumps options go through the standard library.
+    """
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.keys() <= {"separators"} and kwargs.get("separators", (",", ":")) == (",", ":"):
+            return serialization.dumps(obj, default=self.default).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return serialization.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = serialization.dumps(obj, default=self.default) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = config.FLASK_SECRET
 app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(seconds=config.PERMANENT_SESSION_LIFETIME)
 app.config["DEBUG"] = config.DEBUG
@@ -309,7 +452,8 @@ CORS(app, resources={
         "origins": config.CORS_ORIGINS,
         "supports_credentials": True,
         "allow_headers": ["Content-Type", "Authorization"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        "expose_headers": ["X-Next-Cursor"]
     }
 })
 
@@ -350,12 +494,303 @@ logger.info("✅ Supabase client initialized")
 
 # -------------------- Supabase Cache -------------------- #
 CACHE_TTL = timedelta(hours=1)
-supabase_cache_manager = SupabaseCacheManager(CACHE_TTL)
 
 # -------------------- SQL Cache -------------------- #
 SQL_CACHE_TTL = timedelta(hours=24)
-# Initialize SQL cache manager (must be done before fetch_sql_data() is called)
-sql_cache_manager = SQLCacheManager(SQL_CACHE_TTL)
+# Parsed dump + ETag/Last-Modified on disk, so revalidation survives restarts
+# (keyed by dump URL, so one cache serves every world)
+sql_dump_cache = DumpCache(config.SQL_DUMP_CACHE_DIR)
+
+# -------------------- Worlds -------------------- #
+worlds = WorldRegistry.from_config(config)
+logger.info("Tracking %d world(s): %s (default %s)", len(worlds), ", ".join(worlds.keys()), worlds.default.key)
+
+@dataclass
+class WorldData:
+    """In-process caches of one world; worlds never share hot data."""
+    world: World
+    supabase_cache: SupabaseCacheManager
+    sql_cache: SQLCacheManager
+    # Binary village snapshots per dump_date, memory-mapped on startup so a
+    # restarted worker serves the last known dataset while it refreshes
+    snapshots: SnapshotStore
+    # Converted snapshot of the SQL fallback, keyed by the cached SQL rows it was built from
+    sql_snapshot: Dict[str, Any] = field(default_factory=lambda: {"rows": None, "snapshot": None})
+
+def _new_world_data(world: World) -> WorldData:
+    snapshot_dir = config.SNAPSHOT_DIR if world.default else os.path.join(config.SNAPSHOT_DIR, world.key)
+    return WorldData(
+        world=world,
+        supabase_cache=SupabaseCacheManager(CACHE_TTL),
+        sql_cache=SQLCacheManager(SQL_CACHE_TTL),
+        snapshots=SnapshotStore(snapshot_dir, keep=config.SNAPSHOT_KEEP),
+    )
+
+_world_data: Dict[str, WorldData] = {w.key: _new_world_data(w) for w in worlds}
+
+def world_data() -> WorldData:
+    """Caches of the world bound to the current request or thread."""
+    return _world_data[current_world(worlds).key]
+
+@contextmanager
+def world_context(world: World) -> Iterator[World]:
+    """Bind a world and its Redis key namespace for the duration of a block."""
+    world_token = bind_world(world)
+    ns_token = set_cache_namespace(world.cache_namespace)
+    try:
+        yield world
+    finally:
+        reset_cache_namespace(ns_token)
+        unbind_world(world_token)
+
+_refreshing: set = set()
+_refreshing_lock = threading.Lock()
+
+def _refresh_in_background(name: str, target) -> None:
+    """Run target in a daemon thread unless a refresh with the same name is already running."""
+    name = f"{current_world(worlds).key}:{name}"
+    with _refreshing_lock:
+        if name in _refreshing:
+            return
+        _refreshing.add(name)
+
+    # The thread inherits the caller's world and cache namespace
+    ctx = contextvars.copy_context()
+
+    def run():
+        try:
+            ctx.run(target)
+        except Exception as e:
+            logger.warning(f"Background refresh of {name} failed: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(name)
+
+    threading.Thread(target=run, name=f"refresh-{name}", daemon=True).start()
+
+def _warm_start() -> None:
+    """Restore the newest persisted snapshots of every world as stale cache entries."""
+    for data in _world_data.values():
+        loaded = data.snapshots.load_latest("supabase")
+        if loaded:
+            data.supabase_cache.set(loaded[1], fresh=False)
+            logger.info("Warm start [%s]: %d villages from Supabase snapshot %s",
+                        data.world.key, len(loaded[1]), loaded[0])
+        loaded = data.snapshots.load_latest("sql")
+        if loaded:
+            data.sql_snapshot["snapshot"] = loaded[1]
+            logger.info("Warm start [%s]: %d villages from SQL snapshot %s",
+                        data.world.key, len(loaded[1]), loaded[0])
+
+_warm_start()
+
+def _rpc_available() -> bool:
+    """True if the current world's data can be served by the Supabase RPCs."""
+    return current_world(worlds).has_rpcs and supabase_available()
+
+# PostgREST cannot reach the database (503/504)
+_OUTAGE_PGRST_CODES = frozenset({"PGRST000", "PGRST001", "PGRST002", "PGRST003"})
+# SQLSTATE classes for connection, resource, operator intervention (statement
+# timeout) and system errors, as opposed to errors in the query itself
+_OUTAGE_SQLSTATE_CLASSES = ("08", "53", "57", "58", "XX")
+
+def is_supabase_outage(error: BaseException) -> bool:
+    """
+    True if error means Supabase is down or overloaded: a connection error, a timeout or a 5xx.
+    
+    A request PostgREST rejected (4xx, bad filter or order syntax) says
+    nothing about Supabase's health and must not trip supabase_breaker.
+    """
+    if isinstance(error, (httpx.TransportError, OSError)):
+        return True
+    code = str(getattr(error, "code", None) or "")
+    if len(code) == 3 and code.isdigit():
+        return int(code) >= 500  # no JSON error body: code is the HTTP status
+    return code in _OUTAGE_PGRST_CODES or code[:2] in _OUTAGE_SQLSTATE_CLASSES
+
+def fetch_marker_rows(dump_date: str, region: Optional[str] = None,
+                      alliance_tag: Optional[str] = None,
+                      player_name: Optional[str] = None,
+                      columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Call rpc_marker_rows and page through its full result.
+    
+    PostgREST cuts RPC results at max-rows (1000), so the rows are requested
+    in keyset pages on village_id (see iter_keyset) instead of in one response.
+    
+    Args:
+        columns: Projection to select from the RPC result (None = every column)
+    
+    Returns:
+        All marker rows matching the filters
+    """
+    return fetch_keyset(_marker_rows_query(dump_date, region, alliance_tag, player_name, columns),
+                        page_size=config.SUPABASE_PAGE_SIZE,
+                        max_workers=config.SUPABASE_PAGE_WORKERS)
+
+def _marker_rows_query(dump_date: str, region: Optional[str] = None,
+                       alliance_tag: Optional[str] = None,
+                       player_name: Optional[str] = None,
+                       columns: Optional[Sequence[str]] = None) -> Callable[[Optional[str]], Any]:
+    """Query factory (see iter_keyset) for rpc_marker_rows with the given filters."""
+    params = {
+        "dump_date": dump_date,
+        "region_param": region or None,
+        "alliance_tag_param": alliance_tag or None,
+        "player_name_param": player_name or None,
+    }
+
+    def query(count: Optional[str] = None):
+        builder = supabase.rpc("rpc_marker_rows", params, count=count)
+        return builder.select(select_list(columns)) if columns else builder
+
+    return query
+
+def _marker_row_filters(region: str = "", alliance: str = "",
+                        player: str = "") -> List[Tuple[str, Callable[[Any], bool]]]:
+    """
+    Local (column, predicate) filters matching rpc_marker_rows' behavior.
+    
+    Comparisons ignore case and surrounding whitespace; region "none" and
+    alliance "natars" also match villages without a region or alliance.
+    """
+    filters: List[Tuple[str, Callable[[Any], bool]]] = []
+    if region:
+        filters.append((
+            "region",
+            lambda s: (s or "").strip().lower() == region.lower()
+            or (region.lower() == "none" and not (s or "").strip()),
+        ))
+    if alliance:
+        filters.append((
+            "alliance_tag",
+            lambda s: (s or "").strip().lower() == alliance.lower()
+            or (alliance.lower() == "natars" and not (s or "").strip()),
+        ))
+    if player:
+        filters.append(("player_name", lambda s: (s or "").strip().lower() == player.lower()))
+    return filters
+
+def iter_marker_rows(dump_date: str, region: str = "", alliance: str = "",
+                     player: str = "") -> Iterator[Dict[str, Any]]:
+    """
+    Marker rows as a lazy iterator, for streamed responses.
+    
+    The source is picked up front, in the caller's request and world context:
+    rpc_marker_rows is read one keyset page at a time (serially, so only one
+    page is held in memory), or the local snapshot is walked row by row if
+    the RPC is unavailable or its first page fails. The returned iterator
+    needs no request context, so it can be consumed while the response is
+    being sent. A Supabase error after the first page is re-raised: rows
+    have already gone out and the source can no longer change.
+    
+    Returns:
+        Iterator of village dicts with the common fields injected
+    """
+    if _rpc_available():
+        pages = iter_keyset(_marker_rows_query(dump_date, region, alliance, player),
+                            page_size=config.SUPABASE_PAGE_SIZE, max_workers=1)
+        try:
+            metrics.record_supabase_query()
+            first = next(pages, None)
+        except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
+            logger.warning("Supabase RPC failed for streamed marker rows: %s, falling back", e)
+        else:
+            return _stream_rpc_rows(chain([first], pages) if first is not None else iter(()))
+    rows = iter_filtered(get_all_villages(), _marker_row_filters(region, alliance, player))
+    return (_inject_row_fields(row) for row in rows)
+
+def _stream_rpc_rows(rows: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    count = 0
+    try:
+        for row in rows:
+            count += 1
+            yield _inject_row_fields(row)
+    except Exception as e:
+        supabase_breaker.record_failure(e)
+        note_degraded()
+        logger.error("Supabase RPC failed after streaming %d marker rows: %s", count, e)
+        raise
+
+def parse_village_query() -> VillageQuery:
+    """
+    Read limit, offset, cursor, fields and sort from the request.
+    
+    Raises:
+        APIError: If a parameter is invalid
+    """
+    try:
+        return VillageQuery.from_args(request.args, max_limit=config.VILLAGE_LIST_MAX_LIMIT)
+    except ValueError as e:
+        raise APIError(str(e), 400)
+
+def query_villages(dump_date: str, vq: VillageQuery, region: str = "", alliance: str = "",
+                   player: str = "") -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One window of the marker rows, sorted and projected as vq asks.
+    
+    With the RPCs available, filters, order, cursor seek, limit and
+    projection all run in Postgres (rpc_marker_rows via fetch_sorted), so
+    only the requested rows and columns are transferred. Otherwise the
+    local snapshot answers from its presorted index (select_local).
+    
+    Args:
+        dump_date: Dump to read
+        vq: Window, order and fields
+        region, alliance, player: Optional filters, as for /api/marker_rows
+        
+    Returns:
+        (rows with the common fields injected and then projected,
+        cursor for the next window or None at the end)
+    """
+    rows: Optional[List[Dict[str, Any]]] = None
+    if _rpc_available():
+        try:
+            metrics.record_supabase_query()
+            if vq.limit is None and not vq.offset and vq.after is None and not vq.sort:
+                # Every row in key order: the concurrent keyset scan
+                rows = fetch_marker_rows(dump_date, region, alliance, player, columns=vq.columns())
+            else:
+                rows = fetch_sorted(_marker_rows_query(dump_date, region, alliance, player, vq.columns()),
+                                    vq.order, after=vq.after, offset=vq.offset, limit=vq.limit,
+                                    page_size=config.SUPABASE_PAGE_SIZE)
+            more = vq.limit is not None and len(rows) == vq.limit
+        except Exception as e:
+            if is_supabase_outage(e):
+                supabase_breaker.record_failure(e)
+            note_degraded()
+            logger.warning("Supabase RPC failed for a village query: %s, falling back", e)
+            rows = None
+    if rows is None:
+        rows, more = select_local(get_all_villages(), _marker_row_filters(region, alliance, player), vq)
+    next_cursor = vq.cursor_after(rows[-1]) if more and rows else None
+    return [vq.project(_inject_row_fields(r)) for r in rows], next_cursor
+
+def village_window_response(payload: Any, next_cursor: Optional[str]) -> Response:
+    """JSON response for a query_villages() window; X-Next-Cursor carries the next cursor."""
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@app.before_request
+def _bind_request_world():
+    """Bind the world selected by ?world= (or the X-World header) to this request."""
+    key = request.args.get("world") or request.headers.get("X-World")
+    try:
+        world = worlds.get(key)
+    except KeyError:
+        return handle_api_error(APIError(f"Unknown world: {key}", 404, {"worlds": worlds.keys()}))
+    g.world_tokens = (bind_world(world), set_cache_namespace(world.cache_namespace))
+
+@app.teardown_request
+def _unbind_request_world(exc=None):
+    tokens = g.pop("world_tokens", None)
+    if tokens:
+        reset_cache_namespace(tokens[1])
+        unbind_world(tokens[0])
 
 # -------------------- Latest Dump Date Resolver -------------------- #
 def _rpc_scalar(resp, key: str):
@@ -382,18 +817,42 @@ def _rpc_scalar(resp, key: str):
 
 def get_latest_dump_date() -> str:
     """
-    Get the latest dump_date from Redis cache or Supabase RPC.
+    Get the latest dump_date of the current world from Redis cache or Supabase.
 
     Caches the result in Redis for 300 seconds to reduce Supabase calls.
     Falls back to today's date if Supabase is unreachable and cache is empty.
+    A new dump_date flushes the world's in-process cache tier.
     """
+    latest = _fetch_latest_dump_date()
+    cache_l1_observe_dump_date(latest)
+    return latest
+
+def _fetch_latest_dump_date() -> str:
     cached_date = cache_get_str("latest_dump_date")
     if cached_date:
         logger.debug(f"Latest dump_date from Redis cache: {cached_date}")
         return cached_date
 
+    world = current_world(worlds)
+    if not world.has_rpcs and supabase_available():
+        # Worlds with their own table have no RPCs: read the newest row directly
+        try:
+            resp = (supabase.table(world.table)
+                            .select("dump_date")
+                            .order("dump_date", desc=True)
+                            .limit(1)
+                            .execute())
+            if resp.data:
+                latest_str = str(resp.data[0]["dump_date"])
+                cache_set_str("latest_dump_date", latest_str, ttl=300)
+                return latest_str
+        except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
+            logger.warning(f"Failed to get latest dump_date for world {world.key}: {e}")
+
     # Query Supabase via RPC
-    if supabase_reachable(1.0):
+    if _rpc_available():
         try:
             resp = supabase.rpc("rpc_latest_dump_date", {}).execute()
 
@@ -407,16 +866,22 @@ def get_latest_dump_date() -> str:
             else:
                 logger.warning("rpc_latest_dump_date returned no value (NULL).")
         except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
             logger.warning(f"Failed to get latest dump_date from Supabase RPC: {e}")
 
     today = date.today().isoformat()
     logger.warning(f"Using fallback dump_date: {today}")
+    note_degraded()
     return today
 
 def supabase_reachable(timeout: float = 1.0) -> bool:
     """
     Quick TCP check so we don't block inside httpx when DNS or outbound
     connectivity is broken. Returns False in ~1s instead of hanging.
+    
+    This opens a connection, so request handlers use supabase_available()
+    instead; it is the background prober of supabase_breaker.
     """
     try:
         host = urlparse(config.SUPABASE_URL).hostname
@@ -427,28 +892,75 @@ def supabase_reachable(timeout: float = 1.0) -> bool:
     except Exception:
         return False
 
-def fetch_supabase_data() -> List[Dict[str,Any]]:
+supabase_breaker = CircuitBreaker(
+    "supabase",
+    probe=lambda: supabase_reachable(config.SUPABASE_PROBE_TIMEOUT),
+    failure_threshold=config.SUPABASE_BREAKER_THRESHOLD,
+    failure_window=config.SUPABASE_BREAKER_WINDOW,
+    reset_timeout=config.SUPABASE_BREAKER_RESET,
+    probe_interval=config.SUPABASE_PROBE_INTERVAL,
+)
+supabase_breaker.start()
+
+def supabase_available() -> bool:
+    """
+    True unless the Supabase circuit breaker is open (O(1), no network I/O).
+    
+    While it is open, callers go straight to their local fallback; the
+    background prober closes it again once Supabase answers.
+    """
+    if supabase_breaker.allow_request():
+        return True
+    note_degraded()
+    return False
+
+def note_degraded() -> None:
+    """
+    Mark the current response as built from a fallback rather than Supabase.
+    
+    Called wherever Supabase is skipped or failed and local data (or a
+    guessed dump_date) is used instead. conditional_on_dump_date() gives
+    such responses no ETag and no caching, so clients pick up the real
+    payload once Supabase is back.
+    """
+    if has_app_context():
+        g.degraded = True
+
+def fetch_supabase_data() -> Union[VillageSnapshot, List[Dict[str,Any]]]:
     """
     Fetch village data from Supabase with caching and pagination.
     
     Uses in-memory cache to avoid repeated database queries. Falls back gracefully
     if Supabase is unreachable. Implements pagination to handle large datasets.
+    Rows are held as a columnar VillageSnapshot rather than a list of dicts.
+    An expired (or restored-from-disk) snapshot is served while a background
+    thread reloads it.
     
     Returns:
-        List of village dictionaries, or empty list if fetch fails
+        VillageSnapshot of the latest dump, or empty list if fetch fails
     """
     # Check cache first
-    cached = supabase_cache_manager.get()
+    cache = world_data().supabase_cache
+    cached = cache.get()
     if cached:
         return cached
-
+    stale = cache.peek()
+    if stale:
+        _refresh_in_background("supabase", _load_supabase_snapshot)
+        return stale
+    return _load_supabase_snapshot()
+
+def _load_supabase_snapshot() -> Union[VillageSnapshot, List[Dict[str,Any]]]:
+    """Page the current world's latest dump_date out of Supabase into the cache and onto disk."""
+    data = world_data()
+    table = data.world.table
     # ⬇️ fast-fail: skip Supabase entirely if we can't reach it
-    if not supabase_reachable(1.0):
+    if not supabase_available():
         logger.warning("Supabase precheck failed; skipping remote fetch.")
         return []
 
     try:
-        resp = (supabase.table("villages")
+        resp = (supabase.table(table)
                         .select("dump_date")
                         .order("dump_date", desc=True)
                         .limit(1)
@@ -458,107 +970,130 @@ def fetch_supabase_data() -> List[Dict[str,Any]]:
             return []
 
         latest = dates[0]["dump_date"]
-        all_rows: List[Dict[str,Any]] = []
-        page_size, offset = 1000, 0
-        while True:
-            chunk = (supabase.table("villages")
-                            .select("*")
-                            .eq("dump_date", latest)
-                            .range(offset, offset+page_size-1)
-                            .execute()
-                            .data) or []
-            all_rows.extend(chunk)
-            if len(chunk) < page_size:
-                break
-            offset += page_size
-
-        supabase_cache_manager.set(all_rows)
-        logger.info("Fetched %d rows from Supabase for %s", len(all_rows), latest)
-        return all_rows
+
+        pages = iter_keyset(lambda count=None: (supabase.table(table)
+                                                       .select("*", count=count)
+                                                       .eq("dump_date", latest)),
+                            page_size=config.SUPABASE_PAGE_SIZE,
+                            max_workers=config.SUPABASE_PAGE_WORKERS)
+        # Keyset pages on (dump_date, village_id) are encoded into columns as they arrive
+        snapshot = VillageSnapshot.from_rows(pages)
+        data.supabase_cache.set(snapshot)
+        logger.info("Fetched %d rows from Supabase %s for %s (%.1f MiB columnar)",
+                    len(snapshot), table, latest, snapshot.nbytes / 2**20)
+        if snapshot:
+            data.snapshots.save("supabase", latest, snapshot)
+        return snapshot
     except Exception as e:
+        supabase_breaker.record_failure(e)
+        note_degraded()
         logger.error("Supabase fetch failed: %s", e)
         return []
 
 
 
 # -------------------- SQL Dump Setup -------------------- #
-# SQL_CACHE_TTL is already defined above with sql_cache_manager
-EXPECTED_COLS = 16
+# SQL_CACHE_TTL is already defined above; each world's SQLCacheManager lives in its WorldData
 
-def extract_value_groups(body: str) -> List[str]:
+def _load_revalidated_rows(url: str) -> Optional[List[List[Optional[str]]]]:
     """
-    Extract parenthesized value groups from SQL INSERT statement body.
+    Rows for a dump the server just answered 304 Not Modified for.
     
-    Handles nested parentheses and escaped quotes correctly.
+    Prefers the (expired) in-memory copy and falls back to the on-disk dump
+    cache. Returns None if neither is usable.
+    """
+    rows = world_data().sql_cache.peek()
+    if rows:
+        return rows
+    try:
+        return sql_dump_cache.load_rows(url)
+    except Exception as e:
+        logger.warning("Dump cache unreadable after 304 for %s: %s", url, e)
+        return None
+
+def iter_sql_data(strict: bool = False, parse_workers: int = 1,
+                  revalidate: bool = False,
+                  unless_hash: Optional[str] = None) -> Iterator[List[Optional[str]]]:
+    """
+    Yield parsed SQL dump rows, streaming them while the dump downloads.
     
-    Args:
-        body: SQL INSERT VALUES clause body
-        
-    Returns:
-        List of value group strings (with parentheses)
-    """
-    groups, depth, in_str, cur, i = [], 0, False, "", 0
-    while i < len(body):
-        c = body[i]
-        if in_str:
-            if c=="'" and i+1<len(body) and body[i+1]=="'":
-                cur += "''"; i += 2; continue
-            if c=="'":
-                in_str = False
-            cur += c; i += 1
-        else:
-            if c=="'":
-                in_str = True; cur += c; i += 1; continue
-            if c=="(":
-                if depth == 0: cur=""
-                depth += 1
-            if depth > 0:
-                cur += c
-            if c==")" and depth>0:
-                depth -= 1
-                if depth==0:
-                    groups.append(cur)
-            i += 1
-    return groups
-
-def parse_sql_row(inner: str) -> List[Optional[str]]:
-    """
-    Parse a single SQL row value group into a list of field values.
-    
-    Handles quoted strings, escaped quotes, NULL values, and boolean values.
+    Works on the dump of the world bound to the current context.
+    Serves the in-memory SQL cache when it is still valid. Otherwise the dump
+    is revalidated with a conditional GET against the on-disk dump cache: a
+    304 reuses the already-parsed rows, while a 200 is streamed and parsed
+    line by line. Rows are handed to the caller as soon as they are parsed and
+    the caches are only replaced once the whole dump has been read.
     
     Args:
-        inner: Value group string (without outer parentheses)
+        strict: Re-raise download errors instead of logging them and stopping
+        parse_workers: Parser processes for a fresh download (1 = serial,
+            0 = one per CPU). Request handlers keep the default so worker
+            processes are never forked from a threaded server.
+        revalidate: Ask the server even while the in-memory cache is valid
+            (a 304 still reuses the parsed rows)
+        unless_hash: SHA-256 of a dump the caller already has (e.g. the last
+            one ingested). If the server's dump is that one, confirmed by a
+            304 or by hashing a fresh download before it is parsed,
+            DumpUnchanged is raised before any row is loaded or parsed.
         
-    Returns:
-        List of parsed field values (strings, None for NULL, or "TRUE"/"FALSE")
-    """
-    fields, cur, in_str, i = [], "", False, 0
-    while i < len(inner):
-        c = inner[i]
-        if in_str:
-            if c=="'" and i+1<len(inner) and inner[i+1]=="'":
-                cur += "''"; i += 2; continue
-            if c=="'":
-                in_str=False
-            cur += c; i += 1
-        else:
-            if c=="'":
-                in_str = True; cur += c; i += 1; continue
-            if c==",":
-                fields.append(cur); cur=""; i += 1; continue
-            cur += c; i += 1
-    fields.append(cur)
-    norm: List[Optional[str]] = []
-    for f in fields:
-        s = f.strip()
-        if s.upper()=="NULL":
-            norm.append(None)
-        elif s.upper() in ("TRUE","FALSE"):
-            norm.append(s.upper())
-        else:
-            norm.append(s)
-    return norm
+    Yields:
+        Parsed SQL rows (each row is a list of field values)
+    
+    Raises:
+        DumpUnchanged: See unless_hash
+    """
+    # Check cache first
+    sql_cache = world_data().sql_cache
+    cached = sql_cache.get()
+    if cached and not revalidate:
+        yield from cached
+        return
+
+    url = current_world(worlds).sql_url
+    headers = sql_dump_cache.conditional_headers(url)
+    revalidated: Optional[List[List[Optional[str]]]] = None
+    count = 0
+    try:
+        with DumpDownload(url,
+                          timeout=config.SQL_DOWNLOAD_TIMEOUT,
+                          chunk_size=config.SQL_STREAM_CHUNK_SIZE,
+                          headers=headers) as download:
+            if download.not_modified:
+                if unless_hash and sql_dump_cache.content_hash(url) == unless_hash:
+                    sql_dump_cache.touch(url)
+                    raise DumpUnchanged(unless_hash)
+                revalidated = _load_revalidated_rows(url)
+            else:
+                if unless_hash and download.spool() == unless_hash:
+                    raise DumpUnchanged(unless_hash)
+                parsed = download.rows(workers=parse_workers,
+                                       chunk_lines=config.SQL_PARSE_CHUNK_LINES,
+                                       min_parallel_lines=config.SQL_PARSE_PARALLEL_MIN_LINES)
+                for row in sql_cache.fill(parsed):
+                    count += 1
+                    yield row
+                sql_dump_cache.save(url, sql_cache.peek(),
+                                    download.etag, download.last_modified, download.sha256)
+                logger.info("Parsed %d rows from SQL dump", count)
+                return
+    except DumpUnchanged:
+        raise
+    except Exception as e:
+        logger.error("Failed to download SQL dump after %d rows: %s", count, e)
+        if strict:
+            raise
+        return
+
+    if revalidated is None:
+        # 304 but nothing usable cached: forget the validators and fetch unconditionally
+        sql_dump_cache.invalidate(url)
+        yield from iter_sql_data(strict, parse_workers, revalidate, unless_hash)
+        return
+
+    sql_cache.set(revalidated)
+    sql_dump_cache.touch(url)
+    logger.info("SQL dump not modified; reusing %d parsed rows", len(revalidated))
+    yield from revalidated
 
 def fetch_sql_data() -> List[List[Optional[str]]]:
     """
@@ -570,123 +1105,18 @@ def fetch_sql_data() -> List[List[Optional[str]]]:
     Returns:
         List of parsed SQL rows (each row is a list of field values)
     """
-    # Ensure sql_cache_manager is initialized (defensive check)
-    if 'sql_cache_manager' not in globals():
-        logger.error("sql_cache_manager not initialized! This should not happen.")
-        raise RuntimeError("sql_cache_manager not initialized")
-    
     # Check cache first
-    cached = sql_cache_manager.get()
+    sql_cache = world_data().sql_cache
+    cached = sql_cache.get()
     if cached:
         return cached
 
-    try:
-        res = requests.get(config.SQL_FILE_URL, timeout=15)
-        res.raise_for_status()
-        text = res.text
-    except Exception as e:
-        logger.error("Failed to download SQL dump: %s", e)
-        # Return cached data if available, otherwise empty list
-        return sql_cache_manager.get()
-
-    rows: List[List[Optional[str]]] = []
-    for line in text.splitlines():
-        if not line.startswith("INSERT"):
-            continue
-        body = line.split("VALUES", 1)[1].rstrip(";\n")
-        for grp in extract_value_groups(body):
-            inner = grp[1:-1]
-            cols = parse_sql_row(inner)
-            if len(cols) != EXPECTED_COLS:
-                logger.warning("Skipping SQL row with %d cols (expected %d)", len(cols), EXPECTED_COLS)
-                continue
-            rows.append(cols)
-
-    sql_cache_manager.set(rows)
-    logger.info("Parsed %d rows from SQL dump", len(rows))
+    rows = list(iter_sql_data())
+    if not sql_cache.is_valid():
+        # Download failed part-way: never return a partial dump
+        return sql_cache.get()
     return rows
 
-# -------------------- SQL→Dict Conversion -------------------- #
-def strip_quotes(s: Optional[str]) -> Optional[str]:
-    """
-    Remove surrounding quotes from a string and handle escaped quotes.
-    
-    Args:
-        s: String that may be quoted
-        
-    Returns:
-        Unquoted string or original value if not quoted
-    """
-    if not s: return s
-    if s.startswith("'") and s.endswith("'"):
-        return s[1:-1].replace("''", "'")
-    return s
-
-def parse_int(v: Optional[str]) -> int:
-    """
-    Parse a string value to integer with safe fallback.
-    
-    Args:
-        v: String value to parse (may be None)
-        
-    Returns:
-        Parsed integer or 0 if parsing fails
-    """
-    try: return int(float(v)) if v is not None else 0
-    except: return 0
-
-def parse_bool(v: Optional[str]) -> bool:
-    """
-    Parse a string value to boolean.
-    
-    Handles "TRUE", "FALSE", "1", "0", and None values.
-    
-    Args:
-        v: String value to parse (may be None)
-        
-    Returns:
-        Boolean value (False for None or invalid values)
-    """
-    if v is None: return False
-    s = v.upper()
-    if s in ("1","0"): return bool(int(s))
-    return s == "TRUE"
-
-def sql_row_to_dict(r: List[Optional[str]]) -> Dict[str,Any]:
-    """
-    Convert a parsed SQL row to a dictionary with typed fields.
-    
-    Maps SQL dump columns to dictionary keys with appropriate type conversion.
-    Expected columns: field_id, x, y, tribe, village_id, village_name, player_id,
-    player_name, alliance_id, alliance_tag, population, region, capital, city,
-    harbor, victory_points (16 total).
-    
-    Args:
-        r: List of field values from parsed SQL row
-        
-    Returns:
-        Dictionary with village data
-    """
-    return {
-        "field_id":      parse_int(r[0]),
-        "x":             parse_int(r[1]),
-        "y":             parse_int(r[2]),
-        "tribe":         strip_quotes(r[3])  or "",
-        "village_id":    parse_int(r[4]),
-        "village_name":  strip_quotes(r[5])  or "",
-        "player_id":     parse_int(r[6]),
-        "player_name":   strip_quotes(r[7])  or "",
-        "alliance_id":   parse_int(r[8]),
-        "alliance_tag":  strip_quotes(r[9])  or "",
-        "population":    parse_int(r[10]),
-        "region":        strip_quotes(r[11]) or "",
-        "capital":       parse_bool(r[12]),
-        "city":          parse_bool(r[13]),
-        "harbor":        parse_bool(r[14]),
-        "victory_points":parse_int(r[15]),
-        "dump_date":     ""
-    }
-
 def paginate(items: List[Any], page: int = 1, per_page: int = None) -> Dict[str, Any]:
     """Paginate a list of items."""
     if per_page is None:
@@ -708,7 +1138,7 @@ def paginate(items: List[Any], page: int = 1, per_page: int = None) -> Dict[str,
     }
 
 # -------------------- Unified Data Getter -------------------- #
-def get_all_villages() -> List[Dict[str,Any]]:
+def get_all_villages() -> VillageSnapshot:
     """
     Get all villages from Supabase or SQL fallback.
     
@@ -716,9 +1146,9 @@ def get_all_villages() -> List[Dict[str,Any]]:
     is unavailable. Uses caching to minimize network requests.
     
     Returns:
-        List of village dictionaries
+        VillageSnapshot; indexing/iterating it yields village dictionaries,
+        filter_rows() and scan() give the cheaper columnar paths
     """
-    data: List[Dict[str,Any]] = []
     try:
         data = fetch_supabase_data()
         if data:
@@ -730,19 +1160,58 @@ def get_all_villages() -> List[Dict[str,Any]]:
         logger.warning(f"Supabase fetch failed: {e}")
 
     # ⬇️ strictly local fallback (no network):
-    cached_sql = sql_cache_manager.get()
-    if cached_sql:
-        rows = cached_sql
-        logger.info(f"Using cached SQL data: {len(rows)} rows")
-    else:
-        logger.info("Fetching SQL data (no cache available)")
-        rows = fetch_sql_data()  # has its own short timeout & cache
-        logger.info(f"Fetched {len(rows)} rows from SQL")
+    note_degraded()
+    return get_sql_villages()
+
+def get_sql_villages() -> VillageSnapshot:
+    """
+    Get the current world's SQL dump as a typed VillageSnapshot.
     
-    result = [sql_row_to_dict(r) for r in rows]
-    logger.info(f"Converted {len(result)} villages from SQL data")
+    The dump is converted once per parsed dump (column by column, see
+    sql_rows_to_snapshot) and reused until the SQL cache is replaced, so
+    repeated fallback requests do not re-convert the same rows.
+    
+    Returns:
+        VillageSnapshot of the dump (empty if it could not be loaded)
+    """
+    data = world_data()
+    cached_rows = data.sql_cache.get()
+    if cached_rows:
+        if data.sql_snapshot["rows"] is cached_rows:
+            return data.sql_snapshot["snapshot"]
+        logger.info("Using cached SQL data")
+    elif data.sql_snapshot["snapshot"] is not None:
+        # Serve the last converted dump (possibly restored from disk) while it reloads
+        _refresh_in_background("sql", _refresh_sql_snapshot)
+        return data.sql_snapshot["snapshot"]
+    else:
+        logger.info("Downloading SQL data (no cache available)")
+    return _convert_sql_rows(cached_rows or fetch_sql_data())
+
+def _convert_sql_rows(rows: List[List[Optional[str]]]) -> VillageSnapshot:
+    """Convert parsed SQL rows to a snapshot and remember it for this dump."""
+    start = time.perf_counter()
+    result = sql_rows_to_snapshot(rows or [])
+    logger.info("Converted %d villages from SQL data in %.3fs", len(result), time.perf_counter() - start)
+    _remember_sql_snapshot(result)
     return result
 
+def _remember_sql_snapshot(snapshot: VillageSnapshot) -> None:
+    """Keep (and persist) a snapshot built from a complete SQL dump."""
+    data = world_data()
+    rows = data.sql_cache.get()
+    if not rows or len(rows) != len(snapshot):
+        # The download failed part-way; do not keep a partial world
+        return
+    if data.sql_snapshot["rows"] is rows:
+        return
+    data.sql_snapshot["rows"], data.sql_snapshot["snapshot"] = rows, snapshot
+    data.snapshots.save("sql", date.today().isoformat(), snapshot)
+
+def _refresh_sql_snapshot() -> None:
+    """Reload the SQL dump and rebuild the converted snapshot."""
+    _convert_sql_rows(fetch_sql_data())
+
 # -------------------- Marker Rendering -------------------- #
 _TRIBE_MAP = {1:"Romans",2:"Teutons",3:"Gauls",4:"Nature",
               5:"Natars",6:"Egyptians",7:"Huns",8:"Spartans",9:"Vikings"}
@@ -788,7 +1257,7 @@ def convert_y(y:int)->int:
     """
     return -y
 
-def generate_svg_markers(rows:List[Dict[str,Any]])->Dict[str,Any]:
+def generate_svg_markers(rows:Sequence[Mapping[str,Any]])->Dict[str,Any]:
     """
     Generate SVG markers and filter checkboxes from village data.
     
@@ -796,14 +1265,14 @@ def generate_svg_markers(rows:List[Dict[str,Any]])->Dict[str,Any]:
     and generates filter checkboxes for alliances, regions, and tribes.
     
     Args:
-        rows: List of village dictionaries
+        rows: List of village dictionaries or a VillageSnapshot
         
     Returns:
         Dictionary with markers SVG, checkboxes HTML, and region statistics JSON
     """
     faction_colors, alliance_map, region_map, tribe_map = {},{}, {},{}
     color_idx, region_stats, markers = 0, {}, []
-    for r in rows:
+    for r in scan(rows, MARKERS):
         try:
             x = int(r["x"]); y = int(r["y"])
             alliance = r.get("alliance_tag","Natars") or "Natars"
@@ -898,16 +1367,21 @@ def _inject_common_fields(vs:List[Dict[str,Any]])->None:
         vs: List of village dictionaries to modify
     """
     for r in vs:
-        try:   r["coords"] = f"({int(r['x'])},{int(r['y'])})"
-        except: r["coords"] = "(0,0)"
-        r["village"]       = r.get("village_name","")
-        r["population"]    = int(r.get("population") or 0)
-        r["victoryPoints"] = int(r.get("victory_points") or 0)
-        r["alliance"]      = r.get("alliance_tag","")
-        r["player"]        = r.get("player_name","")
-        try:   tid = int(r.get("tribe") or 0)
-        except: tid = 0
-        r["tribe"]         = _TRIBE_MAP.get(tid,"Unknown")
+        _inject_row_fields(r)
+
+def _inject_row_fields(r:Dict[str,Any])->Dict[str,Any]:
+    """Inject the common computed fields into one village dictionary (in place) and return it."""
+    try:   r["coords"] = f"({int(r['x'])},{int(r['y'])})"
+    except: r["coords"] = "(0,0)"
+    r["village"]       = r.get("village_name","")
+    r["population"]    = int(r.get("population") or 0)
+    r["victoryPoints"] = int(r.get("victory_points") or 0)
+    r["alliance"]      = r.get("alliance_tag","")
+    r["player"]        = r.get("player_name","")
+    try:   tid = int(r.get("tribe") or 0)
+    except: tid = 0
+    r["tribe"]         = _TRIBE_MAP.get(tid,"Unknown")
+    return r
 
 # -------------------- Metrics Collection -------------------- #
 class MetricsCollector:
@@ -920,6 +1394,8 @@ class MetricsCollector:
         self.redis_hits = 0
         self.redis_misses = 0
         self.supabase_queries = 0
+        self.coalesced_requests = 0
+        self.not_modified_responses = 0
         
     def record_request(self, endpoint: str, duration: float, is_error: bool = False):
         """Record a request metric."""
@@ -945,6 +1421,14 @@ class MetricsCollector:
         """Record a Supabase query."""
         self.supabase_queries += 1
     
+    def record_coalesced(self):
+        """Record a request that shared another request's cache-miss regeneration."""
+        self.coalesced_requests += 1
+    
+    def record_not_modified(self):
+        """Record a conditional GET answered with 304 Not Modified."""
+        self.not_modified_responses += 1
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get aggregated statistics."""
         uptime = (datetime.utcnow() - self.start_time).total_seconds()
@@ -969,11 +1453,138 @@ class MetricsCollector:
                 'misses': self.redis_misses,
                 'hit_ratio': self.redis_hits / redis_total if redis_total > 0 else 0
             },
-            'supabase_queries': self.supabase_queries
+            'supabase_queries': self.supabase_queries,
+            'coalesced_requests': self.coalesced_requests,
+            'not_modified_responses': self.not_modified_responses
         }
 
 metrics = MetricsCollector()
 
+# -------------------- Cache-Miss Coalescing -------------------- #
+cache_miss_flights = SingleFlight("cache-miss")
+
+def coalesce(cache_key: str, build: Callable[[], Any],
+             read: Optional[Callable[[str], Any]] = None) -> Any:
+    """
+    Regenerate a missed cache entry once for all concurrent requests.
+    
+    The first request for cache_key runs build() (which also writes the
+    cache); requests for the same key that arrive meanwhile wait for it and
+    share its result instead of repeating the Supabase reads and rendering.
+    With read given, the rebuild is also coordinated across workers and
+    nodes through a Redis lock (cache_get_or_lock): only the lock holder
+    builds, the others wait for its result to land in Redis.
+    
+    Args:
+        cache_key: Redis key being regenerated (scoped to the current world)
+        build: Computes, caches and returns the value
+        read: Reader for cache_key (cache_get_json / cache_get_gzip_json);
+            None skips the cross-worker lock (e.g. for no_cache requests)
+        
+    Returns:
+        The value built by this request or by the one it waited on
+    """
+    def regenerate() -> Any:
+        if read is None:
+            with cache_rebuild_timer():
+                return build()
+        value, token = cache_get_or_lock(cache_key, read)
+        if value is not None:
+            return value
+        try:
+            with cache_rebuild_timer():
+                return build()
+        finally:
+            if token is not None:
+                cache_release_lock(cache_key, token)
+
+    value, shared = cache_miss_flights.do(f"{current_world(worlds).key}:{cache_key}", regenerate)
+    if shared:
+        metrics.record_coalesced()
+    return value
+
+def revalidate(cache_key: str, build: Callable[[], Any]) -> None:
+    """
+    Rebuild a stale cache entry in the background (stale-while-revalidate).
+    
+    Called when a cache_get_*_swr() hit is past its soft expiry, or picked
+    for early refresh, while the request itself returns the stale value.
+    At most one refresh per key runs in this process, and only the worker
+    that takes the key's Redis lock rebuilds it; the others keep serving
+    the stale value until the new one lands.
+    
+    Args:
+        cache_key: Redis key to refresh (scoped to the current world)
+        build: Computes, caches and returns the value
+    """
+    def refresh() -> None:
+        token = cache_try_lock(cache_key)
+        if token is None:
+            return  # another worker is already rebuilding it
+        try:
+            with cache_rebuild_timer():
+                build()
+        finally:
+            cache_release_lock(cache_key, token)
+
+    _refresh_in_background(f"swr:{cache_key}", refresh)
+
+# -------------------- Conditional GET -------------------- #
+def dump_etag() -> str:
+    """
+    Strong ETag for the current GET request of a dump-derived endpoint.
+    
+    The payload of these endpoints is fully determined by the world's latest
+    dump_date, the path and the query parameters, so their hash identifies
+    it without building it. The negotiated content coding is included
+    because gzip passthrough hits send different bytes to clients that do
+    not accept gzip; ETAG_VERSION lets a deploy that changes payloads
+    invalidate every ETag at once.
+    """
+    params = sorted((k, v) for k, v in request.args.items(multi=True) if k != "world")
+    coding = "gzip" if request.accept_encodings["gzip"] else "identity"
+    key = "\x1f".join([config.ETAG_VERSION, current_world(worlds).key, get_latest_dump_date(),
+                        request.path, repr(params), coding])
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+def _set_http_cache_headers(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = config.HTTP_CACHE_MAX_AGE
+    response.cache_control.must_revalidate = True
+    response.vary.update(("Accept-Encoding", "X-World"))
+    return response
+
+def conditional_on_dump_date(f):
+    """
+    Decorator adding ETag / If-None-Match (304) support to a read endpoint.
+    
+    A request whose If-None-Match matches the current dump_etag() gets a
+    304 before the view runs: no cache read, no Supabase query, no body.
+    200 responses carry the ETag and a short public Cache-Control, after
+    which browsers revalidate for a few hundred bytes instead of
+    downloading the payload again.
+    
+    A response built from a fallback (see note_degraded) is not the
+    payload the ETag stands for: it gets no ETag and Cache-Control:
+    no-store, and a fallback dump_date never answers 304.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != "GET":
+            return f(*args, **kwargs)
+        etag = dump_etag()
+        if not g.get("degraded") and request.if_none_match.contains_weak(etag):
+            metrics.record_not_modified()
+            return _set_http_cache_headers(Response(status=304), etag)
+        response = make_response(f(*args, **kwargs))
+        if g.get("degraded"):
+            response.cache_control.no_store = True
+        elif response.status_code == 200:
+            _set_http_cache_headers(response, etag)
+        return response
+    return decorated_function
+
 # -------------------- API Endpoints -------------------- #
 
 @app.route("/api/admin/cache/clear", methods=["POST"])
@@ -993,7 +1604,8 @@ def api_clear_cache():
     try:
         from cache import cache_delete_pattern
 
-        deleted = cache_delete_pattern("*")  # clears travistat:* via REDIS_PREFIX
+        with world_context(worlds.default):
+            deleted = cache_delete_pattern("*")  # clears travistat:* (every world) via REDIS_PREFIX
         cleared["redis"] = True
         cleared["redis_keys_deleted"] = deleted
     except Exception as e:
@@ -1001,14 +1613,17 @@ def api_clear_cache():
 
     # Clear in-memory SQL cache
     try:
-        sql_cache_manager.clear()
+        for data in _world_data.values():
+            data.sql_cache.clear()
+            data.sql_snapshot["rows"], data.sql_snapshot["snapshot"] = None, None
         cleared["sql_cache"] = True
     except Exception as e:
         logger.warning(f"SQL cache clear failed: {e}")
 
     # Clear in-memory Supabase cache
     try:
-        supabase_cache_manager.clear()
+        for data in _world_data.values():
+            data.supabase_cache.clear()
         cleared["supabase_cache"] = True
     except Exception as e:
         logger.warning(f"Supabase cache clear failed: {e}")
@@ -1032,6 +1647,20 @@ def api_ping():
     """
     return jsonify(success_response("pong", "API is running", 200)[0])
 
+@app.route("/api/worlds")
+@api_error_handler
+def api_worlds():
+    """
+    List the configured worlds; pass ?world=<key> to any endpoint to select one.
+    
+    Returns:
+        JSON response with world keys and the default world
+    """
+    return jsonify(success_response({
+        "worlds": worlds.keys(),
+        "default": worlds.default.key
+    }, "Worlds retrieved", 200)[0])
+
 @app.route("/api/health")
 @api_error_handler
 def health_check():
@@ -1047,7 +1676,12 @@ def health_check():
         'timestamp': datetime.utcnow().isoformat(),
         'services': {
             'api': 'ok',
-            'supabase': 'reachable' if supabase_reachable(1.0) else 'unreachable',
+            'supabase': 'reachable' if supabase_breaker.state == "closed" else 'unreachable',
+            'supabase_breaker': supabase_breaker.status(),
+            'cache_miss_coalescing': cache_miss_flights.stats(),
+            'cache_l1': cache_l1_stats(),
+            'cache_codecs': cache_codec_stats(),
+            'json_backend': serialization.BACKEND,
             'redis': redis_health,
             'cache': {
                 'in_memory': {
@@ -1059,6 +1693,8 @@ def health_check():
         },
         'metrics': metrics.get_stats()
     }
+    if ingest_scheduler is not None:
+        health_data['services']['scheduler'] = ingest_scheduler.status()
     return jsonify(health_data), 200
 
 # -------------------- Authentication Routes -------------------- #
@@ -1180,6 +1816,7 @@ def clear_cache():
 @app.route("/api/markers")
 @limiter.limit(config.RATE_LIMIT_STRICT)
 @api_error_handler
+@conditional_on_dump_date
 def api_markers():
     """
     Get map markers with optional filtering.
@@ -1223,146 +1860,153 @@ def api_markers():
 
     cache_key = ":".join(cache_key_parts)
 
-    # Try Redis cache first (unless bypassed)
-    if not bypass_cache:
-        cached_data = cache_get_gzip_json(cache_key)
-        if cached_data:
-            metrics.record_redis_hit()
-            logger.debug(f"Cache hit for markers: {cache_key}")
-            duration = time.time() - start_time
-            metrics.record_request("/api/markers", duration)
-            return jsonify(cached_data)
-
-    metrics.record_redis_miss()
-    logger.info(
-        f"Cache {'bypassed' if bypass_cache else 'miss'} for markers: {cache_key}, querying Supabase"
-    )
-
-    # Query Supabase with paging (NO 1000-cap)
-    villages: List[Dict[str, Any]] = []
-
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-
-            # IMPORTANT: avoid RPC here because you're seeing it cap at 1000.
-            # Use table paging so we always fetch the full dataset.
-            query = supabase.table("villages").select("*").eq("dump_date", dump_date)
-
-            # Apply server-side filters where possible (keeps payload smaller)
-            if region:
-                # Treat "None" specially (your fallback logic does this too)
-                if region.lower() == "none":
-                    # If your DB stores NULL/empty for "no region", you may need one of these approaches:
-                    # - eq("region", "") OR is_("region", "null") depending on your client.
-                    # Supabase-py supports .is_("col", "null") for SQL IS NULL.
-                    query = query.or_("region.is.null,region.eq.")
-                else:
-                    query = query.eq("region", region)
+    def build():
+        logger.info(
+            f"Cache {'bypassed' if bypass_cache else 'miss'} for markers: {cache_key}, querying Supabase"
+        )
 
-            if alliance:
-                lower_alliance = alliance.strip().lower()
-                if lower_alliance == "natars":
-                    # Natars = empty/NULL alliance_tag in your Python fallback convention
-                    query = query.or_("alliance_tag.is.null,alliance_tag.eq.")
-                else:
-                    query = query.eq("alliance_tag", alliance)
+        # Query Supabase with concurrent paging (NO 1000-cap)
+        villages: List[Dict[str, Any]] = []
 
-            if player:
-                query = query.eq("player_name", player)
-
-            # Page through results
-            page_size = 1000
-            offset = 0
-            while True:
-                chunk = query.range(offset, offset + page_size - 1).execute().data or []
-                villages.extend(chunk)
-                if len(chunk) < page_size:
-                    break
-                offset += page_size
-
-            logger.info(
-                f"Fetched {len(villages)} villages from Supabase TABLE paging for markers (dump_date={dump_date})"
-            )
+        if supabase_available():
+            try:
+                metrics.record_supabase_query()
+
+                table = current_world(worlds).table
+
+                def markers_query(count: Optional[str] = None):
+                    # A fresh builder per page: builders are mutable and pages run concurrently
+                    query = (supabase.table(table)
+                                     .select(select_list(MARKERS), count=count)
+                                     .eq("dump_date", dump_date))
+
+                    # Apply server-side filters where possible (keeps payload smaller)
+                    if region:
+                        # Treat "None" specially (your fallback logic does this too)
+                        if region.lower() == "none":
+                            # If your DB stores NULL/empty for "no region", you may need one of these approaches:
+                            # - eq("region", "") OR is_("region", "null") depending on your client.
+                            # Supabase-py supports .is_("col", "null") for SQL IS NULL.
+                            query = query.or_("region.is.null,region.eq.")
+                        else:
+                            query = query.eq("region", region)
+
+                    if alliance:
+                        lower_alliance = alliance.strip().lower()
+                        if lower_alliance == "natars":
+                            # Natars = empty/NULL alliance_tag in your Python fallback convention
+                            query = query.or_("alliance_tag.is.null,alliance_tag.eq.")
+                        else:
+                            query = query.eq("alliance_tag", alliance)
+
+                    if player:
+                        query = query.eq("player_name", player)
+                    return query
+
+                # Keyset pages on (dump_date, village_id), walked concurrently
+                villages = fetch_keyset(markers_query,
+                                        page_size=config.SUPABASE_PAGE_SIZE,
+                                        max_workers=config.SUPABASE_PAGE_WORKERS)
+
+                logger.info(
+                    f"Fetched {len(villages)} villages from Supabase TABLE paging for markers (dump_date={dump_date})"
+                )
 
-        except Exception as e:
-            logger.warning(
-                f"Supabase TABLE query failed for markers: {e}, falling back to get_all_villages()"
-            )
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(
+                    f"Supabase TABLE query failed for markers: {e}, falling back to get_all_villages()"
+                )
+                villages = get_all_villages()
+
+                # Apply filters in Python as fallback
+                if region:
+                    villages = filter_rows(
+                        villages, "region",
+                        lambda s: (s or "").strip().lower() == region.lower()
+                        or (region.lower() == "none" and not (s or "").strip()),
+                        columns=MARKERS,
+                    )
+                if alliance:
+                    villages = filter_rows(
+                        villages, "alliance_tag",
+                        lambda s: (s or "").strip().lower() == alliance.lower()
+                        or (alliance.lower() == "natars" and not (s or "").strip()),
+                        columns=MARKERS,
+                    )
+                if player:
+                    villages = filter_rows(
+                        villages, "player_name", lambda s: (s or "").strip().lower() == player.lower(),
+                        columns=MARKERS,
+                    )
+        else:
             villages = get_all_villages()
 
             # Apply filters in Python as fallback
             if region:
-                villages = [
-                    v
-                    for v in villages
-                    if (v.get("region") or "").strip().lower() == region.lower()
-                    or (region.lower() == "none" and not (v.get("region") or "").strip())
-                ]
+                villages = filter_rows(
+                    villages, "region",
+                    lambda s: (s or "").strip().lower() == region.lower()
+                    or (region.lower() == "none" and not (s or "").strip()),
+                    columns=MARKERS,
+                )
             if alliance:
-                villages = [
-                    v
-                    for v in villages
-                    if (v.get("alliance_tag") or "").strip().lower() == alliance.lower()
-                    or (alliance.lower() == "natars" and not (v.get("alliance_tag") or "").strip())
-                ]
+                villages = filter_rows(
+                    villages, "alliance_tag",
+                    lambda s: (s or "").strip().lower() == alliance.lower()
+                    or (alliance.lower() == "natars" and not (s or "").strip()),
+                    columns=MARKERS,
+                )
             if player:
-                villages = [
-                    v
-                    for v in villages
-                    if (v.get("player_name") or "").strip().lower() == player.lower()
-                ]
-    else:
-        villages = get_all_villages()
-
-        # Apply filters in Python as fallback
-        if region:
-            villages = [
-                v
-                for v in villages
-                if (v.get("region") or "").strip().lower() == region.lower()
-                or (region.lower() == "none" and not (v.get("region") or "").strip())
-            ]
-        if alliance:
-            villages = [
-                v
-                for v in villages
-                if (v.get("alliance_tag") or "").strip().lower() == alliance.lower()
-                or (alliance.lower() == "natars" and not (v.get("alliance_tag") or "").strip())
-            ]
-        if player:
-            villages = [
-                v
-                for v in villages
-                if (v.get("player_name") or "").strip().lower() == player.lower()
-            ]
-
-
-    logger.info(f"After filtering: {len(villages)} villages (dump_date={dump_date})")
-
-    # Generate markers data
-    markers_start = time.time()
-    logger.info("markers input villages=%d dump_date=%s", len(villages), dump_date)
-    markers_data = generate_svg_markers(villages)
-    markers_duration = time.time() - markers_start
-    logger.info(
-        f"Marker generation took {markers_duration:.2f}s for {len(villages)} villages"
-    )
+                villages = filter_rows(
+                    villages, "player_name", lambda s: (s or "").strip().lower() == player.lower(),
+                    columns=MARKERS,
+                )
 
-    # Cache the result (use gzip for large payloads)
-    # Only cache if not bypassed, so no_cache=1 truly forces regen without poisoning cache
-    if not bypass_cache:
-        cache_set_gzip_json(cache_key, markers_data, ttl=3600)
 
-    # Log if markers are empty
-    if not markers_data.get("markers"):
-        logger.warning(
-            f"Generated markers are empty. Input villages: {len(villages)} (dump_date={dump_date})"
+        logger.info(f"After filtering: {len(villages)} villages (dump_date={dump_date})")
+
+        # Generate markers data
+        markers_start = time.time()
+        logger.info("markers input villages=%d dump_date=%s", len(villages), dump_date)
+        markers_data = generate_svg_markers(villages)
+        markers_duration = time.time() - markers_start
+        logger.info(
+            f"Marker generation took {markers_duration:.2f}s for {len(villages)} villages"
         )
-        if villages:
-            logger.info(
-                f"Sample village keys: {list(villages[0].keys())}"
-            )
+
+        # Cache the result (use gzip for large payloads)
+        # Only cache if not bypassed, so no_cache=1 truly forces regen without poisoning cache
+        if not bypass_cache:
+            cache_set_gzip_json(cache_key, markers_data, ttl=3600)
+
+        # Log if markers are empty
+        if not markers_data.get("markers"):
+            logger.warning(
+                f"Generated markers are empty. Input villages: {len(villages)} (dump_date={dump_date})"
+            )
+            if villages:
+                logger.info(
+                    f"Sample village keys: {list(villages[0].keys())}"
+                )
+        return markers_data
+
+    # Try Redis cache (unless bypassed)
+    if not bypass_cache:
+        cached_body, refresh = cache_get_gzip_raw_swr(cache_key)
+        if cached_body is not None:
+            metrics.record_redis_hit()
+            if refresh:
+                revalidate(cache_key, build)
+            logger.debug(f"Cache hit for markers: {cache_key}")
+            duration = time.time() - start_time
+            metrics.record_request("/api/markers", duration)
+            return gzip_json_response(cached_body)
+
+    metrics.record_redis_miss()
+
+    markers_data = coalesce(cache_key, build, read=None if bypass_cache else cache_get_gzip_json)
 
     duration = time.time() - start_time
     metrics.record_request("/api/markers", duration)
@@ -1384,6 +2028,7 @@ def api_markers_latest():
 @app.route("/api/marker_rows")
 @limiter.limit(config.RATE_LIMIT_STRICT)
 @api_error_handler
+@conditional_on_dump_date
 def api_marker_rows():
     """
     Return the raw marker rows (villages) for the latest dump_date.
@@ -1394,6 +2039,12 @@ def api_marker_rows():
         alliance (optional)
         player (optional)
         no_cache=1 (optional): bypass Redis cache
+        format (optional): "ndjson" streams one village per line, "json-stream"
+            streams the same JSON array as the default; both skip the cache
+            and never hold the whole world in memory
+        limit, offset, cursor, fields, sort (optional): return one window of
+            the rows (see VillageQuery); the next window's cursor is sent in
+            the X-Next-Cursor header
     """
     start_time = time.time()
     dump_date = get_latest_dump_date()
@@ -1402,6 +2053,10 @@ def api_marker_rows():
     alliance = request.args.get("alliance", "").strip()
     player = request.args.get("player", "").strip()
     bypass_cache = request.args.get("no_cache", "0") == "1"
+    fmt = request.args.get("format", "json").strip().lower()
+    if fmt != "json" and fmt not in STREAM_FORMATS:
+        raise APIError(f"Unknown format: {fmt}", 400, {"formats": ["json", *STREAM_FORMATS]})
+    vq = parse_village_query()
 
     # Normalize/validate (same behavior as /api/markers)
     cache_key_parts = [f"marker_rows:{dump_date}"]
@@ -1420,75 +2075,70 @@ def api_marker_rows():
 
     cache_key = ":".join(cache_key_parts)
 
+    if vq.active:
+        # A window is a bounded, indexed read: no Redis entry per parameter combination
+        rows, next_cursor = query_villages(dump_date, vq, region, alliance, player)
+        metrics.record_request("/api/marker_rows", time.time() - start_time)
+        if fmt in STREAM_FORMATS:
+            response = stream_json_response(iter(rows), fmt)
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return response
+        return village_window_response(rows, next_cursor)
+
+    if fmt in STREAM_FORMATS:
+        rows = iter_marker_rows(dump_date, region, alliance, player)
+        metrics.record_request("/api/marker_rows", time.time() - start_time)
+        return stream_json_response(rows, fmt)
+
+    def build():
+        rows: List[Dict[str, Any]] = []
+
+        if _rpc_available():
+            try:
+                metrics.record_supabase_query()
+                rows = fetch_marker_rows(dump_date, region, alliance, player)
+                logger.info("Fetched %d marker rows from Supabase RPC (dump_date=%s)", len(rows), dump_date)
+
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning("Supabase RPC failed for /api/marker_rows: %s, falling back", e)
+                rows = get_all_villages()
+        else:
+            rows = get_all_villages()
+
+        # If we fell back to get_all_villages(), apply filters locally to match marker behavior
+        if rows:
+            for name, predicate in _marker_row_filters(region, alliance, player):
+                rows = filter_rows(rows, name, predicate)
+
+        # Ensure common fields exist (your code uses this elsewhere)
+        rows = materialize(rows)
+        try:
+            _inject_common_fields(rows)
+        except Exception:
+            pass
+
+        # Cache write (only if not bypassed)
+        if not bypass_cache:
+            cache_set_gzip_json(cache_key, rows, ttl=3600)
+        return rows
+
     # Cache read (gzip because it can be large)
     if not bypass_cache:
-        cached = cache_get_gzip_json(cache_key)
-        if cached is not None:
+        cached_body, refresh = cache_get_gzip_raw_swr(cache_key)
+        if cached_body is not None:
             metrics.record_redis_hit()
+            if refresh:
+                revalidate(cache_key, build)
             duration = time.time() - start_time
             metrics.record_request("/api/marker_rows", duration)
-            return jsonify(cached)
+            return gzip_json_response(cached_body)
 
     metrics.record_redis_miss()
 
-    rows: List[Dict[str, Any]] = []
-
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            resp = supabase.rpc(
-                "rpc_marker_rows",
-                {
-                    "dump_date": dump_date,
-                    "region_param": region if region else None,
-                    "alliance_tag_param": alliance if alliance else None,
-                    "player_name_param": player if player else None,
-                },
-            ).execute()
-            rows = resp.data or []
-            logger.info("Fetched %d marker rows from Supabase RPC (dump_date=%s)", len(rows), dump_date)
-            if len(rows) == 1000:
-                logger.warning(
-                    "rpc_marker_rows returned exactly 1000 rows (likely truncated). "
-                    "Falling back to get_all_villages() for complete row set."
-                )
-                rows = get_all_villages()
-
-        except Exception as e:
-            logger.warning("Supabase RPC failed for /api/marker_rows: %s, falling back", e)
-            rows = get_all_villages()
-    else:
-        rows = get_all_villages()
-
-    # If we fell back to get_all_villages(), apply filters locally to match marker behavior
-    if rows and (region or alliance or player):
-        if region:
-            rows = [
-                v for v in rows
-                if (v.get("region") or "").strip().lower() == region.lower()
-                or (region.lower() == "none" and not (v.get("region") or "").strip())
-            ]
-        if alliance:
-            rows = [
-                v for v in rows
-                if (v.get("alliance_tag") or "").strip().lower() == alliance.lower()
-                or (alliance.lower() == "natars" and not (v.get("alliance_tag") or "").strip())
-            ]
-        if player:
-            rows = [
-                v for v in rows
-                if (v.get("player_name") or "").strip().lower() == player.lower()
-            ]
-
-    # Ensure common fields exist (your code uses this elsewhere)
-    try:
-        _inject_common_fields(rows)
-    except Exception:
-        pass
-
-    # Cache write (only if not bypassed)
-    if not bypass_cache:
-        cache_set_gzip_json(cache_key, rows, ttl=3600)
+    rows = coalesce(cache_key, build, read=None if bypass_cache else cache_get_gzip_json)
 
     duration = time.time() - start_time
     metrics.record_request("/api/marker_rows", duration)
@@ -1521,6 +2171,7 @@ def api_villages_latest():
 
 @app.route("/api/region", methods=["GET"])
 @api_error_handler
+@conditional_on_dump_date
 def api_region_list():
     """
     Return a sorted list of every region present in the latest dataset.
@@ -1532,49 +2183,57 @@ def api_region_list():
     dump_date = get_latest_dump_date()
     cache_key = f"regions:{dump_date}"
     
-    # Try Redis cache first
-    cached_regions = cache_get_json(cache_key)
-    if cached_regions:
-        metrics.record_redis_hit()
-        duration = time.time() - start_time
-        metrics.record_request('/api/region', duration)
-        return jsonify(cached_regions)
-    
-    metrics.record_redis_miss()
-    
-    # Query Supabase with RPC
-    regions: List[str] = []
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            resp = supabase.rpc("rpc_region_list", {"dump_date": dump_date}).execute()
-            regions = [r.get("region") or r for r in (resp.data or [])]
-            logger.info(f"Fetched {len(regions)} regions from Supabase RPC")
-        except Exception as e:
-            logger.warning(f"Supabase RPC failed for regions: {e}, falling back")
+    def build():
+        # Query Supabase with RPC
+        regions: List[str] = []
+        if _rpc_available():
+            try:
+                metrics.record_supabase_query()
+                resp = supabase.rpc("rpc_region_list", {"dump_date": dump_date}).execute()
+                regions = [r.get("region") or r for r in (resp.data or [])]
+                logger.info(f"Fetched {len(regions)} regions from Supabase RPC")
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(f"Supabase RPC failed for regions: {e}, falling back")
+                # Fallback: get all villages and extract regions
+                villages = get_all_villages()
+                seen = set()
+                for reg in distinct(villages, *REGIONS):
+                    reg = (reg or "").strip()
+                    if reg == "":
+                        reg = "None"
+                    seen.add(reg)
+                regions = sorted(seen)
+        else:
             # Fallback: get all villages and extract regions
             villages = get_all_villages()
             seen = set()
-            for v in villages:
-                reg = (v.get("region") or "").strip()
+            for reg in distinct(villages, *REGIONS):
+                reg = (reg or "").strip()
                 if reg == "":
                     reg = "None"
                 seen.add(reg)
             regions = sorted(seen)
-    else:
-        # Fallback: get all villages and extract regions
-        villages = get_all_villages()
-        seen = set()
-        for v in villages:
-            reg = (v.get("region") or "").strip()
-            if reg == "":
-                reg = "None"
-            seen.add(reg)
-        regions = sorted(seen)
-    
-    # Cache the result
-    cache_set_json(cache_key, regions, ttl=3600)
-    
+
+        # Cache the result
+        cache_set_json(cache_key, regions, ttl=3600)
+        return regions
+
+    # Try Redis cache
+    cached_regions, refresh = cache_get_json_swr(cache_key)
+    if cached_regions:
+        metrics.record_redis_hit()
+        if refresh:
+            revalidate(cache_key, build)
+        duration = time.time() - start_time
+        metrics.record_request('/api/region', duration)
+        return jsonify(cached_regions)
+
+    metrics.record_redis_miss()
+
+    regions = coalesce(cache_key, build, read=cache_get_json)
+
     duration = time.time() - start_time
     metrics.record_request('/api/region', duration)
     return jsonify(regions)
@@ -1582,6 +2241,7 @@ def api_region_list():
 # ——— List all alliance tags (simple array) ———
 @app.route("/api/alliance")
 @api_error_handler
+@conditional_on_dump_date
 def api_alliance_tags():
     """
     Return a simple list of all alliance tags (strings).
@@ -1596,49 +2256,57 @@ def api_alliance_tags():
     dump_date = get_latest_dump_date()
     cache_key = f"alliance_tags:{dump_date}"
     
-    # Try Redis cache first
-    cached_tags = cache_get_json(cache_key)
-    if cached_tags:
-        metrics.record_redis_hit()
-        duration = time.time() - start_time
-        metrics.record_request('/api/alliance', duration)
-        return jsonify(cached_tags)
-    
-    metrics.record_redis_miss()
-    
-    # Query Supabase with RPC
-    sorted_tags: List[str] = []
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            resp = supabase.rpc("rpc_alliance_tag_list", {"dump_date": dump_date}).execute()
-            sorted_tags = [t.get("alliance_tag") or t for t in (resp.data or [])]
-            logger.info(f"Fetched {len(sorted_tags)} alliance tags from Supabase RPC")
-        except Exception as e:
-            logger.warning(f"Supabase RPC failed for alliance tags: {e}, falling back")
+    def build():
+        # Query Supabase with RPC
+        sorted_tags: List[str] = []
+        if _rpc_available():
+            try:
+                metrics.record_supabase_query()
+                resp = supabase.rpc("rpc_alliance_tag_list", {"dump_date": dump_date}).execute()
+                sorted_tags = [t.get("alliance_tag") or t for t in (resp.data or [])]
+                logger.info(f"Fetched {len(sorted_tags)} alliance tags from Supabase RPC")
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(f"Supabase RPC failed for alliance tags: {e}, falling back")
+                # Fallback: get all villages and extract alliance tags
+                villages = get_all_villages()
+                alliance_tags = set()
+                for alliance_tag in distinct(villages, *ALLIANCE_TAGS):
+                    alliance_tag = (alliance_tag or '').strip()
+                    if not alliance_tag:
+                        alliance_tag = "Natars"
+                    alliance_tags.add(alliance_tag)
+                sorted_tags = sorted(alliance_tags)
+        else:
             # Fallback: get all villages and extract alliance tags
             villages = get_all_villages()
             alliance_tags = set()
-            for village in villages:
-                alliance_tag = (village.get('alliance_tag') or '').strip()
+            for alliance_tag in distinct(villages, *ALLIANCE_TAGS):
+                alliance_tag = (alliance_tag or '').strip()
                 if not alliance_tag:
                     alliance_tag = "Natars"
                 alliance_tags.add(alliance_tag)
             sorted_tags = sorted(alliance_tags)
-    else:
-        # Fallback: get all villages and extract alliance tags
-        villages = get_all_villages()
-        alliance_tags = set()
-        for village in villages:
-            alliance_tag = (village.get('alliance_tag') or '').strip()
-            if not alliance_tag:
-                alliance_tag = "Natars"
-            alliance_tags.add(alliance_tag)
-        sorted_tags = sorted(alliance_tags)
-    
-    # Cache the result
-    cache_set_json(cache_key, sorted_tags, ttl=3600)
-    
+
+        # Cache the result
+        cache_set_json(cache_key, sorted_tags, ttl=3600)
+        return sorted_tags
+
+    # Try Redis cache
+    cached_tags, refresh = cache_get_json_swr(cache_key)
+    if cached_tags:
+        metrics.record_redis_hit()
+        if refresh:
+            revalidate(cache_key, build)
+        duration = time.time() - start_time
+        metrics.record_request('/api/alliance', duration)
+        return jsonify(cached_tags)
+
+    metrics.record_redis_miss()
+
+    sorted_tags = coalesce(cache_key, build, read=cache_get_json)
+
     duration = time.time() - start_time
     metrics.record_request('/api/alliance', duration)
     return jsonify(sorted_tags)
@@ -1646,92 +2314,99 @@ def api_alliance_tags():
 # ——— List all alliances ———
 @app.route("/api/alliances")
 @api_error_handler
+@conditional_on_dump_date
 def api_alliance_list():
     """Return a list of all alliances with their member counts."""
     start_time = time.time()
     dump_date = get_latest_dump_date()
     cache_key = f"alliances:{dump_date}"
     
-    # Try Redis cache first
-    cached_data = cache_get_json(cache_key)
+    def build():
+        # Query Supabase
+        villages: List[Dict[str, Any]] = []
+        if supabase_available():
+            try:
+                metrics.record_supabase_query()
+                table = current_world(worlds).table
+                villages = fetch_keyset(lambda count=None: (supabase.table(table)
+                                                               .select(select_list(ALLIANCES), count=count)
+                                                               .eq("dump_date", dump_date)),
+                                        page_size=config.SUPABASE_PAGE_SIZE,
+                                        max_workers=config.SUPABASE_PAGE_WORKERS)
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(f"Supabase query failed for alliances: {e}, falling back")
+                villages = get_all_villages()
+        else:
+            villages = get_all_villages()
+
+        alliances = {}
+
+        for village in scan(villages, ALLIANCES):
+            # Normalize alliance_tag: empty/None becomes "Natars" (consistent with other endpoints)
+            alliance_tag = (village.get('alliance_tag') or '').strip()
+            if not alliance_tag:
+                alliance_tag = "Natars"
+
+            # Initialize alliance if not seen before
+            if alliance_tag not in alliances:
+                alliances[alliance_tag] = {
+                    'tag': alliance_tag,
+                    'name': village.get('alliance_name', alliance_tag),  # Use tag as name if no name available
+                    'member_count': 0,
+                    'village_count': 0,
+                    'total_population': 0
+                }
+
+            # Update counts
+            alliances[alliance_tag]['village_count'] += 1
+            alliances[alliance_tag]['total_population'] += int(village.get('population', 0))
+
+        # Count unique players per alliance
+        players_by_alliance = {}
+        for village in scan(villages, ALLIANCES):
+            alliance_tag = (village.get('alliance_tag') or '').strip()
+            if not alliance_tag:
+                alliance_tag = "Natars"
+            player_id = village.get('player_id')
+
+            if player_id:
+                if alliance_tag not in players_by_alliance:
+                    players_by_alliance[alliance_tag] = set()
+                players_by_alliance[alliance_tag].add(player_id)
+
+        # Update member counts
+        for alliance_tag, players in players_by_alliance.items():
+            if alliance_tag in alliances:
+                alliances[alliance_tag]['member_count'] = len(players)
+
+        # Sort alliances by total population (descending)
+        sorted_alliances = sorted(alliances.values(), key=lambda a: a['total_population'], reverse=True)
+
+        result = {
+            'alliances': sorted_alliances,
+            'total': len(alliances)
+        }
+
+        # Cache the result
+        cache_set_json(cache_key, result, ttl=3600)
+        return result
+
+    # Try Redis cache
+    cached_data, refresh = cache_get_json_swr(cache_key)
     if cached_data:
         metrics.record_redis_hit()
+        if refresh:
+            revalidate(cache_key, build)
         duration = time.time() - start_time
         metrics.record_request('/api/alliances', duration)
         return jsonify(cached_data)
-    
+
     metrics.record_redis_miss()
-    
-    # Query Supabase
-    villages: List[Dict[str, Any]] = []
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            query = supabase.table("villages").select("*").eq("dump_date", dump_date)
-            page_size, offset = 1000, 0
-            while True:
-                chunk = query.range(offset, offset + page_size - 1).execute().data or []
-                villages.extend(chunk)
-                if len(chunk) < page_size:
-                    break
-                offset += page_size
-        except Exception as e:
-            logger.warning(f"Supabase query failed for alliances: {e}, falling back")
-            villages = get_all_villages()
-    else:
-        villages = get_all_villages()
-    
-    alliances = {}
-    
-    for village in villages:
-        # Normalize alliance_tag: empty/None becomes "Natars" (consistent with other endpoints)
-        alliance_tag = (village.get('alliance_tag') or '').strip()
-        if not alliance_tag:
-            alliance_tag = "Natars"
-        
-        # Initialize alliance if not seen before
-        if alliance_tag not in alliances:
-            alliances[alliance_tag] = {
-                'tag': alliance_tag,
-                'name': village.get('alliance_name', alliance_tag),  # Use tag as name if no name available
-                'member_count': 0,
-                'village_count': 0,
-                'total_population': 0
-            }
-        
-        # Update counts
-        alliances[alliance_tag]['village_count'] += 1
-        alliances[alliance_tag]['total_population'] += int(village.get('population', 0))
-    
-    # Count unique players per alliance
-    players_by_alliance = {}
-    for village in villages:
-        alliance_tag = (village.get('alliance_tag') or '').strip()
-        if not alliance_tag:
-            alliance_tag = "Natars"
-        player_id = village.get('player_id')
-        
-        if player_id:
-            if alliance_tag not in players_by_alliance:
-                players_by_alliance[alliance_tag] = set()
-            players_by_alliance[alliance_tag].add(player_id)
-    
-    # Update member counts
-    for alliance_tag, players in players_by_alliance.items():
-        if alliance_tag in alliances:
-            alliances[alliance_tag]['member_count'] = len(players)
-    
-    # Sort alliances by total population (descending)
-    sorted_alliances = sorted(alliances.values(), key=lambda a: a['total_population'], reverse=True)
-    
-    result = {
-        'alliances': sorted_alliances,
-        'total': len(alliances)
-    }
-    
-    # Cache the result
-    cache_set_json(cache_key, result, ttl=3600)
-    
+
+    result = coalesce(cache_key, build, read=cache_get_json)
+
     duration = time.time() - start_time
     metrics.record_request('/api/alliances', duration)
     
@@ -1739,6 +2414,7 @@ def api_alliance_list():
 
 @app.route("/api/region/<region_name>/map")
 @api_error_handler
+@conditional_on_dump_date
 def api_region_map(region_name):
     """
     Get map markers for a specific region.
@@ -1754,59 +2430,62 @@ def api_region_map(region_name):
     dump_date = get_latest_dump_date()
     cache_key = f"region_map:{dump_date}:{region_name}"
     
-    # Try Redis cache first
-    cached_data = cache_get_gzip_json(cache_key)
-    if cached_data:
-        metrics.record_redis_hit()
-        duration = time.time() - start_time
-        metrics.record_request('/api/region/<region_name>/map', duration)
-        return jsonify(cached_data)
-    
-    metrics.record_redis_miss()
-    
-    # Query Supabase with RPC
-    rows: List[Dict[str, Any]] = []
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            resp = supabase.rpc("rpc_marker_rows", {
-                "dump_date": dump_date,
-                "region_param": region_name,
-                "alliance_tag_param": None,
-                "player_name_param": None
-            }).execute()
-            rows = resp.data or []
-            logger.info(f"Fetched {len(rows)} villages from Supabase RPC for region map")
-        except Exception as e:
-            logger.warning(f"Supabase RPC failed for region map: {e}, falling back")
+    def build():
+        # Query Supabase with RPC
+        rows: List[Dict[str, Any]] = []
+        if _rpc_available():
+            try:
+                metrics.record_supabase_query()
+                rows = fetch_marker_rows(dump_date, region=region_name, columns=MARKERS)
+                logger.info(f"Fetched {len(rows)} villages from Supabase RPC for region map")
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(f"Supabase RPC failed for region map: {e}, falling back")
+                rows = get_all_villages()
+                # Handle "None" region specially - match empty/whitespace regions
+                if region_name.lower() == "none":
+                    rows = filter_rows(rows, "region", lambda s: not (s or "").strip(), columns=MARKERS)
+                else:
+                    rows = filter_rows(rows, "region", lambda s: (s or "").strip().lower() == region_name.lower(), columns=MARKERS)
+        else:
             rows = get_all_villages()
             # Handle "None" region specially - match empty/whitespace regions
             if region_name.lower() == "none":
-                rows = [r for r in rows if not (r.get("region") or "").strip()]
+                rows = filter_rows(rows, "region", lambda s: not (s or "").strip(), columns=MARKERS)
             else:
-                rows = [r for r in rows if (r.get("region") or "").strip().lower() == region_name.lower()]
-    else:
-        rows = get_all_villages()
-        # Handle "None" region specially - match empty/whitespace regions
-        if region_name.lower() == "none":
-            rows = [r for r in rows if not (r.get("region") or "").strip()]
-        else:
-            rows = [r for r in rows if (r.get("region") or "").strip().lower() == region_name.lower()]
-    
-    if not rows:
-        raise APIError(f"No data found for region: {region_name}", 404)
-    
-    markers_data = generate_svg_markers(rows)
-    
-    # Cache the result
-    cache_set_gzip_json(cache_key, markers_data, ttl=3600)
-    
+                rows = filter_rows(rows, "region", lambda s: (s or "").strip().lower() == region_name.lower(), columns=MARKERS)
+
+        if not rows:
+            raise APIError(f"No data found for region: {region_name}", 404)
+
+        markers_data = generate_svg_markers(rows)
+
+        # Cache the result
+        cache_set_gzip_json(cache_key, markers_data, ttl=3600)
+        return markers_data
+
+    # Try Redis cache
+    cached_body, refresh = cache_get_gzip_raw_swr(cache_key)
+    if cached_body is not None:
+        metrics.record_redis_hit()
+        if refresh:
+            revalidate(cache_key, build)
+        duration = time.time() - start_time
+        metrics.record_request('/api/region/<region_name>/map', duration)
+        return gzip_json_response(cached_body)
+
+    metrics.record_redis_miss()
+
+    markers_data = coalesce(cache_key, build, read=cache_get_gzip_json)
+
     duration = time.time() - start_time
     metrics.record_request('/api/region/<region_name>/map', duration)
     return jsonify(markers_data)
 
 @app.route("/api/region/<region_name>/villages")
 @api_error_handler
+@conditional_on_dump_date
 def api_region_villages(region_name):
     """
     Get all villages in a specific region with optional pagination.
@@ -1817,6 +2496,8 @@ def api_region_villages(region_name):
     Query Parameters:
         page (optional): Page number (default: 1) - if provided, returns paginated format
         per_page (optional): Items per page (default: 1000, max: 1000)
+        limit, offset, cursor, fields, sort (optional): return one window of
+            the villages instead (see VillageQuery), with next_cursor
         
     Returns:
         JSON response with list of villages (backward compatible format by default)
@@ -1831,6 +2512,15 @@ def api_region_villages(region_name):
     page = request.args.get('page', 1, type=int) if has_page else 1
     per_page = request.args.get('per_page', 1000, type=int) if has_per_page else 1000
     
+    vq = parse_village_query()
+    if vq.active:
+        if has_page or has_per_page:
+            raise APIError("page/per_page cannot be combined with limit, offset, cursor, fields or sort", 400)
+        villages, next_cursor = query_villages(dump_date, vq, region=region_name)
+        metrics.record_request('/api/region/<region_name>/villages', time.time() - start_time)
+        return village_window_response(
+            {'region': region_name, 'villages': villages, 'next_cursor': next_cursor}, next_cursor)
+    
     # Build cache key
     cache_key = f"region_villages:{dump_date}:{region_name}"
     if has_page or has_per_page:
@@ -1850,7 +2540,7 @@ def api_region_villages(region_name):
     # Query Supabase with RPC
     rows: List[Dict[str, Any]] = []
     total_count = 0
-    if supabase_reachable(1.0):
+    if _rpc_available():
         try:
             metrics.record_supabase_query()
             # Get paginated villages
@@ -1873,21 +2563,23 @@ def api_region_villages(region_name):
             
             logger.info(f"Fetched {len(rows)} villages from Supabase RPC for region villages")
         except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
             logger.warning(f"Supabase RPC failed for region villages: {e}, falling back")
             rows = get_all_villages()
             # Handle "None" region specially - match empty/whitespace regions
             if region_name.lower() == "none":
-                rows = [r for r in rows if not (r.get("region") or "").strip()]
+                rows = filter_rows(rows, "region", lambda s: not (s or "").strip())
             else:
-                rows = [r for r in rows if (r.get("region") or "").strip().lower() == region_name.lower()]
+                rows = filter_rows(rows, "region", lambda s: (s or "").strip().lower() == region_name.lower())
             total_count = len(rows)
     else:
         rows = get_all_villages()
         # Handle "None" region specially - match empty/whitespace regions
         if region_name.lower() == "none":
-            rows = [r for r in rows if not (r.get("region") or "").strip()]
+            rows = filter_rows(rows, "region", lambda s: not (s or "").strip())
         else:
-            rows = [r for r in rows if (r.get("region") or "").strip().lower() == region_name.lower()]
+            rows = filter_rows(rows, "region", lambda s: (s or "").strip().lower() == region_name.lower())
         total_count = len(rows)
     
     if not rows:
@@ -1933,6 +2625,7 @@ def api_region_villages(region_name):
 
 @app.route("/api/alliance/<alliance_tag>/map")
 @api_error_handler
+@conditional_on_dump_date
 def api_alliance_map(alliance_tag):
     """
     Get map markers for a specific alliance.
@@ -1949,57 +2642,60 @@ def api_alliance_map(alliance_tag):
     dump_date = get_latest_dump_date()
     cache_key = f"alliance_map:{dump_date}:{alliance_tag}"
     
-    # Try Redis cache first
-    cached_data = cache_get_gzip_json(cache_key)
-    if cached_data:
+    def build():
+        # Query Supabase with RPC
+        rows: List[Dict[str, Any]] = []
+        if _rpc_available():
+            try:
+                metrics.record_supabase_query()
+                rows = fetch_marker_rows(dump_date, alliance_tag=alliance_tag, columns=MARKERS)
+                logger.info(f"Fetched {len(rows)} villages from Supabase RPC for alliance map")
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(f"Supabase RPC failed for alliance map: {e}, falling back")
+                rows = get_all_villages()
+                if lower == "natars":
+                    rows = filter_rows(rows, "alliance_tag", lambda s: not (s or "").strip(), columns=MARKERS)
+                else:
+                    rows = filter_rows(rows, "alliance_tag", lambda s: (s or "").strip().lower() == lower, columns=MARKERS)
+        else:
+            rows = get_all_villages()
+            if lower == "natars":
+                rows = filter_rows(rows, "alliance_tag", lambda s: not (s or "").strip(), columns=MARKERS)
+            else:
+                rows = filter_rows(rows, "alliance_tag", lambda s: (s or "").strip().lower() == lower, columns=MARKERS)
+
+        if not rows:
+            raise APIError(f"No data found for alliance: {alliance_tag}", 404)
+
+        markers_data = generate_svg_markers(rows)
+
+        # Cache the result
+        cache_set_gzip_json(cache_key, markers_data, ttl=3600)
+        return markers_data
+
+    # Try Redis cache
+    cached_body, refresh = cache_get_gzip_raw_swr(cache_key)
+    if cached_body is not None:
         metrics.record_redis_hit()
+        if refresh:
+            revalidate(cache_key, build)
         duration = time.time() - start_time
         metrics.record_request('/api/alliance/<alliance_tag>/map', duration)
-        return jsonify(cached_data)
-    
+        return gzip_json_response(cached_body)
+
     metrics.record_redis_miss()
-    
-    # Query Supabase with RPC
-    rows: List[Dict[str, Any]] = []
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            resp = supabase.rpc("rpc_marker_rows", {
-                "dump_date": dump_date,
-                "region_param": None,
-                "alliance_tag_param": alliance_tag,
-                "player_name_param": None
-            }).execute()
-            rows = resp.data or []
-            logger.info(f"Fetched {len(rows)} villages from Supabase RPC for alliance map")
-        except Exception as e:
-            logger.warning(f"Supabase RPC failed for alliance map: {e}, falling back")
-            rows = get_all_villages()
-            if lower == "natars":
-                rows = [r for r in rows if not (r.get("alliance_tag") or "").strip()]
-            else:
-                rows = [r for r in rows if (r.get("alliance_tag") or "").strip().lower() == lower]
-    else:
-        rows = get_all_villages()
-        if lower == "natars":
-            rows = [r for r in rows if not (r.get("alliance_tag") or "").strip()]
-        else:
-            rows = [r for r in rows if (r.get("alliance_tag") or "").strip().lower() == lower]
-    
-    if not rows:
-        raise APIError(f"No data found for alliance: {alliance_tag}", 404)
-    
-    markers_data = generate_svg_markers(rows)
-    
-    # Cache the result
-    cache_set_gzip_json(cache_key, markers_data, ttl=3600)
-    
+
+    markers_data = coalesce(cache_key, build, read=cache_get_gzip_json)
+
     duration = time.time() - start_time
     metrics.record_request('/api/alliance/<alliance_tag>/map', duration)
     return jsonify(markers_data)
 
 @app.route("/api/alliance/<alliance_tag>/villages")
 @api_error_handler
+@conditional_on_dump_date
 def api_alliance_villages(alliance_tag):
     """
     Get all villages for a specific alliance with optional pagination.
@@ -2010,6 +2706,8 @@ def api_alliance_villages(alliance_tag):
     Query Parameters:
         page (optional): Page number (default: 1) - if provided, returns paginated format
         per_page (optional): Items per page (default: 1000, max: 1000)
+        limit, offset, cursor, fields, sort (optional): return one window of
+            the villages instead (see VillageQuery), with next_cursor
         
     Returns:
         JSON response with list of villages (backward compatible format by default)
@@ -2025,6 +2723,15 @@ def api_alliance_villages(alliance_tag):
     page = request.args.get('page', 1, type=int) if has_page else 1
     per_page = request.args.get('per_page', 1000, type=int) if has_per_page else 1000
     
+    vq = parse_village_query()
+    if vq.active:
+        if has_page or has_per_page:
+            raise APIError("page/per_page cannot be combined with limit, offset, cursor, fields or sort", 400)
+        villages, next_cursor = query_villages(dump_date, vq, alliance=alliance_tag)
+        metrics.record_request('/api/alliance/<alliance_tag>/villages', time.time() - start_time)
+        return village_window_response(
+            {'alliance': alliance_tag, 'villages': villages, 'next_cursor': next_cursor}, next_cursor)
+    
     # Build cache key
     cache_key = f"alliance_villages:{dump_date}:{alliance_tag}"
     if has_page or has_per_page:
@@ -2044,7 +2751,7 @@ def api_alliance_villages(alliance_tag):
     # Query Supabase with RPC
     rows: List[Dict[str, Any]] = []
     total_count = 0
-    if supabase_reachable(1.0):
+    if _rpc_available():
         try:
             metrics.record_supabase_query()
             # Get paginated villages
@@ -2067,19 +2774,21 @@ def api_alliance_villages(alliance_tag):
             
             logger.info(f"Fetched {len(rows)} villages from Supabase RPC for alliance villages")
         except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
             logger.warning(f"Supabase RPC failed for alliance villages: {e}, falling back")
             rows = get_all_villages()
             if lower == "natars":
-                rows = [r for r in rows if not (r.get("alliance_tag") or "").strip()]
+                rows = filter_rows(rows, "alliance_tag", lambda s: not (s or "").strip())
             else:
-                rows = [r for r in rows if (r.get("alliance_tag") or "").strip().lower() == lower]
+                rows = filter_rows(rows, "alliance_tag", lambda s: (s or "").strip().lower() == lower)
             total_count = len(rows)
     else:
         rows = get_all_villages()
         if lower == "natars":
-            rows = [r for r in rows if not (r.get("alliance_tag") or "").strip()]
+            rows = filter_rows(rows, "alliance_tag", lambda s: not (s or "").strip())
         else:
-            rows = [r for r in rows if (r.get("alliance_tag") or "").strip().lower() == lower]
+            rows = filter_rows(rows, "alliance_tag", lambda s: (s or "").strip().lower() == lower)
         total_count = len(rows)
     
     # Return empty array instead of error - frontend can handle empty results
@@ -2136,6 +2845,7 @@ def api_alliance_villages(alliance_tag):
 
 @app.route("/api/player/<player_name>/map")
 @api_error_handler
+@conditional_on_dump_date
 def api_player_map(player_name):
     """
     Get map markers for a specific player.
@@ -2151,51 +2861,54 @@ def api_player_map(player_name):
     dump_date = get_latest_dump_date()
     cache_key = f"player_map:{dump_date}:{player_name.strip().lower()}"
     
-    # Try Redis cache first
-    cached_data = cache_get_gzip_json(cache_key)
-    if cached_data:
+    def build():
+        # Query Supabase with RPC
+        rows: List[Dict[str, Any]] = []
+        if _rpc_available():
+            try:
+                metrics.record_supabase_query()
+                rows = fetch_marker_rows(dump_date, player_name=player_name, columns=MARKERS)
+                logger.info(f"Fetched {len(rows)} villages from Supabase RPC for player map")
+            except Exception as e:
+                supabase_breaker.record_failure(e)
+                note_degraded()
+                logger.warning(f"Supabase RPC failed for player map: {e}, falling back")
+                rows = get_all_villages()
+                rows = filter_rows(rows, "player_name", lambda s: (s or "").lower() == player_name.lower(), columns=MARKERS)
+        else:
+            rows = get_all_villages()
+            rows = filter_rows(rows, "player_name", lambda s: (s or "").lower() == player_name.lower(), columns=MARKERS)
+
+        if not rows:
+            raise APIError(f"No data found for player: {player_name}", 404)
+
+        markers_data = generate_svg_markers(rows)
+
+        # Cache the result (shorter TTL for player-specific data)
+        cache_set_gzip_json(cache_key, markers_data, ttl=1800)
+        return markers_data
+
+    # Try Redis cache
+    cached_body, refresh = cache_get_gzip_raw_swr(cache_key)
+    if cached_body is not None:
         metrics.record_redis_hit()
+        if refresh:
+            revalidate(cache_key, build)
         duration = time.time() - start_time
         metrics.record_request('/api/player/<player_name>/map', duration)
-        return jsonify(cached_data)
-    
+        return gzip_json_response(cached_body)
+
     metrics.record_redis_miss()
-    
-    # Query Supabase with RPC
-    rows: List[Dict[str, Any]] = []
-    if supabase_reachable(1.0):
-        try:
-            metrics.record_supabase_query()
-            resp = supabase.rpc("rpc_marker_rows", {
-                "dump_date": dump_date,
-                "region_param": None,
-                "alliance_tag_param": None,
-                "player_name_param": player_name
-            }).execute()
-            rows = resp.data or []
-            logger.info(f"Fetched {len(rows)} villages from Supabase RPC for player map")
-        except Exception as e:
-            logger.warning(f"Supabase RPC failed for player map: {e}, falling back")
-            rows = get_all_villages()
-            rows = [r for r in rows if r.get("player_name","").lower() == player_name.lower()]
-    else:
-        rows = get_all_villages()
-        rows = [r for r in rows if r.get("player_name","").lower() == player_name.lower()]
-    
-    if not rows:
-        raise APIError(f"No data found for player: {player_name}", 404)
-    
-    markers_data = generate_svg_markers(rows)
-    
-    # Cache the result (shorter TTL for player-specific data)
-    cache_set_gzip_json(cache_key, markers_data, ttl=1800)
-    
+
+    markers_data = coalesce(cache_key, build, read=cache_get_gzip_json)
+
     duration = time.time() - start_time
     metrics.record_request('/api/player/<player_name>/map', duration)
     return jsonify(markers_data)
 
 @app.route("/api/player/<player_name>/villages")
 @api_error_handler
+@conditional_on_dump_date
 def api_player_villages(player_name):
     """
     Get all villages for a specific player with optional pagination.
@@ -2206,6 +2919,8 @@ def api_player_villages(player_name):
     Query Parameters:
         page (optional): Page number (default: 1) - if provided, returns paginated format
         per_page (optional): Items per page (default: 1000, max: 1000)
+        limit, offset, cursor, fields, sort (optional): return one window of
+            the villages instead (see VillageQuery), with next_cursor
         
     Returns:
         JSON response with list of villages (backward compatible format by default)
@@ -2220,6 +2935,15 @@ def api_player_villages(player_name):
     page = request.args.get('page', 1, type=int) if has_page else 1
     per_page = request.args.get('per_page', 1000, type=int) if has_per_page else 1000
     
+    vq = parse_village_query()
+    if vq.active:
+        if has_page or has_per_page:
+            raise APIError("page/per_page cannot be combined with limit, offset, cursor, fields or sort", 400)
+        villages, next_cursor = query_villages(dump_date, vq, player=player_name)
+        metrics.record_request('/api/player/<player_name>/villages', time.time() - start_time)
+        return village_window_response(
+            {'player': player_name, 'villages': villages, 'next_cursor': next_cursor}, next_cursor)
+    
     # Build cache key
     cache_key = f"player_villages:{dump_date}:{player_name}"
     if has_page or has_per_page:
@@ -2239,7 +2963,7 @@ def api_player_villages(player_name):
     # Query Supabase with RPC
     vs: List[Dict[str, Any]] = []
     total_count = 0
-    if supabase_reachable(1.0):
+    if _rpc_available():
         try:
             metrics.record_supabase_query()
             # Get paginated villages
@@ -2262,11 +2986,13 @@ def api_player_villages(player_name):
             
             logger.info(f"Fetched {len(vs)} villages from Supabase RPC for player villages")
         except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
             logger.warning(f"Supabase RPC failed for player villages: {e}, falling back")
-            vs = [r for r in get_all_villages() if r.get("player_name","").lower() == player_name.lower()]
+            vs = filter_rows(get_all_villages(), "player_name", lambda s: (s or "").lower() == player_name.lower())
             total_count = len(vs)
     else:
-        vs = [r for r in get_all_villages() if r.get("player_name","").lower() == player_name.lower()]
+        vs = filter_rows(get_all_villages(), "player_name", lambda s: (s or "").lower() == player_name.lower())
         total_count = len(vs)
     
     if not vs:
@@ -2312,6 +3038,7 @@ def api_player_villages(player_name):
 
 @app.route("/api/player/<player_name>/history")
 @api_error_handler
+@conditional_on_dump_date
 def api_player_history(player_name: str):
     start_time = time.time()
     player_name = validate_string_param(player_name, 'player_name')
@@ -2335,7 +3062,7 @@ def api_player_history(player_name: str):
 
     history: List[Dict[str, Any]] = []
 
-    if supabase_reachable(1.0):
+    if _rpc_available():
         try:
             metrics.record_supabase_query()
             # Try exact name first
@@ -2349,6 +3076,8 @@ def api_player_history(player_name: str):
 
             logger.info(f"Fetched {len(history)} history entries from Supabase RPC for player")
         except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
             logger.warning(f"Supabase RPC failed for player history: {e}, using fallback history")
             history = get_fallback_history(player_name)
     else:
@@ -2368,17 +3097,11 @@ def get_fallback_history(player_name: str) -> List[Dict]:
     player_lower = player_name.lower()
     rows: List[Dict[str, Any]] = []
     
-    cached_rows = supabase_cache_manager.get()
+    cached_rows = world_data().supabase_cache.get()
     if cached_rows:
-        rows = cached_rows
+        rows = filter_rows(cached_rows, "player_name", lambda s: (s or "").lower() == player_lower)
     else:
-        cached_sql = sql_cache_manager.get()
-        if cached_sql:
-            rows = [sql_row_to_dict(r) for r in cached_sql]
-        else:
-            rows = [sql_row_to_dict(r) for r in fetch_sql_data()]
-    
-    rows = [r for r in rows if (r.get("player_name") or "").lower() == player_lower]
+        rows = filter_rows(get_sql_villages(), "player_name", lambda s: (s or "").lower() == player_lower)
     if not rows:
         return []
     
@@ -2400,6 +3123,7 @@ def get_fallback_history(player_name: str) -> List[Dict]:
 @app.route("/api/players")
 @limiter.limit(config.RATE_LIMIT_DEFAULT)
 @api_error_handler
+@conditional_on_dump_date
 def api_players():
     """
     Get list of all players sorted by population with pagination.
@@ -2442,7 +3166,7 @@ def api_players():
     
     # Query Supabase with RPC
     players_list: List[Dict[str, Any]] = []
-    if supabase_reachable(1.0):
+    if _rpc_available():
         try:
             metrics.record_supabase_query()
             resp = supabase.rpc("rpc_players", {
@@ -2453,11 +3177,13 @@ def api_players():
             players_list = resp.data or []
             logger.info(f"Fetched {len(players_list)} players from Supabase RPC")
         except Exception as e:
+            supabase_breaker.record_failure(e)
+            note_degraded()
             logger.warning(f"Supabase RPC failed for players: {e}, falling back")
             # Fallback: aggregate in Python
             rows = get_all_villages()
             players: Dict[str,Dict[str,Any]] = {}
-            for r in rows:
+            for r in scan(rows):
                 nm = (r.get("player_name") or "").strip()
                 if not nm: continue
                 alliance = r.get("alliance_tag","") or ""
@@ -2477,7 +3203,7 @@ def api_players():
         # Fallback: aggregate in Python
         rows = get_all_villages()
         players: Dict[str,Dict[str,Any]] = {}
-        for r in rows:
+        for r in scan(rows):
             nm = (r.get("player_name") or "").strip()
             if not nm: continue
             alliance = r.get("alliance_tag","") or ""
@@ -2529,45 +3255,289 @@ def api_players():
     return jsonify(top)
 
 # -------------------- Ingest SQL → Supabase -------------------- #
-def ingest_to_supabase():
+def ingest_to_supabase(force: bool = False, parse_workers: Optional[int] = None,
+                       prewarm: bool = False) -> Optional[IngestStats]:
     """
-    Ingest SQL dump data into Supabase database.
+    Ingest SQL dump data of the current world into Supabase database.
     
-    Fetches SQL data, converts to dictionaries, and upserts into Supabase
+    Fetches SQL data, converts to dictionaries, and upserts into the world's
     villages table. Uses conflict resolution on village_id and dump_date.
     Invalidates Redis cache for latest_dump_date to trigger cache refresh.
+    Skips everything when the dump is byte-identical to the last one ingested.
+    With INGEST_MODE=delta, only new and changed villages are sent and removed
+    ones deleted: a new dump_date starts as a server-side copy of the last
+    ingested one (carry_forward_dump_date), so write volume follows the
+    day's churn rather than the world size.
+    
+    Args:
+        force: Ingest the full dump even if it has not changed since the last ingest
+        parse_workers: Parser processes (defaults to SQL_PARSE_WORKERS)
+        prewarm: Regenerate the hot Redis entries once the new data is in place
+        
+    Returns:
+        IngestStats for the upload, or None if nothing was uploaded
     """
-    rows = fetch_sql_data()
+    world = current_world(worlds)
+    url = world.sql_url
     today = date.today().isoformat()
-    payload = [{**sql_row_to_dict(r), "dump_date": today} for r in rows]
-
-    if not payload:
+    if parse_workers is None:
+        parse_workers = config.SQL_PARSE_WORKERS
+    # A failed download aborts the ingest instead of writing a partial world;
+    # always ask the server, so a new dump is seen even while the cache is warm.
+    # An unchanged dump is detected (304 or hash) before it is parsed or loaded.
+    try:
+        rows = list(iter_sql_data(strict=True, parse_workers=parse_workers, revalidate=True,
+                                  unless_hash=None if force else sql_dump_cache.last_ingested_hash(url)))
+    except DumpUnchanged as e:
+        logger.info("SQL dump unchanged since last ingest (sha256 %s); skipping", e.sha256[:12])
+        return
+    dump_hash = sql_dump_cache.content_hash(url)
+    if not rows:
         logger.info("No rows to ingest")
         return
 
+    upserter = BatchUpserter(
+        supabase, world.table, on_conflict="village_id,dump_date",
+        batch_size=config.INGEST_BATCH_SIZE,
+        max_workers=config.INGEST_MAX_WORKERS,
+        max_retries=config.INGEST_MAX_RETRIES,
+        backoff=config.INGEST_RETRY_BACKOFF,
+        body_format=config.INGEST_BODY_FORMAT,
+        rest_url=config.SUPABASE_URL,
+        api_key=config.SUPABASE_KEY,
+    )
+
+    # Delta mode: diff against the last ingested dump. Its rows are already
+    # stored (under today, or copied to today server-side), so only the
+    # difference has to be written.
+    delta_mode = config.INGEST_MODE == "delta" and not force
+    to_write: List[List[Optional[str]]] = rows
+    delta: Optional[DumpDelta] = None
+    previous_date = sql_dump_cache.last_ingested_dump_date(url)
+    previous = sql_dump_cache.load_ingested_rows(url) if delta_mode and previous_date else None
+    if previous is not None:
+        delta = diff_dumps(previous, rows)
+        del previous
+        if previous_date != today and not carry_forward_dump_date(world.table, previous_date, today):
+            delta = None
+    if delta is not None:
+        to_write = delta.upserts
+        logger.info("Delta ingest for %s (base %s): %s", today, previous_date, delta.to_dict())
+    elif delta_mode:
+        logger.info("Delta ingest: no usable baseline for %s; writing the full snapshot", today)
+
+    # Rows are converted column by column, then sent in bounded, concurrent, retried batches
+    payload = iter(sql_rows_to_snapshot(to_write, dump_date=today))
+    stats = upserter.upsert(payload)
+    if delta is not None and delta.removed and stats.ok:
+        removed = upserter.delete("village_id", (parse_int(v) for v in delta.removed), {"dump_date": today})
+        stats.failed_batches += removed.failed_batches
+        stats.errors.extend(removed.errors)
+    logger.info("Ingest stats for %s: %s", today, stats.to_dict())
+    if not stats.ok:
+        logger.error("Upsert incomplete for %s: %d of %d batches failed (%s)",
+                     today, stats.failed_batches, stats.batches, "; ".join(stats.errors[:5]))
+        return stats
+
+    logger.info("Ingested %d rows for %s", stats.rows, today)
+    if dump_hash:
+        # Keep the rows as the baseline for the next delta ingest (a hard link
+        # to the dump cache's copy when it holds this dump, see mark_ingested)
+        sql_dump_cache.mark_ingested(url, dump_hash, today,
+                                     rows if config.INGEST_MODE == "delta" else None)
+    
+    # Invalidate latest_dump_date cache to force refresh
+    cache_delete("latest_dump_date")
+    logger.info("Invalidated latest_dump_date cache after ingestion")
+    # Entries rendered from an earlier ingest of the same dump_date are stale now
+    deleted = sum(cache_delete_pattern(f"{family}:{today}*") for family in DUMP_DATE_KEY_FAMILIES)
+    if deleted:
+        logger.info("Invalidated %d cached responses for %s", deleted, today)
+    
+    # Build history for this dump_date (the history RPC only covers the villages table)
+    if world.has_rpcs:
+        try:
+            supabase.rpc("rpc_build_history_for_dump", {"dump_date": today}).execute()
+            logger.info("Built history for dump_date: %s", today)
+        except Exception as e:
+            logger.warning("Failed to build history for dump_date %s: %s", today, e)
+            # Don't fail entire ingestion if history build fails (and don't pre-warm half-built data)
+            return stats
+    if prewarm:
+        prewarm_caches()
+    return stats
+
+def carry_forward_dump_date(table: str, from_date: str, to_date: str) -> bool:
+    """
+    Replace the rows of to_date with a copy of from_date's, inside Postgres.
+    
+    A delta ingest of a new day starts from the previous day's rows and then
+    writes only what changed, so unchanged villages never cross the network.
+    Needs this function in the database:
+    
+        create or replace function rpc_carry_forward_dump(
+            table_name text, columns text[], from_dump_date date, to_dump_date date
+        ) returns bigint language plpgsql as $$
+        declare
+            cols text := (select string_agg(quote_ident(c), ',') from unnest(columns) c);
+            copied bigint;
+        begin
+            execute format('delete from %I where dump_date = $1', table_name) using to_dump_date;
+            execute format('insert into %I (%s, dump_date) select %s, $2 from %I where dump_date = $1',
+                           table_name, cols, cols, table_name)
+                using from_dump_date, to_dump_date;
+            get diagnostics copied = row_count;
+            return copied;
+        end $$;
+    
+    Returns:
+        True if the copy was made; False if it failed (the caller then writes
+        the full snapshot)
+    """
+    try:
+        resp = supabase.rpc("rpc_carry_forward_dump", {
+            "table_name": table,
+            "columns": [name for name, _ in SQL_COLUMNS],
+            "from_dump_date": from_date,
+            "to_dump_date": to_date,
+        }).execute()
+    except Exception as e:
+        logger.warning("Could not carry %s forward to %s in %s: %s", from_date, to_date, table, e)
+        return False
+    logger.info("Carried %s rows of %s forward to %s in %s", _rpc_scalar(resp, "rpc_carry_forward_dump"),
+                from_date, to_date, table)
+    return True
+
+# Redis key families whose keys embed the dump_date ("<family>:<dump_date>...")
+DUMP_DATE_KEY_FAMILIES = (
+    "markers", "marker_rows", "regions", "alliance_tags", "alliances", "players",
+    "region_map", "region_villages", "alliance_map", "alliance_villages",
+    "player_map", "player_villages", "player_history",
+)
+
+def prewarm_caches(top_n: Optional[int] = None) -> Dict[str, int]:
+    """
+    Fill the hot Redis keys of the current world by replaying its GET endpoints.
+    
+    Covers markers, regions, alliance tags, alliances and players, plus the
+    maps of the top_n alliances (by population) and regions (by village
+    count). Going through the real handlers guarantees the same keys and
+    payloads a user request would produce.
+    
+    Args:
+        top_n: Alliance and region maps to render (defaults to PREWARM_TOP_N)
+        
+    Returns:
+        Mapping of request path to HTTP status code
+    """
+    world = current_world(worlds)
+    top_n = config.PREWARM_TOP_N if top_n is None else top_n
+    client = app.test_client()
+    statuses: Dict[str, int] = {}
+    start = time.time()
+
+    def get(path: str):
+        resp = client.get(path, query_string={"world": world.key},
+                          environ_overrides={PREWARM_ENVIRON_KEY: True})
+        statuses[path] = resp.status_code
+        if resp.status_code != 200:
+            logger.warning("Pre-warm of %s [%s] returned %d", path, world.key, resp.status_code)
+            return None
+        return resp.get_json(silent=True)
+
+    markers = get("/api/markers") or {}
+    get("/api/region")
+    get("/api/alliance")
+    alliances = get("/api/alliances") or {}
+    get("/api/players")
+
+    top_alliances = [a.get("tag") for a in (alliances.get("alliances") or [])[:top_n] if a.get("tag")]
+    for tag in top_alliances:
+        get(f"/api/alliance/{quote(tag, safe='')}/map")
+
     try:
-        res = (supabase.table("villages")
-                        .upsert(payload, on_conflict="village_id,dump_date")
-                        .execute())
-        code = getattr(res, "status_code", None)
-        if code in (200,201):
-            logger.info("Ingested %d rows for %s", len(payload), today)
-            
-            # Invalidate latest_dump_date cache to force refresh
-            cache_delete("latest_dump_date")
-            logger.info("Invalidated latest_dump_date cache after ingestion")
-            
-            # Build history for this dump_date
+        region_stats = json.loads(markers.get("region_stats_json") or "{}")
+    except ValueError:
+        region_stats = {}
+    top_regions = sorted((r for r in region_stats if r),
+                         key=lambda r: region_stats[r].get("villageCount", 0), reverse=True)[:top_n]
+    for region in top_regions:
+        get(f"/api/region/{quote(region, safe='')}/map")
+
+    ok = sum(1 for code in statuses.values() if code == 200)
+    logger.info("Pre-warmed %d/%d cache entries for world %s in %.1fs",
+                ok, len(statuses), world.key, time.time() - start)
+    return statuses
+
+def ingest_worlds(keys: Optional[List[str]] = None, force: bool = False,
+                  max_workers: Optional[int] = None, parse_workers: Optional[int] = None,
+                  prewarm: bool = False) -> Dict[str, Optional[IngestStats]]:
+    """
+    Ingest several worlds concurrently with a bounded thread pool.
+    
+    Each world is downloaded, parsed and uploaded in its own world context,
+    so caches, snapshots and Redis keys never mix. When SQL_PARSE_WORKERS
+    is 0 (one parser per CPU) the CPUs are split between the worlds in flight.
+    
+    Args:
+        keys: World keys to ingest (default: every registered world)
+        force: Forwarded to ingest_to_supabase
+        max_workers: Worlds in flight at once (defaults to INGEST_WORLD_WORKERS)
+        parse_workers: Parser processes per world (defaults to SQL_PARSE_WORKERS)
+        prewarm: Forwarded to ingest_to_supabase
+        
+    Returns:
+        Mapping of world key to its IngestStats (None if skipped or failed)
+    """
+    selected = [worlds.get(k) for k in keys] if keys else list(worlds)
+    pool_size = max(1, min(max_workers or config.INGEST_WORLD_WORKERS, len(selected)))
+    if parse_workers is None:
+        parse_workers = config.SQL_PARSE_WORKERS
+    if parse_workers == 0:
+        parse_workers = max(1, (os.cpu_count() or 1) // pool_size)
+
+    def run(world: World) -> Optional[IngestStats]:
+        with world_context(world):
+            return ingest_to_supabase(force=force, parse_workers=parse_workers, prewarm=prewarm)
+
+    results: Dict[str, Optional[IngestStats]] = {}
+    with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="ingest-world") as pool:
+        futures = {world.key: pool.submit(run, world) for world in selected}
+        for key, future in futures.items():
             try:
-                supabase.rpc("rpc_build_history_for_dump", {"dump_date": today}).execute()
-                logger.info("Built history for dump_date: %s", today)
+                results[key] = future.result()
             except Exception as e:
-                logger.warning("Failed to build history for dump_date %s: %s", today, e)
-                # Don't fail entire ingestion if history build fails
-        else:
-            logger.error("Upsert failed: %s", res)
-    except Exception as e:
-        logger.error("Supabase upsert failed: %s", e)
+                logger.error("Ingestion of world %s failed: %s", key, e, exc_info=True)
+                results[key] = None
+    return results
+
+# -------------------- Scheduled Ingest -------------------- #
+ingest_scheduler: Optional[IngestScheduler] = None
+
+def start_ingest_scheduler(in_server: bool = True) -> IngestScheduler:
+    """
+    Create the ingest scheduler (every world, every INGEST_SCHEDULE_SECONDS).
+    
+    Each run revalidates the dumps with conditional GETs, so an unchanged
+    dump costs a 304 (or a hash comparison) and no upload.
+    
+    Args:
+        in_server: True when running inside the web server; dumps are then
+            parsed in-process, since forking parser processes from a
+            threaded server is unsafe
+            
+    Returns:
+        The scheduler (already started when in_server is True)
+    """
+    global ingest_scheduler
+    parse_workers = 1 if in_server else None
+    ingest_scheduler = IngestScheduler(
+        lambda: ingest_worlds(parse_workers=parse_workers, prewarm=config.PREWARM_ENABLED),
+        interval=config.INGEST_SCHEDULE_SECONDS,
+    )
+    if in_server:
+        ingest_scheduler.start()
+    return ingest_scheduler
 
 @app.route("/")
 def home():
@@ -2583,16 +3553,30 @@ if __name__ == "__main__":
     parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
     parser.add_argument('--ingest', action='store_true', help='Run data ingestion before starting server')
+    parser.add_argument('--force-ingest', action='store_true', help='Ingest even if the dump is unchanged since the last ingest')
+    parser.add_argument('--world', action='append', choices=worlds.keys(), help='World to ingest (repeatable; default: the default world)')
+    parser.add_argument('--all-worlds', action='store_true', help='Ingest every configured world')
+    parser.add_argument('--scheduler', action='store_true', help='Poll for new dumps every INGEST_SCHEDULE_SECONDS and ingest them in the background')
+    parser.add_argument('--no-server', action='store_true', help='With --scheduler: run only the scheduler, in the foreground')
     
     args = parser.parse_args()
     
     if args.ingest:
         logger.info("Starting data ingestion...")
         try:
-            ingest_to_supabase()
+            if args.all_worlds or args.world:
+                ingest_worlds(None if args.all_worlds else args.world, force=args.force_ingest)
+            else:
+                ingest_to_supabase(force=args.force_ingest)
             logger.info("Data ingestion completed successfully")
         except Exception as e:
             logger.error("Data ingestion failed: %s", str(e), exc_info=True)
     
+    if args.scheduler and args.no_server:
+        start_ingest_scheduler(in_server=False).run_forever()
+        raise SystemExit(0)
+    if args.scheduler:
+        start_ingest_scheduler()
+    
     logger.info("Starting web server on %s:%d (debug=%s)", args.host, args.port, args.debug)
     app.run(host=args.host, port=args.port, debug=args.debug)
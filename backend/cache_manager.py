@@ -2,7 +2,7 @@
 import logging
 import threading
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
 logger = logging.getLogger("bot")
 
@@ -35,6 +35,16 @@ class SQLCacheManager:
                 return self._cached_sql
             return []
     
+    def peek(self) -> List[List[Optional[str]]]:
+        """
+        Get cached SQL data regardless of age.
+        
+        Returns:
+            Last cached SQL rows, or empty list if nothing was ever cached
+        """
+        with self._lock:
+            return self._cached_sql
+    
     def set(self, data: List[List[Optional[str]]]) -> None:
         """
         Set cached SQL data.
@@ -46,6 +56,25 @@ class SQLCacheManager:
             self._cached_sql = data
             self._last_sql_time = datetime.utcnow()
     
+    def fill(self, rows: Iterable[List[Optional[str]]]) -> Iterator[List[Optional[str]]]:
+        """
+        Pass rows through to the caller while collecting them for the cache.
+        
+        The cache is only replaced once the source is exhausted, so a failed
+        or abandoned stream never leaves a partial dump behind.
+        
+        Args:
+            rows: Iterable of SQL rows (typically a streaming download)
+            
+        Yields:
+            The same rows, as they arrive
+        """
+        staged: List[List[Optional[str]]] = []
+        for row in rows:
+            staged.append(row)
+            yield row
+        self.set(staged)
+    
     def clear(self) -> None:
         """Clear the cache."""
         with self._lock:
@@ -72,14 +101,14 @@ class SupabaseCacheManager:
         self._ttl = ttl
         self._lock = threading.Lock()
         self._cached_date = datetime.min
-        self._cached_rows: List[Dict[str, Any]] = []
+        self._cached_rows: Sequence[Dict[str, Any]] = []
     
-    def get(self) -> List[Dict[str, Any]]:
+    def get(self) -> Sequence[Dict[str, Any]]:
         """
         Get cached Supabase data if still valid.
         
         Returns:
-            Cached rows or empty list if cache expired/missing
+            Cached rows (typically a VillageSnapshot) or empty list if cache expired/missing
         """
         with self._lock:
             now = datetime.utcnow()
@@ -87,16 +116,28 @@ class SupabaseCacheManager:
                 return self._cached_rows
             return []
     
-    def set(self, data: List[Dict[str, Any]]) -> None:
+    def peek(self) -> Sequence[Dict[str, Any]]:
+        """
+        Get cached Supabase data regardless of age.
+        
+        Returns:
+            Last cached rows, or empty list if nothing was ever cached
+        """
+        with self._lock:
+            return self._cached_rows
+    
+    def set(self, data: Sequence[Dict[str, Any]], fresh: bool = True) -> None:
         """
         Set cached Supabase data.
         
         Args:
-            data: Rows to cache
+            data: Rows to cache (list of dicts or VillageSnapshot)
+            fresh: False to store rows that are already due for a refresh
+                (e.g. restored from disk); get() ignores them, peek() does not
         """
         with self._lock:
             self._cached_rows = data
-            self._cached_date = datetime.utcnow()
+            self._cached_date = datetime.utcnow() if fresh else datetime.min
     
     def clear(self) -> None:
         """Clear the cache."""
@@ -0,0 +1,159 @@
+"""Circuit breaker for a remote dependency, fed by a background prober and request failures."""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger("bot")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Track whether a dependency is usable without touching the network per request.
+
+    - closed: requests go through. failure_threshold failures within
+      failure_window seconds open the breaker.
+    - open: allow_request() is False, so callers fail fast to their local
+      fallback. After reset_timeout seconds the breaker turns half-open.
+    - half_open: the prober (not a request) runs one trial probe; success
+      closes the breaker, failure opens it for another reset_timeout.
+
+    Request handlers report failures through record_failure(); the prober
+    thread runs the probe every probe_interval seconds, counting a failed
+    probe like a failed request while closed. allow_request() only reads
+    state and never blocks.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], bool],
+                 failure_threshold: int = 3, failure_window: float = 60.0,
+                 reset_timeout: float = 30.0, probe_interval: float = 10.0):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            name: Dependency name, used in logs and the prober thread name
+            probe: Cheap health check returning True if the dependency is usable
+            failure_threshold: Failures within failure_window that open the breaker
+            failure_window: Seconds a failure counts towards the threshold
+            reset_timeout: Seconds the breaker stays open before a half-open probe
+            probe_interval: Seconds between background probes
+        """
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.failure_window = failure_window
+        self.reset_timeout = reset_timeout
+        self.probe_interval = max(0.5, probe_interval)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._failures: Deque[float] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.opened_count = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_probe_ok: Optional[bool] = None
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half_open"."""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True if callers should use the dependency (O(1), no I/O)."""
+        if self._state == CLOSED:
+            return True
+        self.rejected += 1
+        return False
+
+    def record_failure(self, error: Any = None) -> None:
+        """Report a failed call; opens the breaker once the threshold is reached."""
+        now = time.monotonic()
+        with self._lock:
+            if error is not None:
+                self.last_error = str(error)
+            if self._state != CLOSED:
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.failure_window:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                self._open(now)
+
+    def record_success(self) -> None:
+        """Report a successful trial: close the breaker and forget past failures."""
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("%s circuit closed", self.name)
+            self._state = CLOSED
+            self._failures.clear()
+
+    def _open(self, now: float) -> None:
+        if self._state == CLOSED:
+            self.opened_count += 1
+            logger.warning("%s circuit opened after %d failures (last: %s)",
+                           self.name, len(self._failures), self.last_error)
+        self._state = OPEN
+        self._opened_at = now
+        self._failures.clear()
+
+    def probe_once(self) -> None:
+        """Run the probe now and feed its outcome into the breaker."""
+        state = self.state
+        if state == OPEN:
+            return  # still cooling down; the half-open trial comes later
+        try:
+            ok = bool(self.probe())
+            error = None if ok else "probe failed"
+        except Exception as e:
+            ok, error = False, e
+        self.last_probe_ok = ok
+        if state == HALF_OPEN:
+            if ok:
+                self.record_success()
+            else:
+                with self._lock:
+                    self.last_error = str(error)
+                    self._open(time.monotonic())
+        elif not ok:
+            self.record_failure(error)
+
+    def run_forever(self) -> None:
+        """Probe on a schedule in the calling thread until stop() is called."""
+        while not self._stop.is_set():
+            self.probe_once()
+            self._stop.wait(self.probe_interval)
+
+    def start(self) -> None:
+        """Start the background prober (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name=f"{self.name}-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background prober."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Summary for health endpoints and logs."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_failures": len(self._failures),
+                "opened_count": self.opened_count,
+                "rejected_requests": self.rejected,
+                "last_probe_ok": self.last_probe_ok,
+                "last_error": self.last_error,
+            }
@@ -30,14 +30,54 @@ class Config:
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour
     SQL_CACHE_TTL: int = int(os.getenv("SQL_CACHE_TTL", "86400"))  # 24 hours
     PAGE_SIZE: int = int(os.getenv("PAGE_SIZE", "1000"))  # Default page size
+    SUPABASE_PAGE_SIZE: int = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))  # rows per Supabase read (PostgREST max-rows)
+    SUPABASE_PAGE_WORKERS: int = int(os.getenv("SUPABASE_PAGE_WORKERS", "4"))  # key-range slices read concurrently per scan
+    SUPABASE_PROBE_INTERVAL: float = float(os.getenv("SUPABASE_PROBE_INTERVAL", "10"))  # seconds between background reachability probes
+    SUPABASE_PROBE_TIMEOUT: float = float(os.getenv("SUPABASE_PROBE_TIMEOUT", "1.0"))  # TCP connect timeout per probe
+    SUPABASE_BREAKER_THRESHOLD: int = int(os.getenv("SUPABASE_BREAKER_THRESHOLD", "3"))  # failures that open the circuit
+    SUPABASE_BREAKER_WINDOW: float = float(os.getenv("SUPABASE_BREAKER_WINDOW", "60"))  # seconds a failure counts
+    SUPABASE_BREAKER_RESET: float = float(os.getenv("SUPABASE_BREAKER_RESET", "30"))  # seconds open before a half-open probe
     
     # Redis Configuration
     REDIS_URL: str = os.getenv("REDIS_URL", "")
     REDIS_PREFIX: str = os.getenv("REDIS_PREFIX", "travistat:")
     REDIS_DEFAULT_TTL_SECONDS: int = int(os.getenv("REDIS_DEFAULT_TTL_SECONDS", "3600"))  # 1 hour
+    REDIS_STALE_TTL_SECONDS: int = int(os.getenv("REDIS_STALE_TTL_SECONDS", "1800"))  # serve stale while refreshing
+    REDIS_XFETCH_BETA: float = float(os.getenv("REDIS_XFETCH_BETA", "1.0"))  # early refresh eagerness, 0 = off
+    REDIS_LOCK_TTL_MS: int = int(os.getenv("REDIS_LOCK_TTL_MS", "30000"))  # regeneration lock lease
+    REDIS_LOCK_WAIT_SECONDS: float = float(os.getenv("REDIS_LOCK_WAIT_SECONDS", "5"))  # wait for another worker's rebuild
+    CACHE_L1_MAX_BYTES: int = int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))  # in-process tier, 0 = off
+    CACHE_L1_TTL_SECONDS: float = float(os.getenv("CACHE_L1_TTL_SECONDS", "30"))  # bounds staleness across workers
+    CACHE_CODEC: str = os.getenv("CACHE_CODEC", "auto")  # or identity/gzip/zlib/zstd/zstd-dict/lz4 to force one
+    CACHE_COMPRESS_MIN_BYTES: int = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))  # smaller values stay uncompressed
+    CACHE_HOT_READS_PER_MINUTE: int = int(os.getenv("CACHE_HOT_READS_PER_MINUTE", "60"))  # hot keys get LZ4
+    CACHE_ZSTD_DICT: str = os.getenv("CACHE_ZSTD_DICT", "")  # dictionary from benchmarks/bench_cache_codecs.py --train-dict
+    JSON_BACKEND: str = os.getenv("JSON_BACKEND", "auto")  # orjson, msgspec or json (auto = fastest installed)
     
     # Map Configuration
     SQL_FILE_URL: str = "https://nys.x1.europe.travian.com//map.sql"
+    DEFAULT_WORLD: str = os.getenv("DEFAULT_WORLD", "nys").lower()  # key of the world above
+    WORLDS: str = os.getenv("WORLDS", "")  # extra worlds: "key=https://.../map.sql,key2=..."
+    SQL_DOWNLOAD_TIMEOUT: float = float(os.getenv("SQL_DOWNLOAD_TIMEOUT", "15"))  # seconds
+    SQL_STREAM_CHUNK_SIZE: int = int(os.getenv("SQL_STREAM_CHUNK_SIZE", str(256 * 1024)))  # bytes per read
+    SQL_DUMP_CACHE_DIR: str = os.getenv("SQL_DUMP_CACHE_DIR", ".dump_cache")  # parsed dumps + ETag/Last-Modified
+    SNAPSHOT_DIR: str = os.getenv("SNAPSHOT_DIR", ".snapshots")  # memory-mapped village snapshots
+    SNAPSHOT_KEEP: int = int(os.getenv("SNAPSHOT_KEEP", "3"))  # dump_dates kept per source
+    SQL_PARSE_WORKERS: int = int(os.getenv("SQL_PARSE_WORKERS", "0"))  # ingest parser processes (0 = one per CPU, 1 = serial)
+    SQL_PARSE_CHUNK_LINES: int = int(os.getenv("SQL_PARSE_CHUNK_LINES", "5000"))  # INSERT lines per worker task
+    SQL_PARSE_PARALLEL_MIN_LINES: int = int(os.getenv("SQL_PARSE_PARALLEL_MIN_LINES", "50000"))  # smaller dumps parse serially
+    
+    # Ingest Configuration
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "5000"))  # rows per upsert request
+    INGEST_MAX_WORKERS: int = int(os.getenv("INGEST_MAX_WORKERS", "4"))  # concurrent upsert requests
+    INGEST_MAX_RETRIES: int = int(os.getenv("INGEST_MAX_RETRIES", "3"))  # retries per batch
+    INGEST_RETRY_BACKOFF: float = float(os.getenv("INGEST_RETRY_BACKOFF", "1.0"))  # base backoff in seconds
+    INGEST_BODY_FORMAT: str = os.getenv("INGEST_BODY_FORMAT", "json").lower()  # "json" or "csv"
+    INGEST_MODE: str = os.getenv("INGEST_MODE", "full").lower()  # "full" or "delta"
+    INGEST_WORLD_WORKERS: int = int(os.getenv("INGEST_WORLD_WORKERS", "2"))  # worlds ingested concurrently
+    INGEST_SCHEDULE_SECONDS: int = int(os.getenv("INGEST_SCHEDULE_SECONDS", "3600"))  # scheduler poll cadence
+    PREWARM_ENABLED: bool = os.getenv("PREWARM_ENABLED", "true").lower() == "true"  # refill hot Redis keys after ingest
+    PREWARM_TOP_N: int = int(os.getenv("PREWARM_TOP_N", "10"))  # alliance/region maps pre-rendered per world
     
     # Authentication Configuration
     # Users should be configured via environment variables in format:
@@ -50,6 +90,12 @@ class Config:
     RATE_LIMIT_DEFAULT: str = os.getenv("RATE_LIMIT_DEFAULT", "1000 per hour")
     RATE_LIMIT_STRICT: str = os.getenv("RATE_LIMIT_STRICT", "100 per hour")  # For expensive endpoints
     
+    # HTTP caching of dump-derived read endpoints (ETag / 304)
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))  # seconds browsers reuse a response unasked
+    ETAG_VERSION: str = os.getenv("ETAG_VERSION", "1")  # bump when a deploy changes response payloads
+    STREAM_CHUNK_BYTES: int = int(os.getenv("STREAM_CHUNK_BYTES", "65536"))  # bytes buffered per chunk of a streamed response
+    VILLAGE_LIST_MAX_LIMIT: int = int(os.getenv("VILLAGE_LIST_MAX_LIMIT", "100000"))  # largest ?limit= on village list endpoints
+    
     def __post_init__(self):
         """Load users from environment variable after initialization."""
         # Default users (not recommended for production)
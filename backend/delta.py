@@ -0,0 +1,60 @@
+"""Row-level diff between two parsed map.sql dumps."""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+# Position of village_id in a parsed map.sql row
+VILLAGE_ID_COL = 4
+
+
+@dataclass
+class DumpDelta:
+    """Classification of the rows of a new dump against the previous one."""
+
+    new: List[List[Any]] = field(default_factory=list)
+    changed: List[List[Any]] = field(default_factory=list)
+    removed: List[Any] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def upserts(self) -> List[List[Any]]:
+        """Rows that have to be written: new and changed villages."""
+        return self.new + self.changed
+
+    def to_dict(self) -> Dict[str, int]:
+        """Counts per class, for logs."""
+        return {
+            "new": len(self.new),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "unchanged": self.unchanged,
+        }
+
+
+def diff_dumps(previous: Sequence[List[Any]], current: Sequence[List[Any]],
+               key_col: int = VILLAGE_ID_COL) -> DumpDelta:
+    """
+    Hash-join two dumps on village_id and classify every village.
+
+    A village is "changed" if any column differs (owner, population, name,
+    alliance, ...). Cost is linear in the size of both dumps.
+
+    Args:
+        previous: Rows of the dump that is already stored
+        current: Rows of the dump being ingested
+        key_col: Column holding the village_id
+
+    Returns:
+        DumpDelta with new/changed rows, removed village ids and the unchanged count
+    """
+    index = {row[key_col]: row for row in previous}
+    delta = DumpDelta()
+    for row in current:
+        old = index.pop(row[key_col], None)
+        if old is None:
+            delta.new.append(row)
+        elif old != row:
+            delta.changed.append(row)
+        else:
+            delta.unchanged += 1
+    delta.removed = list(index.keys())
+    return delta
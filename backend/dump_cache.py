@@ -0,0 +1,244 @@
+"""On-disk cache of parsed map.sql dumps with HTTP revalidation metadata."""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("bot")
+
+
+class DumpCache:
+    """
+    Thread-safe on-disk cache of parsed dumps, keyed by dump URL.
+
+    For every URL it keeps the parsed rows (gzip-compressed JSON lines) and a
+    small metadata file with the ETag, Last-Modified and SHA-256 of the raw
+    dump, plus the hash of the dump that was last ingested into Supabase.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize dump cache.
+
+        Args:
+            directory: Directory holding the cache files (created on first write)
+        """
+        self._dir = directory
+        self._lock = threading.Lock()
+
+    def _base(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self._dir, key)
+
+    def _meta_path(self, url: str) -> str:
+        return self._base(url) + ".json"
+
+    def _rows_path(self, url: str) -> str:
+        return self._base(url) + ".rows.jsonl.gz"
+
+    def _ingested_rows_path(self, url: str) -> str:
+        return self._base(url) + ".ingested.jsonl.gz"
+
+    @staticmethod
+    def _read_rows(path: str) -> List[List[Optional[str]]]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def _write_rows(self, path: str, rows: List[List[Optional[str]]]) -> None:
+        os.makedirs(self._dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(",", ":")))
+                f.write("\n")
+        os.replace(tmp, path)
+
+    def meta(self, url: str) -> Dict[str, Any]:
+        """
+        Get the stored metadata for a dump URL.
+
+        Returns:
+            Metadata dictionary, or empty dict if nothing is cached
+        """
+        try:
+            with open(self._meta_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Dump cache metadata unreadable for {url}: {e}")
+            return {}
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        os.makedirs(self._dir, exist_ok=True)
+        tmp = self._meta_path(url) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path(url))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for revalidating a dump.
+
+        Headers are only returned when the parsed rows are on disk, so a 304
+        can always be answered from the cache.
+        """
+        meta = self.meta(url)
+        if not meta or not os.path.exists(self._rows_path(url)):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def content_hash(self, url: str) -> Optional[str]:
+        """Return the SHA-256 of the most recently downloaded dump, if known."""
+        return self.meta(url).get("sha256")
+
+    def load_rows(self, url: str) -> List[List[Optional[str]]]:
+        """
+        Load the parsed rows stored for a dump URL.
+
+        Raises:
+            OSError, ValueError: If the rows file is missing or corrupt
+        """
+        return self._read_rows(self._rows_path(url))
+
+    def save(self, url: str, rows: List[List[Optional[str]]], etag: Optional[str],
+             last_modified: Optional[str], sha256: Optional[str]) -> None:
+        """
+        Store parsed rows and revalidation metadata for a dump URL.
+
+        Files are written to a temporary name and renamed, so readers never
+        see a half-written dump.
+        """
+        with self._lock:
+            try:
+                self._write_rows(self._rows_path(url), rows)
+                meta = self.meta(url)
+                meta.update({
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "sha256": sha256,
+                    "rows": len(rows),
+                    "fetched_at": datetime.utcnow().isoformat(),
+                })
+                self._write_meta(url, meta)
+            except Exception as e:
+                logger.warning(f"Failed to write dump cache for {url}: {e}")
+
+    def touch(self, url: str) -> None:
+        """Record a successful revalidation (304) for a dump URL."""
+        with self._lock:
+            meta = self.meta(url)
+            if not meta:
+                return
+            meta["revalidated_at"] = datetime.utcnow().isoformat()
+            try:
+                self._write_meta(url, meta)
+            except Exception as e:
+                logger.warning(f"Failed to update dump cache metadata for {url}: {e}")
+
+    def last_ingested_hash(self, url: str) -> Optional[str]:
+        """Return the SHA-256 of the dump last ingested into Supabase, if any."""
+        return self.meta(url).get("ingested_sha256")
+
+    def last_ingested_dump_date(self, url: str) -> Optional[str]:
+        """Return the dump_date the last ingest was written under, if any."""
+        return self.meta(url).get("ingested_dump_date")
+
+    def load_ingested_rows(self, url: str) -> Optional[List[List[Optional[str]]]]:
+        """
+        Load the rows of the dump last ingested into Supabase.
+
+        Returns:
+            Parsed rows, or None if they were not kept or are unreadable
+        """
+        try:
+            return self._read_rows(self._ingested_rows_path(url))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ingested rows unreadable for {url}: {e}")
+            return None
+
+    def mark_ingested(self, url: str, sha256: Optional[str], dump_date: str,
+                      rows: Optional[List[List[Optional[str]]]] = None) -> None:
+        """
+        Remember which dump (by content hash) was ingested for which dump_date.
+
+        When the cached download is the ingested dump, the baseline is a hard
+        link to its rows file (which is only ever replaced, never rewritten in
+        place), so keeping it costs no extra write; otherwise rows are written.
+
+        Args:
+            url: Dump URL
+            sha256: Content hash of the ingested dump
+            dump_date: dump_date the rows were written under
+            rows: Parsed rows to keep as the baseline for the next delta ingest
+                (None drops the old baseline, so no delta is taken against it)
+        """
+        with self._lock:
+            kept = False
+            if rows is not None:
+                try:
+                    if not (sha256 and self.meta(url).get("sha256") == sha256
+                            and self._link_rows(url)):
+                        self._write_rows(self._ingested_rows_path(url), rows)
+                    kept = True
+                except Exception as e:
+                    logger.warning(f"Failed to keep ingested rows for {url}: {e}")
+            if not kept:
+                try:
+                    os.remove(self._ingested_rows_path(url))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to drop stale ingested rows for {url}: {e}")
+            meta = self.meta(url)
+            meta.update({
+                "url": url,
+                "ingested_sha256": sha256,
+                "ingested_dump_date": dump_date,
+                "ingested_at": datetime.utcnow().isoformat(),
+            })
+            try:
+                self._write_meta(url, meta)
+            except Exception as e:
+                logger.warning(f"Failed to record ingest in dump cache for {url}: {e}")
+
+    def _link_rows(self, url: str) -> bool:
+        """Make the cached rows file the ingest baseline; False if links are unsupported."""
+        tmp = self._ingested_rows_path(url) + ".tmp"
+        try:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            os.link(self._rows_path(url), tmp)
+        except OSError:
+            return False
+        os.replace(tmp, self._ingested_rows_path(url))
+        return True
+
+    def invalidate(self, url: str) -> None:
+        """Drop the cached rows and validators for a dump URL (ingest bookkeeping is kept)."""
+        with self._lock:
+            try:
+                os.remove(self._rows_path(url))
+            except FileNotFoundError:
+                pass
+            meta = self.meta(url)
+            if not meta:
+                return
+            for key in ("etag", "last_modified", "sha256", "rows", "fetched_at", "revalidated_at"):
+                meta.pop(key, None)
+            try:
+                self._write_meta(url, meta)
+            except Exception as e:
+                logger.warning(f"Failed to update dump cache metadata for {url}: {e}")
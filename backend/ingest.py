@@ -0,0 +1,246 @@
+"""Batched, concurrent and retrying upserts for bulk ingestion into Supabase."""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List
+
+import requests
+
+logger = logging.getLogger("bot")
+
+
+@dataclass
+class IngestStats:
+    """Outcome of one batched upsert run."""
+
+    rows: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    failed_rows: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    body_format: str = "json"
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True if every batch was written."""
+        return self.failed_batches == 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        """Throughput of successfully written rows."""
+        return (self.rows - self.failed_rows) / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary suitable for logs and JSON responses."""
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "failed_rows": self.failed_rows,
+            "retries": self.retries,
+            "seconds": round(self.seconds, 3),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+            "body_format": self.body_format,
+        }
+
+
+def _batches(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_field(v: Any) -> str:
+    if v is None:
+        return ""  # unquoted empty field: NULL
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, (int, float)):
+        return str(v)
+    return '"' + str(v).replace('"', '""') + '"'
+
+
+def rows_to_csv(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode rows as a CSV body for PostgREST (header line + one line per row).
+
+    Strings are always quoted and None is written as an unquoted empty
+    field, so empty strings stay distinct from NULL; booleans are written as
+    true/false.
+    """
+    columns = list(rows[0].keys())
+    lines = [",".join(columns)]
+    for row in rows:
+        lines.append(",".join(_csv_field(row.get(c)) for c in columns))
+    lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+class BatchUpserter:
+    """
+    Upsert a stream of rows in fixed-size batches with bounded concurrency.
+
+    Each batch is retried with exponential backoff and jitter. A failed batch
+    does not stop the others; the returned IngestStats report what failed.
+    """
+
+    def __init__(self, client, table: str, on_conflict: str, batch_size: int = 5000,
+                 max_workers: int = 4, max_retries: int = 3, backoff: float = 1.0,
+                 body_format: str = "json", rest_url: str = "", api_key: str = "",
+                 timeout: float = 60):
+        """
+        Initialize the batch upserter.
+
+        Args:
+            client: Supabase client (used for JSON batches)
+            table: Target table name
+            on_conflict: Comma-separated conflict columns for the upsert
+            batch_size: Rows per request
+            max_workers: Maximum batches in flight at once
+            max_retries: Retries per batch after the first attempt
+            backoff: Base delay in seconds (doubled on every retry)
+            body_format: "json" (via the Supabase client) or "csv" (PostgREST
+                text/csv body, smaller and cheaper to encode)
+            rest_url: Supabase project URL, required for CSV bodies
+            api_key: Supabase key, required for CSV bodies
+            timeout: HTTP timeout in seconds for CSV requests
+        """
+        self.client = client
+        self.table = table
+        self.on_conflict = on_conflict
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.body_format = body_format if body_format in ("json", "csv") else "json"
+        self.rest_url = rest_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+
+    # -------------------- Transports -------------------- #
+    def _send_json(self, batch: List[Dict[str, Any]]) -> None:
+        self.client.table(self.table).upsert(batch, on_conflict=self.on_conflict).execute()
+
+    def _send_csv(self, batch: List[Dict[str, Any]]) -> None:
+        res = self._http.post(
+            f"{self.rest_url}/rest/v1/{self.table}",
+            params={"on_conflict": self.on_conflict},
+            data=rows_to_csv(batch),
+            headers={
+                "apikey": self.api_key,
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "text/csv",
+                "Prefer": "resolution=merge-duplicates,return=minimal",
+            },
+            timeout=self.timeout,
+        )
+        if res.status_code == 415:
+            # Backend does not accept CSV: switch the rest of the run to JSON
+            with self._lock:
+                if self.body_format == "csv":
+                    logger.warning("CSV upload rejected (415); falling back to JSON bodies")
+                    self.body_format = "json"
+            self._send_json(batch)
+            return
+        res.raise_for_status()
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        if self.body_format == "csv":
+            self._send_csv(batch)
+        else:
+            self._send_json(batch)
+
+    # -------------------- Engine -------------------- #
+    def _send_with_retry(self, index: int, batch: List[Any], stats: IngestStats,
+                         send: Callable[[List[Any]], None]) -> bool:
+        attempt = 0
+        while True:
+            try:
+                send(batch)
+                return True
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error("Batch %d (%d rows) failed after %d attempts: %s",
+                                 index, len(batch), attempt + 1, e)
+                    with self._lock:
+                        stats.failed_batches += 1
+                        stats.failed_rows += len(batch)
+                        stats.errors.append(f"batch {index}: {e}")
+                    return False
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                logger.warning("Batch %d failed (%s); retry %d/%d in %.1fs",
+                               index, e, attempt + 1, self.max_retries, delay)
+                with self._lock:
+                    stats.retries += 1
+                attempt += 1
+                time.sleep(delay)
+
+    def _run(self, items: Iterable[Any], send: Callable[[List[Any]], None]) -> IngestStats:
+        stats = IngestStats(body_format=self.body_format)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest") as pool:
+            pending: Deque[Future] = deque()
+            for index, batch in enumerate(_batches(items, self.batch_size)):
+                stats.rows += len(batch)
+                stats.batches += 1
+                pending.append(pool.submit(self._send_with_retry, index, batch, stats, send))
+                # Bound the rows held in memory to what is actually in flight
+                while len(pending) >= self.max_workers * 2:
+                    pending.popleft().result()
+            for fut in pending:
+                fut.result()
+        stats.seconds = time.perf_counter() - start
+        stats.body_format = self.body_format
+        return stats
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> IngestStats:
+        """
+        Upsert all rows, consuming the iterable lazily.
+
+        Args:
+            rows: Row dictionaries (may be a generator)
+
+        Returns:
+            IngestStats for the run
+        """
+        stats = self._run(rows, self._send)
+        logger.info("Upserted %d rows into %s in %d batches: %.1fs, %.0f rows/s (%d retries, %d failed batches)",
+                    stats.rows - stats.failed_rows, self.table, stats.batches, stats.seconds,
+                    stats.rows_per_sec, stats.retries, stats.failed_batches)
+        return stats
+
+    def delete(self, key_column: str, keys: Iterable[Any], match: Dict[str, Any]) -> IngestStats:
+        """
+        Delete rows by key in batches, with the same concurrency and retries as upsert.
+
+        Args:
+            key_column: Column the keys refer to (e.g. "village_id")
+            keys: Key values to delete
+            match: Extra equality filters every deleted row must satisfy
+
+        Returns:
+            IngestStats for the run (rows = keys processed)
+        """
+        def send(batch: List[Any]) -> None:
+            query = self.client.table(self.table).delete()
+            for column, value in match.items():
+                query = query.eq(column, value)
+            query.in_(key_column, batch).execute()
+
+        stats = self._run(keys, send)
+        logger.info("Deleted %d keys from %s in %d batches (%d failed batches)",
+                    stats.rows - stats.failed_rows, self.table, stats.batches, stats.failed_batches)
+        return stats
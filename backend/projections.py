@@ -0,0 +1,34 @@
+"""Columns each endpoint reads, pushed down to Supabase selects and local scans."""
+from typing import Sequence, Tuple
+
+from backend.supabase_paging import DEFAULT_KEY
+
+# generate_svg_markers(): /api/markers and the region/alliance/player maps
+MARKERS: Tuple[str, ...] = (
+    "x", "y", "tribe", "village_name", "player_name", "alliance_tag", "population", "region",
+)
+# /api/alliances: village and member counts plus population per alliance
+ALLIANCES: Tuple[str, ...] = ("alliance_tag", "player_id", "population")
+# /api/region
+REGIONS: Tuple[str, ...] = ("region",)
+# /api/alliance
+ALLIANCE_TAGS: Tuple[str, ...] = ("alliance_tag",)
+
+
+def select_list(columns: Sequence[str], key: str = DEFAULT_KEY) -> str:
+    """
+    PostgREST select= value for a projection.
+
+    The keyset column is always included because iter_keyset() pages on it.
+
+    Args:
+        columns: Columns the endpoint reads
+        key: Paging key to add if missing
+
+    Returns:
+        Comma-separated column list, e.g. "village_id,alliance_tag,population"
+    """
+    cols = list(columns)
+    if key not in cols:
+        cols.insert(0, key)
+    return ",".join(cols)
@@ -2,6 +2,9 @@
 from functools import wraps
 from flask import request, jsonify
 
+# WSGI environ flag set on internal cache pre-warm requests, which are exempt from rate limits
+PREWARM_ENVIRON_KEY = "travistat.prewarm"
+
 
 def setup_rate_limiter(app, config):
     """Set up Flask-Limiter for rate limiting."""
@@ -26,6 +29,7 @@ def setup_rate_limiter(app, config):
             storage_uri=config.REDIS_URL if config.REDIS_URL else "memory://",
             strategy="fixed-window"
         )
+        limiter.request_filter(lambda: bool(request.environ.get(PREWARM_ENVIRON_KEY)))
         
         return limiter
     except ImportError:
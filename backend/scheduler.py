@@ -0,0 +1,97 @@
+"""Periodic background job runner used for scheduled ingestion."""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("bot")
+
+
+class IngestScheduler:
+    """
+    Run a job on a fixed cadence in a daemon thread, off the request path.
+
+    A run that fails is logged and the schedule continues. Runs never
+    overlap: the next wait starts only after the previous run returned.
+    """
+
+    def __init__(self, job: Callable[[], Any], interval: float,
+                 initial_delay: float = 0.0, name: str = "ingest-scheduler"):
+        """
+        Initialize the scheduler.
+
+        Args:
+            job: Callable to run (e.g. an ingest of every world)
+            interval: Seconds between the end of one run and the start of the next
+            initial_delay: Seconds to wait before the first run
+            name: Thread name, also used in log lines
+        """
+        self.job = job
+        self.interval = max(1.0, interval)
+        self.initial_delay = max(0.0, initial_delay)
+        self.name = name
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.last_started: Optional[datetime] = None
+        self.last_finished: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.last_seconds = 0.0
+
+    def run_once(self) -> None:
+        """Run the job now, recording its outcome."""
+        start = time.perf_counter()
+        with self._lock:
+            self.last_started = datetime.utcnow()
+        try:
+            self.job()
+            error = None
+        except Exception as e:
+            logger.error("%s: run failed: %s", self.name, e, exc_info=True)
+            error = str(e)
+        with self._lock:
+            self.runs += 1
+            self.failures += error is not None
+            self.last_error = error
+            self.last_finished = datetime.utcnow()
+            self.last_seconds = time.perf_counter() - start
+
+    def run_forever(self) -> None:
+        """Run the schedule in the calling thread until stop() is called."""
+        logger.info("%s: running every %.0fs", self.name, self.interval)
+        if self._stop.wait(self.initial_delay):
+            return
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Start the schedule in a daemon thread (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the schedule; a run in progress is allowed to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Summary for health endpoints and logs."""
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "interval_seconds": self.interval,
+                "runs": self.runs,
+                "failures": self.failures,
+                "last_started": self.last_started.isoformat() if self.last_started else None,
+                "last_finished": self.last_finished.isoformat() if self.last_finished else None,
+                "last_seconds": round(self.last_seconds, 3),
+                "last_error": self.last_error,
+            }
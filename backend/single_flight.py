@@ -0,0 +1,90 @@
+"""In-process request coalescing: one computation per key, shared by concurrent callers."""
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("bot")
+
+
+class _Flight:
+    """One in-flight computation and the callers waiting on it."""
+
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it runs wait and receive the same result, or the same
+    exception. Nothing is cached: once the leader finishes, the next call
+    for the key starts a new flight.
+    """
+
+    def __init__(self, name: str = "single-flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the computation (e.g. the Redis cache key)
+            fn: Computation to run if no flight for key is in progress
+
+        Returns:
+            (value, shared): shared is True if this caller waited on another
+            caller's execution instead of running fn itself
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every waiting caller
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            flight.value = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.info("%s: %d request(s) coalesced into %s", self.name, flight.waiters, key)
+        return flight.value, False
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for health endpoints."""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
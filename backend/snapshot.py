@@ -0,0 +1,595 @@
+"""Columnar in-memory snapshot of the village table."""
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional: scans fall back to plain Python loops
+    np = None
+
+logger = logging.getLogger("bot")
+
+# Columns stored as packed integers / booleans. Everything else (tribe,
+# region, alliance_tag, player_name, village_name, dump_date, ...) is
+# dictionary-encoded: one small list of distinct values plus a code per row.
+INT_COLUMNS = frozenset({
+    "field_id", "x", "y", "village_id", "player_id", "alliance_id",
+    "population", "victory_points",
+})
+BOOL_COLUMNS = frozenset({"capital", "city", "harbor"})
+
+# Binary snapshot file: magic, header length, JSON header, then one 8-byte
+# aligned buffer per packed column (native byte order, recorded in the header).
+_MAGIC = b"TVSNAP1\n"
+_ALIGN = 8
+
+
+def _typecode(data: Any) -> str:
+    """Element type of an array.array or a memoryview cast over a mapped file."""
+    return data.typecode if isinstance(data, array) else data.format
+
+
+class _Column:
+    """One column of a snapshot, built by appending values row by row."""
+
+    __slots__ = ("kind", "data", "values", "_index")
+
+    def __init__(self, kind: str, fill: int = 0):
+        self.kind = kind
+        self.values: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        if kind == "int":
+            self.data: Any = array("i")
+        elif kind == "bool":
+            self.data = array("b")
+        else:
+            self.kind = "dict"
+            self.data = array("I")
+        for _ in range(fill):
+            self.append(None)
+
+    def append(self, value: Any) -> None:
+        kind = self.kind
+        if kind == "int" and type(value) is int:
+            try:
+                self.data.append(value)
+            except OverflowError:
+                self.data = array("q", self.data)
+                self.data.append(value)
+            return
+        if kind == "bool" and type(value) is bool:
+            self.data.append(value)
+            return
+        if kind == "list":
+            self.data.append(value)
+            return
+        if kind != "dict":
+            # A value that does not fit the packed type (None, str, ...)
+            self._to_dict()
+        try:
+            code = self._index.get(value)
+        except TypeError:
+            # Unhashable values (JSON columns) are kept as a plain list
+            self._to_list()
+            self.data.append(value)
+            return
+        if code is None:
+            code = len(self.values)
+            self._index[value] = code
+            self.values.append(value)
+        self.data.append(code)
+
+    def _to_dict(self) -> None:
+        old = [bool(v) for v in self.data] if self.kind == "bool" else list(self.data)
+        self.kind, self.data = "dict", array("I")
+        for v in old:
+            self.append(v)
+
+    def _to_list(self) -> None:
+        self.data = [self.values[c] for c in self.data]
+        self.kind, self.values, self._index = "list", [], {}
+
+    def finish(self) -> None:
+        """Drop the build-time lookup table."""
+        self._index = {}
+
+    @classmethod
+    def loaded(cls, kind: str, data: Any, values: List[Any]) -> "_Column":
+        """Wrap column data read back from a snapshot file."""
+        col = cls.__new__(cls)
+        col.kind, col.data, col.values, col._index = kind, data, values, {}
+        return col
+
+    def get(self, i: int) -> Any:
+        if self.kind == "dict":
+            return self.values[self.data[i]]
+        if self.kind == "bool":
+            return bool(self.data[i])
+        return self.data[i]
+
+    @property
+    def nbytes(self) -> int:
+        if self.kind == "list":
+            return sys.getsizeof(self.data)
+        size = self.data.itemsize * len(self.data)
+        return size + sum(sys.getsizeof(v) for v in self.values)
+
+
+class VillageRow(Mapping):
+    """Read-only mapping view of one snapshot row (no per-row dict is built)."""
+
+    __slots__ = ("_snapshot", "_i")
+
+    def __init__(self, snapshot: "VillageSnapshot", i: int):
+        self._snapshot = snapshot
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        col = self._snapshot._columns.get(key)
+        if col is None:
+            raise KeyError(key)
+        return col.get(self._i)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot._order)
+
+    def __len__(self) -> int:
+        return len(self._snapshot._order)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the row as a plain (mutable, JSON-serializable) dict."""
+        return self._snapshot._row_dict(self._i)
+
+
+class VillageSnapshot(Sequence):
+    """
+    The village table held column by column instead of as a list of dicts.
+
+    Numeric and boolean columns are packed arrays; string columns are
+    dictionary-encoded, which suits tribe/region/alliance/player names that
+    repeat across many villages. Indexing and iteration return fresh dicts,
+    so code written against a list of dicts keeps working (and may mutate
+    what it gets back); rows() yields read-only views for cheap scans, and
+    where()/distinct() evaluate predicates once per distinct value rather
+    than once per village.
+    """
+
+    def __init__(self, order: List[str], columns: Dict[str, _Column], length: int):
+        self.meta: Dict[str, Any] = {}
+        self._order = order
+        self._columns = columns
+        self._len = length
+        self._mmap: Optional[mmap.mmap] = None
+        # order -> (sort keys, row numbers) of the whole table, see sorted_indices()
+        self._sorted: Dict[Tuple[Tuple[str, bool], ...], Tuple[List[tuple], List[int]]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping]) -> "VillageSnapshot":
+        """
+        Build a snapshot from row mappings (consumed lazily).
+
+        Key order follows first appearance. A key missing from some rows is
+        stored as None for those rows.
+
+        Args:
+            rows: Village dictionaries, e.g. Supabase rows or converted SQL rows
+
+        Returns:
+            VillageSnapshot holding the same data
+        """
+        order: List[str] = []
+        columns: Dict[str, _Column] = {}
+        n = 0
+        for row in rows:
+            for key in row:
+                if key not in columns:
+                    kind = "int" if key in INT_COLUMNS else "bool" if key in BOOL_COLUMNS else "dict"
+                    columns[key] = _Column(kind, fill=n)
+                    order.append(key)
+            for key in order:
+                columns[key].append(row.get(key))
+            n += 1
+        for col in columns.values():
+            col.finish()
+        return cls(order, columns, n)
+
+    @classmethod
+    def from_columns(cls, columns: Iterable[tuple], length: int) -> "VillageSnapshot":
+        """
+        Wrap columns that were already converted and packed by the caller.
+
+        Args:
+            columns: (name, kind, data, values) tuples in row key order, where
+                kind is "int" (array of ints), "bool" (array("b")), "dict"
+                (array("I") codes into values) or "list" (plain values)
+            length: Number of rows; every data buffer must hold this many items
+
+        Returns:
+            VillageSnapshot over the given buffers (not copied)
+        """
+        order: List[str] = []
+        packed: Dict[str, _Column] = {}
+        for name, kind, data, values in columns:
+            if len(data) != length:
+                raise ValueError(f"Column {name!r} has {len(data)} rows, expected {length}")
+            packed[name] = _Column.loaded(kind, data, list(values))
+            order.append(name)
+        return cls(order, packed, length)
+
+    # -------------------- Sequence protocol -------------------- #
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(i, slice):
+            return [self._row_dict(j) for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("snapshot index out of range")
+        return self._row_dict(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._len):
+            yield self._row_dict(i)
+
+    def _row_dict(self, i: int) -> Dict[str, Any]:
+        cols = self._columns
+        return {key: cols[key].get(i) for key in self._order}
+
+    # -------------------- Columnar access -------------------- #
+    @property
+    def columns(self) -> List[str]:
+        """Column names in row key order."""
+        return list(self._order)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the column data."""
+        return sum(col.nbytes for col in self._columns.values())
+
+    def row(self, i: int) -> VillageRow:
+        """Read-only view of row i."""
+        return VillageRow(self, i)
+
+    def rows(self) -> Iterator[VillageRow]:
+        """Yield read-only views of every row, in order."""
+        for i in range(self._len):
+            yield VillageRow(self, i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Materialize every row as a plain dict."""
+        return [self._row_dict(i) for i in range(self._len)]
+
+    def project(self, columns: Sequence[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every row as a dict holding only the given columns.
+
+        Each column is decoded once up front, so this is much cheaper than
+        building full rows when a caller needs a few fields. Values are plain
+        Python objects (never NumPy scalars); a missing column reads as None.
+        """
+        decoded = []
+        for name in columns:
+            col = self._columns.get(name)
+            if col is None:
+                decoded.append([None] * self._len)
+            elif col.kind == "dict":
+                values = col.values
+                decoded.append([values[c] for c in col.data])
+            elif col.kind == "bool":
+                decoded.append([bool(v) for v in col.data])
+            else:
+                decoded.append(list(col.data))
+        keys = tuple(columns)
+        for values in zip(*decoded):
+            yield dict(zip(keys, values))
+
+    def column(self, name: str) -> Any:
+        """
+        Return a whole column.
+
+        Packed columns come back as a NumPy array sharing the column's memory
+        when NumPy is installed (otherwise as the array.array itself), so
+        callers can run vectorized arithmetic on them. Dictionary-encoded
+        columns are decoded to a list.
+
+        Raises:
+            KeyError: If the column does not exist
+        """
+        col = self._columns[name]
+        if col.kind == "dict":
+            values = col.values
+            return [values[c] for c in col.data]
+        if col.kind == "list":
+            return list(col.data)
+        if np is not None:
+            arr = np.frombuffer(col.data, dtype=_typecode(col.data))
+            return arr.astype(bool) if col.kind == "bool" else arr
+        return col.data
+
+    def distinct(self, name: str) -> List[Any]:
+        """Distinct values of a column (in order of first appearance)."""
+        col = self._columns.get(name)
+        if col is None:
+            return []
+        if col.kind == "dict":
+            return list(col.values)
+        return list(dict.fromkeys(col.get(i) for i in range(self._len)))
+
+    def indices(self, name: str, predicate: Callable[[Any], bool]) -> List[int]:
+        """
+        Row numbers whose value in a column satisfies predicate.
+
+        For dictionary-encoded columns the predicate runs once per distinct
+        value and the per-row work is a code lookup (vectorized with NumPy
+        when available).
+        """
+        col = self._columns.get(name)
+        if col is None:
+            return [i for i in range(self._len) if predicate(None)]
+        if col.kind != "dict":
+            return [i for i in range(self._len) if predicate(col.get(i))]
+        wanted = [code for code, value in enumerate(col.values) if predicate(value)]
+        if not wanted:
+            return []
+        if len(wanted) == len(col.values):
+            return list(range(self._len))
+        if np is not None:
+            codes = np.frombuffer(col.data, dtype=_typecode(col.data))
+            return np.flatnonzero(np.isin(codes, wanted)).tolist()
+        hits = set(wanted)
+        return [i for i, c in enumerate(col.data) if c in hits]
+
+    def matching(self, filters: Sequence[Tuple[str, Callable[[Any], bool]]]) -> Optional[List[int]]:
+        """Row numbers passing every (column, predicate) filter, or None if there are no filters."""
+        selected: Optional[List[int]] = None
+        for name, predicate in filters:
+            hits = self.indices(name, predicate)
+            if selected is None:
+                selected = hits
+            else:
+                keep = set(hits)
+                selected = [i for i in selected if i in keep]
+        return selected
+
+    def sort_key(self, i: int, order: Sequence[Tuple[str, bool]]) -> tuple:
+        """Sort key of row i for an order of (numeric column, descending) pairs (see order_key)."""
+        values = []
+        for name, _ in order:
+            col = self._columns.get(name)
+            values.append(col.get(i) if col is not None else None)
+        return order_key(values, order)
+
+    def sorted_indices(self, order: Sequence[Tuple[str, bool]],
+                       indices: Optional[Sequence[int]] = None) -> Tuple[List[tuple], List[int]]:
+        """
+        Row numbers sorted by (numeric column, descending) pairs, with their sort keys.
+
+        The order of the whole table is computed once and kept on the
+        snapshot (which never changes), so later windows over it are a bisect
+        on the keys and a slice. A subset of rows is sorted on its own.
+
+        Args:
+            order: Columns to sort by; the last one should be unique (e.g.
+                village_id) for a total order
+            indices: Rows to sort (None = every row)
+
+        Returns:
+            (keys, row numbers), both in sorted order (see sort_key())
+        """
+        order = tuple(order)
+        if indices is None:
+            cached = self._sorted.get(order)
+            if cached is None:
+                pairs = sorted((self.sort_key(i, order), i) for i in range(self._len))
+                cached = self._sorted[order] = ([k for k, _ in pairs], [i for _, i in pairs])
+            return cached
+        pairs = sorted((self.sort_key(i, order), i) for i in indices)
+        return [k for k, _ in pairs], [i for _, i in pairs]
+
+    def take(self, indices: Iterable[int],
+             columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Materialize the given rows as dicts (of just columns, if given)."""
+        if not columns:
+            return [self._row_dict(i) for i in indices]
+        cols = [(name, self._columns.get(name)) for name in columns]
+        return [{name: col.get(i) if col is not None else None for name, col in cols}
+                for i in indices]
+
+    def where(self, name: str, predicate: Callable[[Any], bool],
+              columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows (as dicts) whose value in a column satisfies predicate."""
+        return self.take(self.indices(name, predicate), columns)
+
+    # -------------------- Binary snapshot files -------------------- #
+    def save(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Write the snapshot to a binary file that open() can memory-map.
+
+        The file is written under a temporary name and renamed, so a reader
+        never maps a half-written snapshot.
+
+        Args:
+            path: Destination file
+            meta: Extra JSON-serializable metadata stored in the header
+        """
+        columns, buffers, offset = [], [], 0
+        for name in self._order:
+            col = self._columns[name]
+            entry: Dict[str, Any] = {"name": name, "kind": col.kind}
+            if col.kind == "list":
+                entry["values"] = list(col.data)
+            else:
+                if col.kind == "dict":
+                    entry["values"] = col.values
+                raw = memoryview(col.data).cast("B")
+                entry.update({"typecode": _typecode(col.data), "offset": offset, "nbytes": len(raw)})
+                buffers.append((offset, raw))
+                offset += -(-len(raw) // _ALIGN) * _ALIGN
+            columns.append(entry)
+        header = json.dumps({
+            "rows": self._len,
+            "byteorder": sys.byteorder,
+            "meta": meta or {},
+            "columns": columns,
+        }, separators=(",", ":")).encode("utf-8")
+        start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for pos, raw in buffers:
+                f.seek(start + pos)
+                f.write(raw)
+            f.truncate(start + offset)
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str) -> "VillageSnapshot":
+        """
+        Memory-map a snapshot file written by save().
+
+        Packed columns are served straight from the page cache, so opening
+        is nearly free and the data is only paged in when it is touched.
+        Dictionary values are read from the header.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a snapshot or was written on a
+                machine with another byte order
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"empty snapshot file: {path}")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(_MAGIC)] != _MAGIC:
+            mm.close()
+            raise ValueError(f"not a snapshot file: {path}")
+        (header_len,) = struct.unpack_from("<Q", mm, len(_MAGIC))
+        header_end = len(_MAGIC) + 8 + header_len
+        header = json.loads(bytes(mm[len(_MAGIC) + 8:header_end]).decode("utf-8"))
+        if header.get("byteorder") != sys.byteorder:
+            mm.close()
+            raise ValueError(f"snapshot byte order mismatch: {path}")
+        start = -(-header_end // _ALIGN) * _ALIGN
+        view = memoryview(mm)
+
+        order: List[str] = []
+        columns: Dict[str, _Column] = {}
+        for entry in header["columns"]:
+            name, kind = entry["name"], entry["kind"]
+            if kind == "list":
+                data: Any = entry["values"]
+                values: List[Any] = []
+            else:
+                pos = start + entry["offset"]
+                data = view[pos:pos + entry["nbytes"]].cast(entry["typecode"])
+                values = entry.get("values", [])
+            order.append(name)
+            columns[name] = _Column.loaded(kind, data, values)
+        snapshot = cls(order, columns, header["rows"])
+        snapshot.meta = header.get("meta", {})
+        snapshot._mmap = mm
+        return snapshot
+
+
+def order_key(values: Sequence[Any], order: Sequence[Tuple[str, bool]]) -> tuple:
+    """
+    Key that sorts ascending in an order of (numeric column, descending) pairs.
+
+    Descending values are negated, and NULLs sort last in either direction
+    (ORDER BY ... NULLS LAST), so local sorts agree with the keyset pages
+    fetch_sorted() reads from Postgres.
+
+    Args:
+        values: The row's value for each column of order (None for NULL)
+        order: (column, descending) pairs
+    """
+    key: List[Any] = []
+    for value, (_, descending) in zip(values, order):
+        if value is None:
+            key.extend((1, 0))
+        else:
+            key.extend((0, -value if descending else value))
+    return tuple(key)
+
+
+def filter_rows(rows: Sequence[Mapping], name: str, predicate: Callable[[Any], bool],
+                columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Filter villages on one column, using the columnar path for snapshots.
+
+    Args:
+        rows: VillageSnapshot or list of village dicts
+        name: Column to test
+        predicate: Called with the column value (None if missing)
+        columns: Projection for rows materialized from a snapshot (None = all);
+            plain dicts are returned as they are
+
+    Returns:
+        Matching rows as dicts
+    """
+    if isinstance(rows, VillageSnapshot):
+        return rows.where(name, predicate, columns)
+    return [r for r in rows if predicate(r.get(name))]
+
+
+def iter_filtered(rows: Sequence[Mapping],
+                  filters: Sequence[Tuple[str, Callable[[Any], bool]]] = ()) -> Iterator[Dict[str, Any]]:
+    """
+    Yield villages passing every (column, predicate) filter, one fresh dict at a time.
+
+    A snapshot resolves the filters to row numbers on the columnar path and
+    builds each dict only when it is yielded, so a caller streaming the
+    result never holds more than one materialized row.
+
+    Args:
+        rows: VillageSnapshot or row mappings
+        filters: (column, predicate) pairs, as for filter_rows()
+    """
+    if isinstance(rows, VillageSnapshot):
+        selected = rows.matching(filters)
+        for i in range(len(rows)) if selected is None else selected:
+            yield rows[i]
+        return
+    for r in rows:
+        if all(predicate(r.get(name)) for name, predicate in filters):
+            yield dict(r)
+
+
+def scan(rows: Sequence[Mapping], columns: Optional[Sequence[str]] = None) -> Iterable[Mapping]:
+    """
+    Iterate villages read-only: views for snapshots, the rows themselves otherwise.
+
+    Args:
+        rows: VillageSnapshot or row mappings
+        columns: Columns the caller reads; a snapshot then yields small dicts
+            of just those columns (see VillageSnapshot.project)
+    """
+    if isinstance(rows, VillageSnapshot):
+        return rows.project(columns) if columns else rows.rows()
+    return rows
+
+
+def distinct(rows: Sequence[Mapping], name: str) -> List[Any]:
+    """Distinct values of one column (a snapshot reads its dictionary, not every row)."""
+    if isinstance(rows, VillageSnapshot):
+        return rows.distinct(name)
+    return list(dict.fromkeys(r.get(name) for r in rows))
+
+
+def materialize(rows: Optional[Sequence[Mapping]]) -> List[Dict[str, Any]]:
+    """Return rows as a mutable list of dicts (snapshots are expanded)."""
+    if isinstance(rows, VillageSnapshot):
+        return rows.to_dicts()
+    return rows if isinstance(rows, list) else list(rows or [])
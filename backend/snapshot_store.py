@@ -0,0 +1,85 @@
+"""Directory of persisted village snapshots, one binary file per source and dump_date."""
+import logging
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from backend.snapshot import VillageSnapshot
+
+logger = logging.getLogger("bot")
+
+_NAME_RE = re.compile(r"^(?P<source>[a-z0-9_-]+)-(?P<dump_date>\d{4}-\d{2}-\d{2})\.snap$")
+
+
+class SnapshotStore:
+    """
+    Thread-safe store of VillageSnapshot files for warm restarts.
+
+    Files are named <source>-<dump_date>.snap (e.g. supabase-2024-05-01.snap);
+    only the newest keep files per source are retained.
+    """
+
+    def __init__(self, directory: str, keep: int = 3):
+        """
+        Initialize snapshot store.
+
+        Args:
+            directory: Directory holding the snapshot files (created on first write)
+            keep: Number of dump_dates to retain per source
+        """
+        self._dir = directory
+        self._keep = max(1, keep)
+        self._lock = threading.Lock()
+
+    def path(self, source: str, dump_date: str) -> str:
+        """Return the file path for a source and dump_date."""
+        return os.path.join(self._dir, f"{source}-{dump_date}.snap")
+
+    def dump_dates(self, source: str) -> List[str]:
+        """Return the dump_dates stored for a source, newest first."""
+        try:
+            names = os.listdir(self._dir)
+        except FileNotFoundError:
+            return []
+        dates = []
+        for name in names:
+            m = _NAME_RE.match(name)
+            if m and m.group("source") == source:
+                dates.append(m.group("dump_date"))
+        return sorted(dates, reverse=True)
+
+    def save(self, source: str, dump_date: str, snapshot: VillageSnapshot) -> None:
+        """
+        Persist a snapshot and prune older dump_dates of the same source.
+
+        Failures are logged and swallowed: persistence is an optimization.
+        """
+        with self._lock:
+            try:
+                os.makedirs(self._dir, exist_ok=True)
+                snapshot.save(self.path(source, dump_date),
+                              meta={"source": source, "dump_date": dump_date})
+            except Exception as e:
+                logger.warning(f"Failed to persist {source} snapshot for {dump_date}: {e}")
+                return
+            for old in self.dump_dates(source)[self._keep:]:
+                try:
+                    os.remove(self.path(source, old))
+                except OSError as e:
+                    logger.warning(f"Failed to prune {source} snapshot for {old}: {e}")
+        logger.info("Persisted %s snapshot for %s (%d rows)", source, dump_date, len(snapshot))
+
+    def load_latest(self, source: str) -> Optional[Tuple[str, VillageSnapshot]]:
+        """
+        Memory-map the newest readable snapshot of a source.
+
+        Returns:
+            (dump_date, snapshot), or None if no usable file exists
+        """
+        for dump_date in self.dump_dates(source):
+            try:
+                return dump_date, VillageSnapshot.open(self.path(source, dump_date))
+            except Exception as e:
+                logger.warning(f"Snapshot {source} {dump_date} unreadable: {e}")
+        return None
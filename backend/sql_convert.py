@@ -0,0 +1,183 @@
+"""Typed conversion of parsed map.sql rows, row by row or a whole dump at once."""
+import logging
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.snapshot import VillageSnapshot
+
+logger = logging.getLogger("bot")
+
+# map.sql column order and the type each column is converted to
+SQL_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("field_id", "int"), ("x", "int"), ("y", "int"), ("tribe", "str"),
+    ("village_id", "int"), ("village_name", "str"), ("player_id", "int"),
+    ("player_name", "str"), ("alliance_id", "int"), ("alliance_tag", "str"),
+    ("population", "int"), ("region", "str"), ("capital", "bool"),
+    ("city", "bool"), ("harbor", "bool"), ("victory_points", "int"),
+)
+
+# int(float(v)) is only exact up to 2**53; larger values take the slow path
+_EXACT_FLOAT_INT = 2 ** 53
+
+
+def strip_quotes(s: Optional[str]) -> Optional[str]:
+    """
+    Remove surrounding quotes from a string and handle escaped quotes.
+
+    Args:
+        s: String that may be quoted
+
+    Returns:
+        Unquoted string or original value if not quoted
+    """
+    if not s: return s
+    if s.startswith("'") and s.endswith("'"):
+        return s[1:-1].replace("''", "'")
+    return s
+
+def parse_int(v: Optional[str]) -> int:
+    """
+    Parse a string value to integer with safe fallback.
+
+    Args:
+        v: String value to parse (may be None)
+
+    Returns:
+        Parsed integer or 0 if parsing fails
+    """
+    try: return int(float(v)) if v is not None else 0
+    except: return 0
+
+def parse_bool(v: Optional[str]) -> bool:
+    """
+    Parse a string value to boolean.
+
+    Handles "TRUE", "FALSE", "1", "0", and None values.
+
+    Args:
+        v: String value to parse (may be None)
+
+    Returns:
+        Boolean value (False for None or invalid values)
+    """
+    if v is None: return False
+    s = v.upper()
+    if s in ("1","0"): return bool(int(s))
+    return s == "TRUE"
+
+def sql_row_to_dict(r: List[Optional[str]]) -> Dict[str,Any]:
+    """
+    Convert a parsed SQL row to a dictionary with typed fields.
+
+    Maps SQL dump columns to dictionary keys with appropriate type conversion.
+    Expected columns: field_id, x, y, tribe, village_id, village_name, player_id,
+    player_name, alliance_id, alliance_tag, population, region, capital, city,
+    harbor, victory_points (16 total).
+
+    Args:
+        r: List of field values from parsed SQL row
+
+    Returns:
+        Dictionary with village data
+    """
+    return {
+        "field_id":      parse_int(r[0]),
+        "x":             parse_int(r[1]),
+        "y":             parse_int(r[2]),
+        "tribe":         strip_quotes(r[3])  or "",
+        "village_id":    parse_int(r[4]),
+        "village_name":  strip_quotes(r[5])  or "",
+        "player_id":     parse_int(r[6]),
+        "player_name":   strip_quotes(r[7])  or "",
+        "alliance_id":   parse_int(r[8]),
+        "alliance_tag":  strip_quotes(r[9])  or "",
+        "population":    parse_int(r[10]),
+        "region":        strip_quotes(r[11]) or "",
+        "capital":       parse_bool(r[12]),
+        "city":          parse_bool(r[13]),
+        "harbor":        parse_bool(r[14]),
+        "victory_points":parse_int(r[15]),
+        "dump_date":     ""
+    }
+
+
+class _Encoder(dict):
+    """Dictionary-encodes raw values: looking up a new value assigns the next code."""
+
+    def __missing__(self, key: Any) -> int:
+        code = self[key] = len(self)
+        return code
+
+
+def _int_column(raw: Sequence[Optional[str]]) -> array:
+    """Convert a column of raw integer strings with parse_int semantics."""
+    try:
+        # int() runs in C and agrees with int(float(v)) for plain integers
+        # small enough to be exact as floats
+        data = array("q", map(int, raw))
+        if data and (max(data) >= _EXACT_FLOAT_INT or min(data) <= -_EXACT_FLOAT_INT):
+            raise ValueError("beyond float precision")
+    except (TypeError, ValueError):
+        # NULLs, decimals or garbage somewhere in the column: convert one by one
+        data = array("q", map(parse_int, raw))
+    try:
+        return array("i", data)
+    except OverflowError:
+        return data
+
+
+def _encoded(raw: Sequence[Optional[str]],
+             convert: Callable[[Optional[str]], Any]) -> Tuple[array, List[Any]]:
+    """
+    Dictionary-encode a raw column, converting each distinct raw value once.
+
+    Returns:
+        (codes, values) with values[codes[i]] == convert(raw[i])
+    """
+    encoder = _Encoder()
+    codes = array("I", map(encoder.__getitem__, raw))
+    converted = [convert(v) for v in encoder]
+    # Different raw spellings ("'A'" and "A") can convert to the same value
+    index: Dict[Any, int] = {}
+    remap = [index.setdefault(v, len(index)) for v in converted]
+    if len(index) < len(converted):
+        codes = array("I", map(remap.__getitem__, codes))
+    return codes, list(index)
+
+
+def _str_value(v: Optional[str]) -> str:
+    return strip_quotes(v) or ""
+
+
+def sql_rows_to_snapshot(rows: Sequence[Sequence[Optional[str]]],
+                         dump_date: str = "") -> VillageSnapshot:
+    """
+    Convert a whole parsed dump to a VillageSnapshot column by column.
+
+    Produces the same values as VillageSnapshot.from_rows(sql_row_to_dict(r)
+    for r in rows), but integer columns are converted by int() over the whole
+    column and string/boolean columns convert each distinct raw value once
+    instead of once per row.
+
+    Args:
+        rows: Parsed SQL rows (at least 16 fields each)
+        dump_date: Value of the dump_date column for every row
+
+    Returns:
+        VillageSnapshot with the sql_row_to_dict keys, in the same order
+    """
+    n = len(rows)
+    raw_columns = list(zip(*rows)) if n else [() for _ in SQL_COLUMNS]
+    columns: List[tuple] = []
+    for (name, kind), raw in zip(SQL_COLUMNS, raw_columns):
+        if kind == "int":
+            columns.append((name, "int", _int_column(raw), ()))
+        elif kind == "bool":
+            codes, values = _encoded(raw, parse_bool)
+            lut = [int(v) for v in values]
+            columns.append((name, "bool", array("b", map(lut.__getitem__, codes)), ()))
+        else:
+            codes, values = _encoded(raw, _str_value)
+            columns.append((name, "dict", codes, values))
+    columns.append(("dump_date", "dict", array("I", [0]) * n, [dump_date]))
+    return VillageSnapshot.from_columns(columns, n)
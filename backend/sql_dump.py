@@ -0,0 +1,181 @@
+"""Streaming download of the Travian map.sql dump."""
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+from backend.sql_parser import iter_sql_rows, iter_sql_rows_parallel
+
+logger = logging.getLogger("bot")
+
+
+class DumpUnchanged(Exception):
+    """The dump is byte-identical to a known version (raised instead of parsing it)."""
+
+    def __init__(self, sha256: str):
+        super().__init__(f"dump unchanged (sha256 {sha256[:12]})")
+        self.sha256 = sha256
+
+
+def _response_encoding(res: requests.Response) -> str:
+    """
+    Pick the text encoding for a dump response.
+
+    requests assumes ISO-8859-1 for text/* bodies without a charset; the
+    Travian dumps are UTF-8, so only trust an explicitly declared charset.
+    """
+    content_type = res.headers.get("Content-Type", "")
+    if "charset" in content_type.lower() and res.encoding:
+        return res.encoding
+    return "utf-8"
+
+
+def iter_response_lines(res: requests.Response, chunk_size: int, hasher: Optional[Any] = None) -> Iterator[str]:
+    """
+    Yield decoded lines from a streamed response body as chunks arrive.
+
+    Args:
+        res: Response opened with stream=True
+        chunk_size: Number of bytes to read per network chunk
+        hasher: Optional hashlib object updated with every raw chunk
+
+    Yields:
+        One line of the body at a time (without the line terminator)
+    """
+    return iter_chunk_lines(res.iter_content(chunk_size=chunk_size), _response_encoding(res), hasher)
+
+
+def iter_chunk_lines(chunks: Iterable[bytes], encoding: str, hasher: Optional[Any] = None) -> Iterator[str]:
+    """Yield decoded lines from raw body chunks (see iter_response_lines)."""
+    tail = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if hasher is not None:
+            hasher.update(chunk)
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.decode(encoding, errors="replace")
+    if tail:
+        yield tail.decode(encoding, errors="replace")
+
+
+class DumpDownload:
+    """
+    A (possibly conditional) streaming download of a map.sql dump.
+
+    Use as a context manager. When the server answers 304 Not Modified,
+    not_modified is True and rows() must not be called. Otherwise rows()
+    streams parsed rows, and sha256 holds the hash of the raw body once
+    rows() has been exhausted. spool() instead reads the body (and its
+    hash) before anything is parsed.
+    """
+
+    def __init__(self, url: str, timeout: float = 15, chunk_size: int = 256 * 1024,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        Initialize a dump download.
+
+        Args:
+            url: Location of the map.sql dump
+            timeout: Connect/read timeout in seconds
+            chunk_size: Number of bytes to read per network chunk
+            headers: Extra request headers (e.g. If-None-Match)
+        """
+        self.url = url
+        self._timeout = timeout
+        self._chunk_size = chunk_size
+        self._headers = headers or {}
+        self._res: Optional[requests.Response] = None
+        self._spool: Optional[Any] = None
+        self.sha256: Optional[str] = None
+
+    def __enter__(self) -> "DumpDownload":
+        self._res = requests.get(self.url, timeout=self._timeout, stream=True, headers=self._headers)
+        if self._res.status_code != 304:
+            self._res.raise_for_status()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._spool is not None:
+            self._spool.close()
+        if self._res is not None:
+            self._res.close()
+
+    @property
+    def not_modified(self) -> bool:
+        """True if the server confirmed the cached copy is current."""
+        return self._res is not None and self._res.status_code == 304
+
+    @property
+    def etag(self) -> Optional[str]:
+        """ETag response header, if any."""
+        return self._res.headers.get("ETag") if self._res is not None else None
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        """Last-Modified response header, if any."""
+        return self._res.headers.get("Last-Modified") if self._res is not None else None
+
+    def spool(self) -> str:
+        """
+        Download the whole body to a temporary file without parsing it.
+
+        Lets a caller compare the hash with a known dump before paying for
+        the parse; rows() then parses the spooled copy.
+
+        Returns:
+            SHA-256 of the raw body (also stored in sha256)
+        """
+        hasher = hashlib.sha256()
+        spool = tempfile.TemporaryFile()
+        try:
+            for chunk in self._res.iter_content(chunk_size=self._chunk_size):
+                if chunk:
+                    hasher.update(chunk)
+                    spool.write(chunk)
+            spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+        self._spool = spool
+        self.sha256 = hasher.hexdigest()
+        return self.sha256
+
+    def rows(self, workers: int = 1, chunk_lines: int = 5000,
+             min_parallel_lines: int = 50000) -> Iterator[List[Any]]:
+        """
+        Yield parsed rows while the body downloads.
+
+        Args:
+            workers: Parser processes (1 = parse serially in this process,
+                0 = one per CPU); see iter_sql_rows_parallel
+            chunk_lines: Lines per block handed to a parser process
+            min_parallel_lines: Dumps shorter than this are parsed serially
+
+        Yields:
+            Parsed SQL rows (see backend.sql_parser.iter_sql_rows)
+        """
+        if self._spool is not None:
+            hasher = None
+            chunks = iter(lambda: self._spool.read(self._chunk_size), b"")
+            lines = iter_chunk_lines(chunks, _response_encoding(self._res))
+        else:
+            hasher = hashlib.sha256()
+            lines = iter_response_lines(self._res, self._chunk_size, hasher)
+        if workers == 1:
+            parsed = iter_sql_rows(lines)
+        else:
+            parsed = iter_sql_rows_parallel(lines, workers, chunk_lines=chunk_lines,
+                                            min_parallel_lines=min_parallel_lines)
+        count = 0
+        for row in parsed:
+            count += 1
+            yield row
+        if hasher is not None:
+            self.sha256 = hasher.hexdigest()
+        logger.info("Streamed %d rows from %s", count, self.url)
+
@@ -0,0 +1,343 @@
+"""Single-pass tokenizer for the INSERT statements in a Travian map.sql dump."""
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Pattern
+
+logger = logging.getLogger("bot")
+
+EXPECTED_COLS = 16
+
+# One token per match: a quoted string (with '' escapes), a structural
+# character, or a run of bare text. Leading whitespace is captured separately
+# so multi-token fields can be rebuilt exactly as they appeared in the dump.
+_TOKEN_RE = re.compile(r"\s*('[^']*(?:''[^']*)*'|[(),]|[^'(),]+|'.*)", re.S)
+
+# A whole well-formed tuple in one match: every field is either a quoted
+# string or bare text without structural characters. Tuples that do not fit
+# (wrong column count, nested parentheses, mixed fields) fall back to the
+# token-level state machine.
+_FIELD = r"\s*('[^']*(?:''[^']*)*'|[^,()'\s]*(?:\s+[^,()'\s]+)*)\s*"
+_ROW_PATTERNS: Dict[int, Pattern[str]] = {}
+_GAP_CHARS = " \t\r\n,;"
+_PLAIN_START = frozenset("'-0123456789")
+_NUMERIC_START = frozenset("+-.0123456789")
+
+
+def _row_pattern(cols: int) -> Pattern[str]:
+    """Return the compiled single-tuple pattern for a given column count."""
+    pat = _ROW_PATTERNS.get(cols)
+    if pat is None:
+        pat = re.compile(r"\(" + ",".join([_FIELD] * cols) + r"\)")
+        _ROW_PATTERNS[cols] = pat
+    return pat
+
+
+def _finish_raw(cur: Optional[str]) -> Optional[str]:
+    """Normalize a raw field the same way the legacy parse_sql_row did."""
+    if cur is None:
+        return ""
+    s = cur.strip()
+    if s[:1] == "'":
+        return s
+    u = s.upper()
+    if u == "NULL":
+        return None
+    if u == "TRUE" or u == "FALSE":
+        return u
+    return s
+
+
+def _finish_typed(cur: Optional[str]) -> Any:
+    """Convert a raw field to None, bool, int, float or an unescaped string."""
+    if cur is None:
+        return ""
+    s = cur.strip()
+    if len(s) > 1 and s[0] == "'" and s[-1] == "'":
+        s = s[1:-1]
+        return s.replace("''", "'") if "''" in s else s
+    u = s.upper()
+    if u == "NULL":
+        return None
+    if u == "TRUE":
+        return True
+    if u == "FALSE":
+        return False
+    if s[:1] not in _NUMERIC_START:
+        return s
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        f = float(s)
+    except ValueError:
+        return s
+    return int(f) if f.is_integer() else f
+
+
+def iter_value_rows(body: str, typed: bool = False) -> Iterator[List[Any]]:
+    """
+    Yield every parenthesized tuple of an INSERT ... VALUES body as a field list.
+
+    Works on token offsets rather than growing strings character by character,
+    so the cost is linear in the size of the body.
+
+    Args:
+        body: SQL INSERT VALUES clause body
+        typed: When True, convert fields to Python types (None, bool, int,
+            unescaped str). When False, return the same raw strings as the
+            legacy parse_sql_row (quoted strings keep their quotes, booleans
+            are "TRUE"/"FALSE", NULL is None).
+
+    Yields:
+        List of field values for each tuple
+    """
+    finish = _finish_typed if typed else _finish_raw
+    depth = 0
+    fields: List[Any] = []
+    cur: Optional[str] = None
+    for m in _TOKEN_RE.finditer(body):
+        tok = m.group(1)
+        c = tok[0]
+        if c == "(":
+            depth += 1
+            if depth == 1:
+                fields, cur = [], None
+            elif cur is None:
+                cur = tok
+            else:
+                cur += m.group(0)
+        elif c == ")":
+            if depth == 0:
+                continue
+            depth -= 1
+            if depth == 0:
+                fields.append(finish(cur))
+                yield fields
+            elif cur is None:
+                cur = tok
+            else:
+                cur += m.group(0)
+        elif depth == 0:
+            continue
+        elif c == ",":
+            fields.append(finish(cur))
+            cur = None
+        elif cur is None:
+            cur = tok
+        else:
+            cur += m.group(0)
+
+
+def _typed_field(f: str) -> Any:
+    """Fast typed conversion for a field already isolated by the tuple pattern."""
+    c = f[:1]
+    if c == "'":
+        f = f[1:-1]
+        return f.replace("''", "'") if "''" in f else f
+    if c in _PLAIN_START:
+        try:
+            return int(f)
+        except ValueError:
+            pass
+    return _finish_typed(f)
+
+
+def parse_values(body: str, typed: bool = False,
+                 expected_cols: int = EXPECTED_COLS) -> List[List[Any]]:
+    """
+    Parse an INSERT ... VALUES body into rows.
+
+    Bodies made only of well-formed tuples with expected_cols fields (the
+    normal map.sql shape) are split by a single compiled pattern; anything
+    else goes through iter_value_rows. Both paths give identical output.
+
+    Args:
+        body: SQL INSERT VALUES clause body
+        typed: See iter_value_rows
+        expected_cols: Column count the fast path is compiled for
+
+    Returns:
+        List of rows (rows with another column count are returned as-is)
+    """
+    rows: List[List[Any]] = []
+    pos = 0
+    for m in _row_pattern(expected_cols).finditer(body):
+        if body[pos:m.start()].strip(_GAP_CHARS):
+            return list(iter_value_rows(body, typed))
+        groups = m.groups()
+        if typed:
+            rows.append([_typed_field(f) for f in groups])
+        else:
+            rows.append([f if f[:1] in _PLAIN_START else _finish_raw(f) for f in groups])
+        pos = m.end()
+    if body[pos:].strip(_GAP_CHARS):
+        return list(iter_value_rows(body, typed))
+    return rows
+
+
+def insert_body(line: str) -> Optional[str]:
+    """
+    Return the VALUES body of an INSERT line, or None for any other line.
+
+    Args:
+        line: One line of the dump
+
+    Returns:
+        Text following the VALUES keyword with the trailing semicolon removed
+    """
+    if not line.startswith("INSERT"):
+        return None
+    idx = line.find("VALUES")
+    if idx < 0:
+        return None
+    return line[idx + 6:].rstrip(";\r\n")
+
+
+def iter_sql_rows(lines: Iterable[str], typed: bool = False,
+                  expected_cols: int = EXPECTED_COLS) -> Iterator[List[Any]]:
+    """
+    Parse dump lines into rows, skipping tuples with the wrong column count.
+
+    Args:
+        lines: Lines of a map.sql dump
+        typed: Forwarded to iter_value_rows
+        expected_cols: Number of columns a valid row must have
+
+    Yields:
+        Parsed rows with exactly expected_cols fields
+    """
+    for line in lines:
+        body = insert_body(line)
+        if body is None:
+            continue
+        for cols in parse_values(body, typed, expected_cols):
+            if len(cols) != expected_cols:
+                logger.warning("Skipping SQL row with %d cols (expected %d)", len(cols), expected_cols)
+                continue
+            yield cols
+
+
+def parse_sql_lines(lines: Iterable[str], typed: bool = False) -> List[List[Any]]:
+    """Parse dump lines into a list of rows (see iter_sql_rows)."""
+    return list(iter_sql_rows(lines, typed))
+
+
+def _parse_chunk(text: str, typed: bool, expected_cols: int) -> List[List[Any]]:
+    """Process-pool worker: parse a newline-joined block of INSERT lines."""
+    return list(iter_sql_rows(text.split("\n"), typed, expected_cols))
+
+
+def _insert_chunks(lines: Iterator[str], chunk_lines: int) -> Iterator[str]:
+    """Group INSERT lines into newline-joined blocks of at most chunk_lines lines."""
+    while True:
+        raw = list(islice(lines, chunk_lines))
+        if not raw:
+            return
+        block = [line for line in raw if line.startswith("INSERT")]
+        if block:
+            yield "\n".join(block)
+
+
+def iter_sql_rows_parallel(lines: Iterable[str], workers: int = 0, typed: bool = False,
+                           expected_cols: int = EXPECTED_COLS, chunk_lines: int = 5000,
+                           min_parallel_lines: int = 50000) -> Iterator[List[Any]]:
+    """
+    Parse dump lines across a process pool, yielding rows in their original order.
+
+    INSERT statements are independent, so the dump is cut into line-aligned
+    blocks that are parsed by worker processes. At most two blocks per worker
+    are in flight, which keeps memory bounded while the input streams in.
+    Inputs shorter than min_parallel_lines are parsed serially, since process
+    start-up would cost more than it saves.
+
+    Args:
+        lines: Lines of a map.sql dump
+        workers: Worker processes (0 = one per CPU, 1 = always serial)
+        typed: Forwarded to iter_value_rows
+        expected_cols: Number of columns a valid row must have
+        chunk_lines: Lines per block handed to a worker
+        min_parallel_lines: Minimum input size (in lines) for the parallel path
+
+    Yields:
+        Parsed rows with exactly expected_cols fields
+    """
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    if workers <= 1:
+        yield from iter_sql_rows(lines, typed, expected_cols)
+        return
+
+    it = iter(lines)
+    head = list(islice(it, min_parallel_lines))
+    if len(head) < min_parallel_lines:
+        yield from iter_sql_rows(head, typed, expected_cols)
+        return
+
+    def all_lines() -> Iterator[str]:
+        yield from head
+        head.clear()
+        yield from it
+
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Any] = deque()
+        for block in _insert_chunks(all_lines(), chunk_lines):
+            pending.append(pool.submit(_parse_chunk, block, typed, expected_cols))
+            if len(pending) >= workers * 2:
+                rows = pending.popleft().result()
+                count += len(rows)
+                yield from rows
+        while pending:
+            rows = pending.popleft().result()
+            count += len(rows)
+            yield from rows
+    logger.info("Parsed %d rows with %d worker processes", count, workers)
+
+
+# -------------------- Legacy-compatible entry points -------------------- #
+def extract_value_groups(body: str) -> List[str]:
+    """
+    Extract parenthesized value groups from SQL INSERT statement body.
+
+    Handles nested parentheses and escaped quotes correctly.
+
+    Args:
+        body: SQL INSERT VALUES clause body
+
+    Returns:
+        List of value group strings (with parentheses)
+    """
+    groups: List[str] = []
+    depth, start = 0, 0
+    for m in _TOKEN_RE.finditer(body):
+        c = m.group(1)[0]
+        if c == "(":
+            if depth == 0:
+                start = m.start(1)
+            depth += 1
+        elif c == ")" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                groups.append(body[start:m.end()])
+    return groups
+
+
+def parse_sql_row(inner: str) -> List[Optional[str]]:
+    """
+    Parse a single SQL row value group into a list of field values.
+
+    Handles quoted strings, escaped quotes, NULL values, and boolean values.
+
+    Args:
+        inner: Value group string (without outer parentheses)
+
+    Returns:
+        List of parsed field values (strings, None for NULL, or "TRUE"/"FALSE")
+    """
+    for row in iter_value_rows(f"({inner})"):
+        return row
+    return [""]
@@ -0,0 +1,188 @@
+"""Keyset-paginated, concurrent reads of Supabase (PostgREST) tables and RPCs."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("bot")
+
+# PostgREST's default max-rows: larger pages are silently cut to this
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_KEY = "village_id"
+
+# make_query(count) -> a fresh, filtered query builder, where count is None
+# or "exact" and is passed on to select()/rpc(), e.g.
+#   lambda count=None: supabase.table(t).select("*", count=count).eq("dump_date", d)
+QueryFactory = Callable[[Optional[str]], Any]
+
+
+def _walk(make_query: QueryFactory, key: str, after: Any, upto: Any,
+          page_size: int) -> Iterator[Dict[str, Any]]:
+    """Yield rows with after < key <= upto (open-ended if upto is None), page by page."""
+    while True:
+        query = make_query(None).gt(key, after)
+        if upto is not None:
+            query = query.lte(key, upto)
+        chunk = query.order(key).limit(page_size).execute().data or []
+        yield from chunk
+        if len(chunk) < page_size:
+            return
+        after = chunk[-1][key]
+
+
+def _collect(make_query: QueryFactory, key: str, after: Any, upto: Any,
+             page_size: int) -> List[Dict[str, Any]]:
+    return list(_walk(make_query, key, after, upto, page_size))
+
+
+def _split(after: int, high: int, parts: int) -> List[Tuple[int, Optional[int]]]:
+    """Cut the key range (after, high] into parts slices; the last one is open-ended."""
+    cuts = [after + (high - after) * i // parts for i in range(parts + 1)]
+    slices: List[Tuple[int, Optional[int]]] = [
+        (lo, hi) for lo, hi in zip(cuts, cuts[1:]) if hi > lo
+    ]
+    if slices:
+        slices[-1] = (slices[-1][0], None)
+    return slices
+
+
+def iter_keyset(make_query: QueryFactory, key: str = DEFAULT_KEY,
+                page_size: int = DEFAULT_PAGE_SIZE, max_workers: int = 4) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every row of a query in key order using keyset pagination.
+
+    Each page is "key > last key seen ORDER BY key LIMIT page_size", so every
+    page costs one index range scan however deep the scan is, and rows
+    written while the scan runs (e.g. an ingest upserting the same dump_date)
+    cannot shift later pages the way OFFSET does: nothing is skipped or
+    returned twice. The key must be unique within the query (village_id is,
+    per dump_date).
+
+    The first page also returns the exact row count. When more pages follow
+    and the key is an integer, the remaining key range is cut into slices
+    that are walked concurrently, each with its own keyset cursor, and
+    yielded in key order. If the server returns fewer rows than page_size
+    while the count says more exist (its max-rows cap), the cap becomes the
+    page size.
+
+    Args:
+        make_query: Returns a fresh, filtered query builder (see QueryFactory);
+            called once per page because builders are mutable
+        key: Unique, indexed column to page on
+        page_size: Rows requested per page
+        max_workers: Key-range slices walked at once (1 = serial)
+
+    Yields:
+        Row dictionaries ordered by key
+    """
+    first = make_query("exact").order(key).limit(page_size).execute()
+    rows = first.data or []
+    total = getattr(first, "count", None)
+    yield from rows
+    if len(rows) < page_size:
+        if not rows or total is None or len(rows) >= total:
+            return
+        logger.info("Server returned %d of %d rows per page; paging with that size", len(rows), page_size)
+        page_size = len(rows)
+
+    after = rows[-1][key]
+    remaining = None if total is None else total - len(rows)
+    if remaining is not None and remaining <= 0:
+        return
+    parts = min(max_workers, -(-remaining // page_size)) if remaining else 1
+    if parts > 1 and isinstance(after, int):
+        top = make_query(None).order(key, desc=True).limit(1).execute().data or []
+        high = top[0][key] if top else after
+        slices = _split(after, high, parts) if isinstance(high, int) and high > after else []
+        if len(slices) > 1:
+            with ThreadPoolExecutor(max_workers=len(slices), thread_name_prefix="page") as pool:
+                futures = [pool.submit(_collect, make_query, key, lo, hi, page_size)
+                           for lo, hi in slices]
+                for fut in futures:
+                    yield from fut.result()
+            return
+    yield from _walk(make_query, key, after, None, page_size)
+
+
+def fetch_keyset(make_query: QueryFactory, key: str = DEFAULT_KEY,
+                 page_size: int = DEFAULT_PAGE_SIZE, max_workers: int = 4) -> List[Dict[str, Any]]:
+    """Collect iter_keyset() into a list (see iter_keyset for the arguments)."""
+    return list(iter_keyset(make_query, key, page_size, max_workers))
+
+
+def _after_filter(order: Sequence[Tuple[str, bool]], after: Sequence[Any]) -> str:
+    """
+    PostgREST or= condition for rows strictly after a key in a multi-column order.
+
+    For ((population, desc), (village_id, asc)) and after (120, 7) this is
+    "or(population.lt.120,population.is.null),and(population.eq.120,village_id.gt.7)".
+    NULLs sort last (see sorted_page): a NULL is after every number, and
+    nothing is after a NULL except by a later column. Values are written into
+    the filter as they are, so they must be numbers or None.
+    """
+    terms = []
+    for n, (column, descending) in enumerate(order):
+        value = after[n]
+        if value is None:
+            continue  # NULLs come last: nothing follows one on this column
+        cond = f"{column}.{'lt' if descending else 'gt'}.{value}"
+        if n < len(order) - 1:
+            cond = f"or({cond},{column}.is.null)"
+        prefix = [f"{c}.is.null" if v is None else f"{c}.eq.{v}"
+                  for (c, _), v in zip(order[:n], after[:n])]
+        terms.append(f"and({','.join(prefix + [cond])})" if prefix else cond)
+    return ",".join(terms)
+
+
+def sorted_page(make_query: QueryFactory, order: Sequence[Tuple[str, bool]],
+                after: Optional[Sequence[Any]], offset: int, size: int) -> Any:
+    """
+    Query for one page of fetch_sorted(): rows after a key (or offset), in order, NULLs last.
+
+    Returns:
+        Query builder, ready to execute()
+    """
+    query = make_query(None)
+    if after is not None:
+        query = query.or_(_after_filter(order, after))
+    for column, descending in order:
+        query = query.order(column, desc=descending, nullsfirst=False)
+    if offset and after is None:
+        return query.range(offset, offset + size - 1)
+    return query.limit(size)
+
+
+def fetch_sorted(make_query: QueryFactory, order: Sequence[Tuple[str, bool]],
+                 after: Optional[Sequence[Any]] = None, offset: int = 0,
+                 limit: Optional[int] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """
+    Read a window of a query in an arbitrary order, with a keyset cursor.
+
+    Sorting, the cursor seek and the limit all run in Postgres; pages of at
+    most page_size rows are requested one after another (each continuing
+    from the last row of the previous one) until limit rows are read or the
+    result ends. page_size should not exceed the server's max-rows, or a
+    short page is taken as the end of the result.
+
+    Args:
+        make_query: Returns a fresh, filtered query builder (see QueryFactory)
+        order: (column, descending) pairs, NULLs last; the last column must
+            be unique and not null, and every column numeric (see _after_filter)
+        after: Values of the order columns for the last row already seen
+            (a cursor); the window starts right after it
+        offset: Rows to skip first (only used without after)
+        limit: Rows to return (None = to the end of the result)
+        page_size: Rows requested per page
+
+    Returns:
+        Row dictionaries in the requested order
+    """
+    rows: List[Dict[str, Any]] = []
+    while limit is None or len(rows) < limit:
+        want = page_size if limit is None else min(page_size, limit - len(rows))
+        chunk = sorted_page(make_query, order, after, offset, want).execute().data or []
+        rows.extend(chunk)
+        if len(chunk) < want:
+            break
+        after = [chunk[-1][column] for column, _ in order]
+    return rows
@@ -0,0 +1,195 @@
+"""Limit, offset or cursor, field projection and sorting for the village list endpoints."""
+import base64
+import binascii
+import json
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from backend.snapshot import VillageSnapshot, order_key
+from backend.sql_convert import SQL_COLUMNS
+from backend.supabase_paging import DEFAULT_KEY
+
+# sort= value -> columns it orders by (numeric only: cursors are pushed into
+# PostgREST filters); the paging key always breaks ties
+SORTS: Dict[str, Tuple[str, ...]] = {
+    "population": ("population",),
+    "victory_points": ("victory_points",),
+    "coordinates": ("x", "y"),
+}
+
+# Fields _inject_common_fields() adds -> the columns they are computed from
+DERIVED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "coords": ("x", "y"),
+    "village": ("village_name",),
+    "victoryPoints": ("victory_points",),
+    "alliance": ("alliance_tag",),
+    "player": ("player_name",),
+}
+
+FIELDS: Tuple[str, ...] = tuple(name for name, _ in SQL_COLUMNS) + tuple(DERIVED_FIELDS)
+
+# (column, descending) pairs
+Order = Tuple[Tuple[str, bool], ...]
+
+
+@dataclass(frozen=True)
+class VillageQuery:
+    """
+    Which window of a village list to return, in which order, with which fields.
+
+    Windows start at an offset or right after a cursor (the sort key of the
+    last row a client received), which stays stable while pages are read,
+    and is cheap at any depth. Parse one with from_args().
+    """
+    limit: Optional[int] = None
+    offset: int = 0
+    after: Optional[Tuple[Optional[int], ...]] = None
+    fields: Optional[Tuple[str, ...]] = None
+    sort: Optional[str] = None
+    descending: bool = False
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, str], max_limit: int) -> "VillageQuery":
+        """
+        Parse limit, offset, cursor, fields and sort query parameters.
+
+        sort is one of SORTS, prefixed with "-" for descending order; fields
+        is a comma-separated list of FIELDS. A cursor is only valid with the
+        sort it was issued for.
+
+        Raises:
+            ValueError: If a parameter is malformed or out of range
+        """
+        limit = _int_arg(args, "limit", 1, max_limit)
+        offset = _int_arg(args, "offset", 0, None) or 0
+
+        sort = (args.get("sort") or "").strip() or None
+        descending = False
+        if sort is not None:
+            descending = sort.startswith("-")
+            sort = sort.lstrip("-")
+            if sort not in SORTS:
+                raise ValueError(f"sort must be one of {', '.join(SORTS)} (prefix - for descending)")
+
+        fields = None
+        if args.get("fields"):
+            fields = tuple(dict.fromkeys(f.strip() for f in args["fields"].split(",") if f.strip()))
+            unknown = [f for f in fields if f not in FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        query = cls(limit=limit, offset=offset, fields=fields or None, sort=sort, descending=descending)
+        cursor = (args.get("cursor") or "").strip()
+        if cursor:
+            if offset:
+                raise ValueError("Use either cursor or offset, not both")
+            query = cls(limit=limit, fields=query.fields, sort=sort, descending=descending,
+                        after=query._decode_cursor(cursor))
+        return query
+
+    @property
+    def active(self) -> bool:
+        """True if any parameter was given (otherwise the endpoint's full list applies)."""
+        return bool(self.limit is not None or self.offset or self.after is not None
+                    or self.fields or self.sort)
+
+    @property
+    def order(self) -> Order:
+        """(column, descending) pairs to sort by, ending with the unique paging key."""
+        columns = SORTS.get(self.sort or "", ())
+        return tuple((c, self.descending) for c in columns) + ((DEFAULT_KEY, False),)
+
+    def columns(self) -> Optional[Tuple[str, ...]]:
+        """Columns to read for the requested fields and the order (None = every column)."""
+        if not self.fields:
+            return None
+        cols: Dict[str, None] = {}
+        for name in self.fields:
+            for col in DERIVED_FIELDS.get(name, (name,)):
+                cols[col] = None
+        for col, _ in self.order:
+            cols[col] = None
+        return tuple(cols)
+
+    def project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the requested fields of a row (all of them if none were requested)."""
+        if not self.fields:
+            return row
+        return {name: row.get(name) for name in self.fields}
+
+    def cursor_after(self, row: Mapping[str, Any]) -> str:
+        """Opaque cursor for the window that follows row."""
+        payload = {"s": ("-" if self.descending else "") + (self.sort or ""),
+                   "k": [None if row.get(col) is None else int(row[col]) for col, _ in self.order]}
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def _decode_cursor(self, cursor: str) -> Tuple[Optional[int], ...]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            sort, key = payload["s"], payload["k"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise ValueError("Malformed cursor")
+        if sort != ("-" if self.descending else "") + (self.sort or ""):
+            raise ValueError("cursor was issued for a different sort")
+        # The values end up in PostgREST filter strings: integers (or NULL) only
+        if (not isinstance(key, list) or len(key) != len(self.order)
+                or not all(v is None or type(v) is int for v in key)):
+            raise ValueError("Malformed cursor")
+        return tuple(key)
+
+
+def _int_arg(args: Mapping[str, str], name: str, low: int, high: Optional[int]) -> Optional[int]:
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < low or (high is not None and number > high):
+        bounds = f"between {low} and {high}" if high is not None else f">= {low}"
+        raise ValueError(f"{name} must be {bounds}")
+    return number
+
+
+def select_local(rows: Sequence[Mapping], filters: Sequence[Tuple[str, Callable[[Any], bool]]],
+                 query: VillageQuery) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Apply filters and a VillageQuery to local villages.
+
+    A snapshot answers from its presorted index (see
+    VillageSnapshot.sorted_indices): the cursor is a bisect on the sort keys
+    and only the rows in the window are materialized, with just the columns
+    the query needs.
+
+    Args:
+        rows: VillageSnapshot or village dicts
+        filters: (column, predicate) pairs, as for filter_rows()
+        query: Window, order and projection
+
+    Returns:
+        (rows in the window as fresh dicts, whether more rows follow it)
+    """
+    order = query.order
+    if isinstance(rows, VillageSnapshot):
+        keys, ids = rows.sorted_indices(order, rows.matching(filters))
+        get_rows = lambda window: rows.take(window, query.columns())
+    else:
+        matched = [r for r in rows if all(p(r.get(name)) for name, p in filters)]
+        pairs = sorted(((_row_key(r, order), n) for n, r in enumerate(matched)))
+        keys, ids = [k for k, _ in pairs], [n for _, n in pairs]
+        get_rows = lambda window: [dict(matched[n]) for n in window]
+
+    if query.after is not None:
+        start = bisect_right(keys, order_key(query.after, order))
+    else:
+        start = query.offset
+    end = len(ids) if query.limit is None else min(len(ids), start + query.limit)
+    return get_rows(ids[start:end]), end < len(ids)
+
+
+def _row_key(row: Mapping[str, Any], order: Order) -> tuple:
+    return order_key([row.get(col) for col, _ in order], order)
@@ -0,0 +1,123 @@
+"""Registry of tracked Travian worlds and the per-request world context."""
+import logging
+import re
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger("bot")
+
+DEFAULT_TABLE = "villages"
+_KEY_RE = re.compile(r"^[a-z0-9_]+$")
+
+
+@dataclass(frozen=True)
+class World:
+    """One Travian game world (server) tracked by the app."""
+
+    key: str
+    sql_url: str
+    table: str = DEFAULT_TABLE
+    default: bool = False
+
+    @property
+    def cache_namespace(self) -> str:
+        """Redis key namespace (empty for the default world, so its keys are unchanged)."""
+        return "" if self.default else f"world:{self.key}"
+
+    @property
+    def has_rpcs(self) -> bool:
+        """True if the Supabase RPC functions (written against the villages table) apply."""
+        return self.table == DEFAULT_TABLE
+
+
+class WorldRegistry:
+    """Ordered set of worlds with one default."""
+
+    def __init__(self, worlds: List[World]):
+        """
+        Initialize world registry.
+
+        Args:
+            worlds: Worlds to register; exactly one must be the default
+
+        Raises:
+            ValueError: On duplicate keys, invalid keys or a missing default
+        """
+        self._worlds: Dict[str, World] = {}
+        for world in worlds:
+            if not _KEY_RE.match(world.key):
+                raise ValueError(f"Invalid world key {world.key!r} (use a-z, 0-9 and _)")
+            if world.key in self._worlds:
+                raise ValueError(f"Duplicate world key {world.key!r}")
+            self._worlds[world.key] = world
+        defaults = [w for w in worlds if w.default]
+        if len(defaults) != 1:
+            raise ValueError("Exactly one default world is required")
+        self.default = defaults[0]
+
+    @classmethod
+    def from_config(cls, config) -> "WorldRegistry":
+        """
+        Build the registry from configuration.
+
+        The default world uses SQL_FILE_URL and the villages table. Extra
+        worlds come from WORLDS, a comma-separated list of key=url entries
+        (e.g. "ts5=https://ts5.x1.europe.travian.com/map.sql"); each is
+        stored in its own villages_<key> table.
+        """
+        worlds = [World(config.DEFAULT_WORLD, config.SQL_FILE_URL, DEFAULT_TABLE, default=True)]
+        for entry in filter(None, (e.strip() for e in config.WORLDS.split(","))):
+            key, sep, url = entry.partition("=")
+            key, url = key.strip().lower(), url.strip()
+            if not sep or not url:
+                raise ValueError(f"Invalid WORLDS entry {entry!r} (expected key=url)")
+            worlds.append(World(key, url, f"{DEFAULT_TABLE}_{key}"))
+        return cls(worlds)
+
+    def get(self, key: Optional[str]) -> World:
+        """
+        Look up a world by key (None or "" selects the default).
+
+        Raises:
+            KeyError: If the world is unknown
+        """
+        if not key:
+            return self.default
+        return self._worlds[key.strip().lower()]
+
+    def keys(self) -> List[str]:
+        """Registered world keys, default first."""
+        return list(self._worlds)
+
+    def __iter__(self) -> Iterator[World]:
+        return iter(self._worlds.values())
+
+    def __len__(self) -> int:
+        return len(self._worlds)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._worlds
+
+
+_current_world: ContextVar[Optional[World]] = ContextVar("current_world", default=None)
+
+
+def current_world(registry: WorldRegistry) -> World:
+    """Return the world bound to the current context, or the registry default."""
+    return _current_world.get() or registry.default
+
+
+def bind_world(world: World) -> Token:
+    """
+    Bind a world to the current context (request or worker thread).
+
+    Returns:
+        Token for unbind_world()
+    """
+    return _current_world.set(world)
+
+
+def unbind_world(token: Token) -> None:
+    """Restore the world that was bound before bind_world()."""
+    _current_world.reset(token)
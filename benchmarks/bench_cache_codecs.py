@@ -0,0 +1,149 @@
+"""
+Compare cache codecs on marker payloads: stored size, compress and decompress time.
+
+Real payloads give the numbers that matter; save some first, e.g.
+    curl -s https://<host>/api/markers > markers.json
+    curl -s https://<host>/api/player/<name>/map > player.json
+Without --payload, marker-shaped payloads are built from a synthetic dump.
+
+Usage:
+    python benchmarks/bench_cache_codecs.py [--payload FILE ...] [--villages 50000]
+        [--repeat 5] [--train-dict OUT]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_codecs  # noqa: E402
+from synthetic import synthetic_villages  # noqa: E402
+
+_TRIBES = {1: "Romans", 2: "Teutons", 3: "Gauls", 4: "Nature", 5: "Natars",
+           6: "Egyptians", 7: "Huns", 8: "Spartans", 9: "Vikings"}
+
+
+def marker_payload(rows: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Same shape and markup as backend.generate_svg_markers() (checkboxes trimmed)."""
+    colors: Dict[str, str] = {}
+    stats: Dict[str, Dict[str, Any]] = {}
+    markers = []
+    for r in rows:
+        alliance = r["alliance_tag"] or "Natars"
+        region = r["region"] or ""
+        tribe = _TRIBES.get(int(r["tribe"] or 0), "Unknown")
+        color = colors.setdefault(alliance, f"hsl({len(colors) * 137 % 360}, 70%, 50%)")
+        s = stats.setdefault(region, {"villageCount": 0, "totalPopulation": 0})
+        s["villageCount"] += 1
+        s["totalPopulation"] += r["population"]
+        tip = (f"Village: {r['village_name']}<br>Player: {r['player_name']}<br>"
+               f"Population: {r['population']}<br>Alliance: {alliance}<br>"
+               f"Region: {region}<br>Tribe: {tribe}")
+        markers.append(
+            f'<rect class="marker alliance-{alliance.lower()} region-{region.lower()} tribe-{tribe.lower()}" '
+            f'x="{r["x"]}" y="{-r["y"]}" width="1" height="1" '
+            f'fill="{color}" stroke="black" stroke-width="0.05" '
+            f'data-tooltip="{tip}" data-player="{r["player_name"]}" />'
+        )
+    return {"markers": "\n".join(markers), "region_stats_json": json.dumps(stats)}
+
+
+def synthetic_payloads(villages: int) -> Tuple[Dict[str, bytes], List[bytes]]:
+    """World markers, marker rows and one player map, plus per-player maps as dictionary samples."""
+    rows = synthetic_villages(villages)
+    by_player: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for r in rows:
+        by_player[r["player_name"]].append(r)
+    players = [marker_payload(v) for v in by_player.values()]
+    encode = lambda v: json.dumps(v).encode("utf-8")
+    payloads = {
+        "markers (world)": encode(marker_payload(rows)),
+        "marker_rows (world)": encode(rows),
+        "player map": encode(players[0]),
+    }
+    return payloads, [encode(p) for p in players[1:]]
+
+
+def _median_time(fn: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def _candidates(dictionary: Optional[bytes]) -> List[Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    out = []
+    for level in (1, 6, 9):
+        out.append((f"gzip-{level}", lambda d, l=level: gzip.compress(d, compresslevel=l), gzip.decompress))
+    out.append(("zlib-6", lambda d: zlib.compress(d, 6), zlib.decompress))
+    zstandard = cache_codecs.zstandard
+    if zstandard is not None:
+        for level in (1, 3, 9, 19):
+            c = zstandard.ZstdCompressor(level=level)
+            out.append((f"zstd-{level}", c.compress, zstandard.ZstdDecompressor().decompress))
+        if dictionary is not None:
+            zdict = zstandard.ZstdCompressionDict(dictionary)
+            out.append(("zstd-3+dict", zstandard.ZstdCompressor(level=3, dict_data=zdict).compress,
+                        zstandard.ZstdDecompressor(dict_data=zdict).decompress))
+    lz4_frame = cache_codecs.lz4_frame
+    if lz4_frame is not None:
+        for level in (0, 9):
+            out.append((f"lz4-{level}", lambda d, l=level: lz4_frame.compress(d, compression_level=l),
+                        lz4_frame.decompress))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payload", action="append", default=[], help="JSON response saved from the API")
+    parser.add_argument("--villages", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--train-dict", metavar="OUT", help="write the trained zstd dictionary here")
+    args = parser.parse_args()
+
+    payloads, samples = synthetic_payloads(args.villages) if not args.payload else ({}, [])
+    for path in args.payload:
+        with open(path, "rb") as f:
+            payloads[os.path.basename(path)] = f.read()
+    if not samples:
+        samples = [p for p in payloads.values() if len(p) <= cache_codecs.ZSTD_DICT_MAX_BYTES]
+
+    dictionary = None
+    if cache_codecs.zstandard is not None and len(samples) >= 10:
+        dictionary = cache_codecs.train_zstd_dictionary(samples)
+        print(f"Trained zstd dictionary: {len(dictionary):,} bytes from {len(samples)} samples")
+        if args.train_dict:
+            with open(args.train_dict, "wb") as f:
+                f.write(dictionary)
+            print(f"Wrote {args.train_dict} (set CACHE_ZSTD_DICT to use it)")
+    missing = [name for name, module in (("zstandard", cache_codecs.zstandard), ("lz4", cache_codecs.lz4_frame))
+               if module is None]
+    if missing:
+        print(f"Not installed, skipped: {', '.join(missing)}")
+
+    for name, data in payloads.items():
+        hot_codec, _ = cache_codecs.choose_codec(len(data), hot=True)
+        cold_codec, _ = cache_codecs.choose_codec(len(data), hot=False)
+        print(f"\n{name}: {len(data):,} bytes "
+              f"(auto picks {cache_codecs.codec_name(cold_codec)}, "
+              f"{cache_codecs.codec_name(hot_codec)} when hot)")
+        print(f"{'codec':<14}{'stored':>12}{'ratio':>8}{'compress ms':>14}{'decompress ms':>16}")
+        for codec, comp, decomp in _candidates(dictionary):
+            packed = comp(data)
+            assert decomp(packed) == data, f"{codec} round trip failed"
+            c_t = _median_time(lambda: comp(data), args.repeat)
+            d_t = _median_time(lambda: decomp(packed), args.repeat)
+            print(f"{codec:<14}{len(packed):>12,}{len(data) / len(packed):>8.1f}"
+                  f"{c_t * 1000:>14.2f}{d_t * 1000:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
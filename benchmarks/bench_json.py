@@ -0,0 +1,106 @@
+"""
+Benchmark JSON serialization of the largest API responses.
+
+Compares Flask's default provider (json.dumps with sorted keys, ASCII
+escapes), plain json.dumps and every serialization backend installed
+(orjson, msgspec) on /api/villages/latest and /api/players?limit=10000
+shaped payloads built from a synthetic dump.
+
+Usage:
+    python benchmarks/bench_json.py [--villages 200000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization  # noqa: E402
+from synthetic import synthetic_villages  # noqa: E402
+
+_TRIBES = {1: "Romans", 2: "Teutons", 3: "Gauls", 4: "Nature", 5: "Natars",
+           6: "Egyptians", 7: "Huns", 8: "Spartans", 9: "Vikings"}
+
+
+def villages_latest(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """/api/villages/latest: every village with the fields _inject_common_fields() adds."""
+    villages = []
+    for r in rows:
+        v = dict(r)
+        v["coords"] = f"({v['x']},{v['y']})"
+        v["village"] = v["village_name"]
+        v["victoryPoints"] = v["victory_points"]
+        v["alliance"] = v["alliance_tag"]
+        v["player"] = v["player_name"]
+        v["tribe"] = _TRIBES.get(int(v["tribe"] or 0), "Unknown")
+        villages.append(v)
+    return {"dump_date": "2026-01-01", "villages": villages}
+
+
+def players(rows: List[Dict[str, Any]], limit: int = 10000) -> Dict[str, Any]:
+    """/api/players?limit=...: per-player aggregates sorted by population."""
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        p = by_name.setdefault(r["player_name"], {
+            "id": r["player_id"], "name": r["player_name"], "alliance": r["alliance_tag"],
+            "villages": 0, "population": 0,
+        })
+        p["villages"] += 1
+        p["population"] += r["population"]
+    top = sorted(by_name.values(), key=lambda p: p["population"], reverse=True)[:limit]
+    return {"players": top, "count": len(top)}
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--villages", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = synthetic_villages(args.villages)
+    payloads = {
+        f"/api/villages/latest ({len(rows):,} villages)": villages_latest(rows),
+        "/api/players?limit=10000": players(rows),
+    }
+
+    # name -> (dumps, loads)
+    serializers: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+        "flask default (json)": (
+            lambda o: json.dumps(o, sort_keys=True, separators=(",", ":")).encode("utf-8"), json.loads),
+        "json compact": (
+            lambda o: json.dumps(o, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), json.loads),
+    }
+    for name, backend in serialization._BACKENDS.items():
+        if name != "json":
+            serializers[name] = backend
+    print(f"serialization.BACKEND = {serialization.BACKEND}")
+
+    for title, payload in payloads.items():
+        reference = json.loads(serializers["flask default (json)"][0](payload))
+        print(f"\n{title}")
+        print(f"{'serializer':<22}{'MiB':>8}{'dumps ms':>11}{'loads ms':>11}{'speedup':>9}")
+        base = None
+        for name, (dumps, loads) in serializers.items():
+            body = dumps(payload)
+            assert json.loads(body) == reference, f"{name} output differs"
+            dump_t = _best_of(lambda: dumps(payload), args.repeat)
+            load_t = _best_of(lambda: loads(body), args.repeat)
+            base = base or dump_t
+            print(f"{name:<22}{len(body) / 2 ** 20:>8.2f}{dump_t * 1000:>11.1f}"
+                  f"{load_t * 1000:>11.1f}{base / dump_t:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark the map.sql tokenizer against the legacy character-by-character parser.
+
+Usage:
+    python benchmarks/bench_sql_parser.py [--villages 200000] [--repeat 3] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.sql_parser import EXPECTED_COLS, iter_sql_rows_parallel, parse_sql_lines  # noqa: E402
+from synthetic import synthetic_dump_lines  # noqa: E402
+
+
+# -------------------- Legacy parser (pre-tokenizer backend.py) -------------------- #
+def legacy_extract_value_groups(body: str) -> List[str]:
+    groups, depth, in_str, cur, i = [], 0, False, "", 0
+    while i < len(body):
+        c = body[i]
+        if in_str:
+            if c=="'" and i+1<len(body) and body[i+1]=="'":
+                cur += "''"; i += 2; continue
+            if c=="'":
+                in_str = False
+            cur += c; i += 1
+        else:
+            if c=="'":
+                in_str = True; cur += c; i += 1; continue
+            if c=="(":
+                if depth == 0: cur=""
+                depth += 1
+            if depth > 0:
+                cur += c
+            if c==")" and depth>0:
+                depth -= 1
+                if depth==0:
+                    groups.append(cur)
+            i += 1
+    return groups
+
+
+def legacy_parse_sql_row(inner: str) -> List[Optional[str]]:
+    fields, cur, in_str, i = [], "", False, 0
+    while i < len(inner):
+        c = inner[i]
+        if in_str:
+            if c=="'" and i+1<len(inner) and inner[i+1]=="'":
+                cur += "''"; i += 2; continue
+            if c=="'":
+                in_str=False
+            cur += c; i += 1
+        else:
+            if c=="'":
+                in_str = True; cur += c; i += 1; continue
+            if c==",":
+                fields.append(cur); cur=""; i += 1; continue
+            cur += c; i += 1
+    fields.append(cur)
+    norm: List[Optional[str]] = []
+    for f in fields:
+        s = f.strip()
+        if s.upper()=="NULL":
+            norm.append(None)
+        elif s.upper() in ("TRUE","FALSE"):
+            norm.append(s.upper())
+        else:
+            norm.append(s)
+    return norm
+
+
+def legacy_parse(lines: List[str]) -> List[List[Optional[str]]]:
+    rows = []
+    for line in lines:
+        if not line.startswith("INSERT"):
+            continue
+        body = line.split("VALUES", 1)[1].rstrip(";\n")
+        for grp in legacy_extract_value_groups(body):
+            cols = legacy_parse_sql_row(grp[1:-1])
+            if len(cols) != EXPECTED_COLS:
+                continue
+            rows.append(cols)
+    return rows
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--villages", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0, help="process-pool size (0 = one per CPU)")
+    args = parser.parse_args()
+
+    lines = synthetic_dump_lines(args.villages)
+    size_mb = sum(len(l) + 1 for l in lines) / (1024 * 1024)
+    print(f"Synthetic dump: {args.villages} villages, {size_mb:.1f} MiB")
+
+    legacy_rows = legacy_parse(lines)
+    new_rows = parse_sql_lines(lines)
+    assert new_rows == legacy_rows, "tokenizer output differs from the legacy parser"
+    print(f"Outputs identical ({len(new_rows)} rows x {EXPECTED_COLS} cols)")
+
+    legacy_t = _best_of(lambda: legacy_parse(lines), args.repeat)
+    raw_t = _best_of(lambda: parse_sql_lines(lines), args.repeat)
+    typed_t = _best_of(lambda: parse_sql_lines(lines, typed=True), args.repeat)
+    parallel = lambda: list(iter_sql_rows_parallel(lines, args.workers, min_parallel_lines=0))
+    assert parallel() == new_rows, "parallel output differs from the serial tokenizer"
+    parallel_t = _best_of(parallel, args.repeat)
+
+    print(f"{'parser':<22}{'seconds':>10}{'rows/s':>14}{'speedup':>10}")
+    for name, t in (("legacy", legacy_t), ("tokenizer (raw)", raw_t), ("tokenizer (typed)", typed_t),
+                    (f"process pool ({args.workers or os.cpu_count()})", parallel_t)):
+        print(f"{name:<22}{t:>10.3f}{len(new_rows) / t:>14,.0f}{legacy_t / t:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Synthetic Travian map.sql dumps for the benchmark scripts."""
+import random
+from typing import Any, Dict, List
+
+_REGIONS = ["Aerenor", "Belgae", "Caledonia", "Dacia", "Etruria", "Frisia", "Gallia", "Hispania"]
+_TAGS = ["ROME", "T&T", "O'Neil", "GAUL", "~X~", "VIK", ""]
+
+
+def synthetic_dump_lines(villages: int, seed: int = 42) -> List[str]:
+    """
+    Build map.sql lines in the format Travian publishes (one INSERT per village).
+
+    Names deliberately include escaped quotes, commas and parentheses so the
+    parsers are exercised on the awkward cases as well as the common ones.
+    """
+    rnd = random.Random(seed)
+    lines = ["-- synthetic map.sql", "SET NAMES utf8;"]
+    for i in range(villages):
+        x, y = rnd.randint(-200, 200), rnd.randint(-200, 200)
+        tag = rnd.choice(_TAGS).replace("'", "''")
+        region = "NULL" if rnd.random() < 0.1 else f"'{rnd.choice(_REGIONS)}'"
+        vp = "NULL" if rnd.random() < 0.5 else str(rnd.randint(0, 500))
+        name = f"Village {i} (O''Brien, {rnd.randint(1, 99)})"
+        lines.append(
+            "INSERT INTO `x_world` VALUES "
+            f"({(200 - y) * 401 + x + 201},{x},{y},{rnd.randint(1, 9)},{100000 + i},'{name}',"
+            f"{rnd.randint(1, villages // 5 + 1)},'Player {rnd.randint(1, villages // 5 + 1)}',"
+            f"{rnd.randint(0, 300)},'{tag}',{rnd.randint(2, 1200)},{region},"
+            f"{rnd.choice(['TRUE', 'FALSE'])},{rnd.choice(['TRUE', 'FALSE'])},FALSE,{vp});"
+        )
+    return lines
+
+
+def synthetic_dump_text(villages: int, seed: int = 42) -> str:
+    """Return synthetic_dump_lines joined into a single dump string."""
+    return "\n".join(synthetic_dump_lines(villages, seed)) + "\n"
+
+
+def synthetic_villages(villages: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Village dictionaries as the API sees them, parsed from a synthetic dump."""
+    from backend.sql_convert import sql_row_to_dict
+    from backend.sql_parser import parse_sql_lines
+
+    return [sql_row_to_dict(r) for r in parse_sql_lines(synthetic_dump_lines(villages, seed))]
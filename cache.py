@@ -3,25 +3,384 @@ Redis cache wrapper with JSON serialization and compression support.
 
 Provides high-level cache operations that work with or without Redis.
 """
-import json
-import gzip
 import logging
+import math
 import os
-from typing import Any, Optional, Dict, List
+import random
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Iterator, Optional, Dict, List, Tuple
 from redis_client import get_redis, is_redis_enabled
+import cache_codecs
+import serialization
 
 logger = logging.getLogger("bot")
 
 # Get config values directly to avoid circular import
 REDIS_PREFIX = os.getenv("REDIS_PREFIX", "travistat:")
 REDIS_DEFAULT_TTL_SECONDS = int(os.getenv("REDIS_DEFAULT_TTL_SECONDS", "3600"))
+REDIS_LOCK_TTL_MS = int(os.getenv("REDIS_LOCK_TTL_MS", "30000"))  # regeneration lock lease
+REDIS_LOCK_WAIT_SECONDS = float(os.getenv("REDIS_LOCK_WAIT_SECONDS", "5"))  # wait for another worker's rebuild
+REDIS_STALE_TTL_SECONDS = int(os.getenv("REDIS_STALE_TTL_SECONDS", "1800"))  # serve-stale window after the soft expiry
+REDIS_XFETCH_BETA = float(os.getenv("REDIS_XFETCH_BETA", "1.0"))  # early-refresh eagerness (0 = only after soft expiry)
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))  # in-process tier, 0 = off
+CACHE_L1_TTL_SECONDS = float(os.getenv("CACHE_L1_TTL_SECONDS", "30"))  # bounds staleness across workers
+
+# JSON values are stored behind a small header: magic, soft expiry (unix
+# time), how long the value took to build (seconds, for XFetch) and the
+# cache_codecs id the payload is compressed with. The Redis TTL is the
+# hard expiry: soft expiry + REDIS_STALE_TTL_SECONDS.
+_ENVELOPE = struct.Struct("!4sddB")
+_ENVELOPE_MAGIC = b"\x00SW2"
+# Header without the codec id; the codec is sniffed from the payload.
+# Values written before any header existed are read as never soft-expired.
+_ENVELOPE_V1 = struct.Struct("!4sdd")
+_ENVELOPE_V1_MAGIC = b"\x00SWR"
+
+# In-process tier key suffix for the still-compressed body of a gzip value
+_RAW_SUFFIX = "\x00gz"
+
+# Delete the lock only if it still holds our token: a builder whose lease
+# expired must not release a lock that another worker has since acquired.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# Per-context key namespace (e.g. one per Travian world); empty = no namespace
+_namespace: ContextVar[str] = ContextVar("cache_namespace", default="")
+
+# monotonic() when the rebuild running in this context started, if any
+_rebuild_started: ContextVar[Optional[float]] = ContextVar("cache_rebuild_started", default=None)
+
+
+def set_cache_namespace(namespace: str) -> Token:
+    """
+    Scope every cache key used in the current context to a namespace.
+    
+    Args:
+        namespace: Namespace inserted after REDIS_PREFIX ("" for none)
+        
+    Returns:
+        Token for reset_cache_namespace()
+    """
+    return _namespace.set(namespace)
+
+
+def reset_cache_namespace(token: Token) -> None:
+    """Restore the namespace that was active before set_cache_namespace()."""
+    _namespace.reset(token)
 
 
 def _make_key(key: str) -> str:
     """Create a namespaced cache key."""
+    namespace = _namespace.get()
+    if namespace:
+        return f"{REDIS_PREFIX}{namespace}:{key}"
     return f"{REDIS_PREFIX}{key}"
 
 
+@contextmanager
+def cache_rebuild_timer() -> Iterator[None]:
+    """
+    Time a cache rebuild.
+    
+    JSON values cached inside the block record how long the rebuild took,
+    which scales how early cache_get_*_swr() start refreshing them.
+    """
+    token = _rebuild_started.set(time.monotonic())
+    try:
+        yield
+    finally:
+        _rebuild_started.reset(token)
+
+
+def _seal(payload: bytes, ttl: int, codec: int) -> Tuple[bytes, int]:
+    """Prefix payload with the envelope header; returns (value, hard TTL for Redis)."""
+    started = _rebuild_started.get()
+    delta = time.monotonic() - started if started is not None else 0.0
+    header = _ENVELOPE.pack(_ENVELOPE_MAGIC, time.time() + ttl, delta, codec)
+    return header + payload, ttl + REDIS_STALE_TTL_SECONDS
+
+
+def _unseal(value: bytes) -> Tuple[bytes, float, float, int]:
+    """Split a stored value into (payload, soft expiry, rebuild seconds, codec)."""
+    magic = value[:4]
+    if magic == _ENVELOPE_MAGIC and len(value) >= _ENVELOPE.size:
+        _, soft_expiry, delta, codec = _ENVELOPE.unpack_from(value)
+        return value[_ENVELOPE.size:], soft_expiry, delta, codec
+    soft_expiry, delta = math.inf, 0.0
+    if magic == _ENVELOPE_V1_MAGIC and len(value) >= _ENVELOPE_V1.size:
+        _, soft_expiry, delta = _ENVELOPE_V1.unpack_from(value)
+        value = value[_ENVELOPE_V1.size:]
+    codec = cache_codecs.GZIP if value[:2] == b"\x1f\x8b" else cache_codecs.IDENTITY
+    return value, soft_expiry, delta, codec
+
+
+def _needs_refresh(soft_expiry: float, delta: float, now: Optional[float] = None) -> bool:
+    """
+    Decide whether a cached value should be rebuilt now (XFetch).
+    
+    Always True past the soft expiry. Before it, each read refreshes with a
+    probability that rises as the expiry nears, faster for values that took
+    longer to build (delta) and for a larger REDIS_XFETCH_BETA, so refreshes
+    of a hot key are spread out ahead of the expiry instead of piling up on
+    it: refresh if now - delta * beta * ln(U) >= soft_expiry, U ~ (0, 1].
+    """
+    now = time.time() if now is None else now
+    if now >= soft_expiry:
+        return True
+    if delta <= 0 or REDIS_XFETCH_BETA <= 0:
+        return False
+    return now - delta * REDIS_XFETCH_BETA * math.log(1.0 - random.random()) >= soft_expiry
+
+
+class _L1Cache:
+    """
+    In-process LRU of decoded cache values in front of Redis, bounded by bytes.
+    
+    Sizes are the serialized (uncompressed JSON) lengths of the values, a
+    proxy for the memory they hold. An entry lives at most ttl seconds and
+    never past its soft expiry, so a value another worker rebuilt in Redis
+    reaches this process within ttl. Values larger than a quarter of the
+    budget are not admitted, so one huge payload cannot flush the hot set.
+    Cached values are shared between requests and must not be mutated.
+    """
+    
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # full key -> (value, nbytes, expires_at, soft_expiry, delta, namespace)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float, float, float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._dump_dates: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+    
+    def get(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Return (value, soft_expiry, delta) for a live entry, else None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry[2]:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[3], entry[4]
+    
+    def put(self, key: str, value: Any, nbytes: int, soft_expiry: float = math.inf,
+            delta: float = 0.0, ttl: Optional[float] = None) -> None:
+        """Insert or replace an entry, evicting least recently used ones past max_bytes."""
+        if not self.enabled:
+            return
+        expires_at = min(time.time() + min(ttl or self.ttl, self.ttl), soft_expiry)
+        with self._lock:
+            self._remove(key)
+            if nbytes > self.max_bytes // 4:
+                return
+            self._entries[key] = (value, nbytes, expires_at, soft_expiry, delta, _namespace.get())
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[1]
+                self.evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+    
+    def discard(self, key: str) -> None:
+        """Drop a key's decoded value and its raw body, if any."""
+        with self._lock:
+            self._remove(key)
+            self._remove(key + _RAW_SUFFIX)
+    
+    def discard_matching(self, pattern: str) -> None:
+        """Drop entries whose full key matches a Redis-style glob pattern."""
+        with self._lock:
+            for key in [k for k in self._entries if fnmatchcase(k.replace(_RAW_SUFFIX, ""), pattern)]:
+                self._remove(key)
+    
+    def observe_dump_date(self, dump_date: str) -> None:
+        """Drop the current namespace's entries when its latest dump_date changes."""
+        namespace = _namespace.get()
+        with self._lock:
+            previous = self._dump_dates.get(namespace)
+            self._dump_dates[namespace] = dump_date
+            if previous is None or previous == dump_date:
+                return
+            stale = [k for k, entry in self._entries.items() if entry[5] == namespace]
+            for key in stale:
+                self._remove(key)
+        logger.info(f"L1 cache: dump_date {previous} -> {dump_date}, dropped {len(stale)} entries")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_l1 = _L1Cache(CACHE_L1_MAX_BYTES, CACHE_L1_TTL_SECONDS)
+
+
+def cache_l1_observe_dump_date(dump_date: str) -> None:
+    """
+    Tell the in-process cache tier the current context's latest dump_date.
+    
+    When it differs from the last one seen for the same namespace, every
+    in-process entry of that namespace is dropped.
+    """
+    _l1.observe_dump_date(dump_date)
+
+
+def cache_l1_stats() -> Dict[str, Any]:
+    """Counters of the in-process cache tier for health endpoints."""
+    return _l1.stats()
+
+
+def _l1_put_sealed(full_key: str, value: Any, nbytes: int, sealed: bytes) -> None:
+    """Write a value just stored in Redis through to the in-process tier."""
+    _, soft_expiry, delta, _ = _unseal(sealed[:_ENVELOPE.size])
+    _l1.put(full_key, value, nbytes, soft_expiry, delta)
+
+
+# Read rate per key family, used to pick codecs for writes
+_access = cache_codecs.AccessTracker()
+
+# codec name -> [values written, uncompressed bytes, stored bytes]
+_codec_writes: Dict[str, List[int]] = {}
+_codec_writes_lock = threading.Lock()
+
+
+def _encode(key: str, json_bytes: bytes, gzip_only: bool = False) -> Tuple[bytes, int]:
+    """
+    Compress a serialized value with the codec chosen for its size and key.
+    
+    Args:
+        key: Cache key (its family's read rate makes it hot or not)
+        json_bytes: Serialized value
+        gzip_only: Keep gzip (values served as Content-Encoding: gzip)
+        
+    Returns:
+        (payload, codec id)
+    """
+    hot = _access.is_hot(key)
+    if gzip_only:
+        codec, level = cache_codecs.GZIP, cache_codecs.gzip_level(len(json_bytes), hot)
+    else:
+        codec, level = cache_codecs.choose_codec(len(json_bytes), hot)
+    payload = cache_codecs.compress(json_bytes, codec, level)
+    with _codec_writes_lock:
+        counts = _codec_writes.setdefault(cache_codecs.codec_name(codec), [0, 0, 0])
+        counts[0] += 1
+        counts[1] += len(json_bytes)
+        counts[2] += len(payload)
+    return payload, codec
+
+
+def cache_codec_stats() -> Dict[str, Any]:
+    """Values written per codec and their compression ratio, for health endpoints."""
+    with _codec_writes_lock:
+        written = {
+            name: {
+                "values": values,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "ratio": round(bytes_in / bytes_out, 2) if bytes_out else None,
+            }
+            for name, (values, bytes_in, bytes_out) in _codec_writes.items()
+        }
+    return {"available": cache_codecs.available_codecs(), "written": written}
+
+
+def _get_sealed(key: str, op: str) -> Optional[Tuple[bytes, float, float, int]]:
+    """Fetch and unseal a JSON value; None if missing or Redis is unavailable."""
+    redis = get_redis()
+    if not redis:
+        return None
+    
+    try:
+        value = redis.get(_make_key(key))
+    except Exception as e:
+        logger.warning(f"Redis {op} failed for key {key}: {e}")
+        return None
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.encode('latin-1')
+    return _unseal(value)
+
+
+def _decode(key: str, op: str, payload: bytes, codec: int) -> Optional[Tuple[Any, int]]:
+    """Decompress and parse a payload; returns (value, serialized size) or None."""
+    try:
+        json_bytes = cache_codecs.decompress(payload, codec)
+        return serialization.loads(json_bytes), len(json_bytes)
+    except ValueError as e:
+        logger.warning(f"Redis {op}: invalid JSON for key {key}: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"Redis {op}: cannot decode {cache_codecs.codec_name(codec)} value for key {key}: {e}")
+        return None
+
+
+def _get_decoded(key: str, op: str, stale: bool) -> Tuple[Optional[Any], bool]:
+    """
+    Read a JSON value through the in-process tier, then Redis.
+    
+    Returns (value, refresh) as documented on cache_get_json_swr(); with
+    stale False, values past their soft expiry are misses.
+    """
+    _access.record(key)
+    full_key = _make_key(key)
+    hit = _l1.get(full_key)
+    if hit is not None:
+        value, soft_expiry, delta = hit
+        return value, _needs_refresh(soft_expiry, delta)
+    
+    sealed = _get_sealed(key, op)
+    if sealed is None:
+        return None, False
+    payload, soft_expiry, delta, codec = sealed
+    now = time.time()
+    if now >= soft_expiry and not stale:
+        return None, False
+    decoded = _decode(key, op, payload, codec)
+    if decoded is None:
+        return None, False
+    value, nbytes = decoded
+    if now < soft_expiry:
+        _l1.put(full_key, value, nbytes, soft_expiry, delta)
+    return value, _needs_refresh(soft_expiry, delta, now)
+
+
 def cache_get_str(key: str) -> Optional[str]:
     """
     Get a string value from cache.
@@ -38,12 +397,16 @@ def cache_get_str(key: str) -> Optional[str]:
     
     try:
         full_key = _make_key(key)
+        hit = _l1.get(full_key)
+        if hit is not None:
+            return hit[0]
         value = redis.get(full_key)
         if value is None:
             return None
         # Decode bytes to string
         if isinstance(value, bytes):
-            return value.decode('utf-8')
+            value = value.decode('utf-8')
+        _l1.put(full_key, value, len(value))
         return value
     except Exception as e:
         logger.warning(f"Redis get_str failed for key {key}: {e}")
@@ -70,6 +433,10 @@ def cache_set_str(key: str, value: str, ttl: Optional[int] = None) -> bool:
         full_key = _make_key(key)
         ttl = ttl or REDIS_DEFAULT_TTL_SECONDS
         redis.setex(full_key, ttl, value.encode('utf-8') if isinstance(value, str) else value)
+        if isinstance(value, str):
+            _l1.put(full_key, value, len(value), ttl=ttl)
+        else:
+            _l1.discard(full_key)
         return True
     except Exception as e:
         logger.warning(f"Redis set_str failed for key {key}: {e}")
@@ -80,43 +447,45 @@ def cache_get_json(key: str) -> Optional[Any]:
     """
     Get a JSON-serialized value from cache.
     
+    Only fresh values are returned: past its soft expiry a value counts as
+    a miss here (see cache_get_json_swr() to serve it stale instead).
+    
     Args:
         key: Cache key
         
     Returns:
         Deserialized JSON value (dict/list) or None if not found
     """
-    redis = get_redis()
-    if not redis:
-        return None
+    return _get_decoded(key, "get_json", stale=False)[0]
+
+
+def cache_get_json_swr(key: str) -> Tuple[Optional[Any], bool]:
+    """
+    Get a JSON-serialized value, stale or not, for stale-while-revalidate.
     
-    try:
-        full_key = _make_key(key)
-        value = redis.get(full_key)
-        if value is None:
-            return None
-        
-        # Decode bytes to string
-        if isinstance(value, bytes):
-            value = value.decode('utf-8')
+    Args:
+        key: Cache key
         
-        return json.loads(value)
-    except json.JSONDecodeError as e:
-        logger.warning(f"Redis get_json: invalid JSON for key {key}: {e}")
-        return None
-    except Exception as e:
-        logger.warning(f"Redis get_json failed for key {key}: {e}")
-        return None
+    Returns:
+        (value, refresh): value is None if not found (or past the hard
+        expiry); refresh is True if the caller should rebuild the value in
+        the background while serving this one
+    """
+    return _get_decoded(key, "get_json", stale=True)
 
 
 def cache_set_json(key: str, value: Any, ttl: Optional[int] = None) -> bool:
     """
     Set a JSON-serialized value in cache.
     
+    The value is compressed with the codec cache_codecs.choose_codec()
+    picks for its size and key (stored as-is if small).
+    
     Args:
         key: Cache key
         value: Value to serialize and cache (must be JSON-serializable)
-        ttl: Time-to-live in seconds (defaults to REDIS_DEFAULT_TTL_SECONDS)
+        ttl: Seconds until the soft expiry (defaults to REDIS_DEFAULT_TTL_SECONDS);
+            the value stays readable as stale for REDIS_STALE_TTL_SECONDS more
         
     Returns:
         True if successful, False otherwise
@@ -128,8 +497,11 @@ def cache_set_json(key: str, value: Any, ttl: Optional[int] = None) -> bool:
     try:
         full_key = _make_key(key)
         ttl = ttl or REDIS_DEFAULT_TTL_SECONDS
-        json_str = json.dumps(value)
-        redis.setex(full_key, ttl, json_str.encode('utf-8'))
+        json_bytes = serialization.dumps(value)
+        payload, codec = _encode(key, json_bytes)
+        sealed, hard_ttl = _seal(payload, ttl, codec)
+        redis.setex(full_key, hard_ttl, sealed)
+        _l1_put_sealed(full_key, value, len(json_bytes), sealed)
         return True
     except (TypeError, ValueError) as e:
         logger.warning(f"Redis set_json: failed to serialize value for key {key}: {e}")
@@ -143,32 +515,62 @@ def cache_get_gzip_json(key: str) -> Optional[Any]:
     """
     Get a gzip-compressed JSON value from cache.
     
+    Only fresh values are returned, as with cache_get_json().
+    
     Args:
         key: Cache key
         
     Returns:
         Deserialized JSON value (dict/list) or None if not found
     """
-    redis = get_redis()
-    if not redis:
-        return None
+    return _get_decoded(key, "get_gzip_json", stale=False)[0]
+
+
+def cache_get_gzip_json_swr(key: str) -> Tuple[Optional[Any], bool]:
+    """
+    Get a gzip-compressed JSON value, stale or not (see cache_get_json_swr()).
     
-    try:
-        full_key = _make_key(key)
-        compressed = redis.get(full_key)
-        if compressed is None:
-            return None
+    Args:
+        key: Cache key
         
-        # Decompress
-        if isinstance(compressed, str):
-            compressed = compressed.encode('latin-1')
+    Returns:
+        (value, refresh) as for cache_get_json_swr()
+    """
+    return _get_decoded(key, "get_gzip_json", stale=True)
+
+
+def cache_get_gzip_raw_swr(key: str) -> Tuple[Optional[bytes], bool]:
+    """
+    Get the stored gzip-compressed JSON body of a value, without decoding it.
+    
+    Lets a cache hit be sent to the client as-is (Content-Encoding: gzip)
+    instead of being decompressed, parsed and serialized again. Stale
+    values are returned as with cache_get_json_swr().
+    
+    Args:
+        key: Cache key written by cache_set_gzip_json()
         
-        decompressed = gzip.decompress(compressed)
-        json_str = decompressed.decode('utf-8')
-        return json.loads(json_str)
-    except Exception as e:
-        logger.warning(f"Redis get_gzip_json failed for key {key}: {e}")
-        return None
+    Returns:
+        (body, refresh): body is the gzip-compressed JSON, or None if not found
+    """
+    _access.record(key)
+    raw_key = _make_key(key) + _RAW_SUFFIX
+    hit = _l1.get(raw_key)
+    if hit is not None:
+        body, soft_expiry, delta = hit
+        return body, _needs_refresh(soft_expiry, delta)
+    
+    sealed = _get_sealed(key, "get_gzip_raw")
+    if sealed is None:
+        return None, False
+    body, soft_expiry, delta, codec = sealed
+    if codec != cache_codecs.GZIP:
+        logger.warning(f"Redis get_gzip_raw: value for key {key} is {cache_codecs.codec_name(codec)}, not gzip")
+        return None, False
+    now = time.time()
+    if now < soft_expiry:
+        _l1.put(raw_key, body, len(body), soft_expiry, delta)
+    return body, _needs_refresh(soft_expiry, delta, now)
 
 
 def cache_set_gzip_json(key: str, value: Any, ttl: Optional[int] = None) -> bool:
@@ -180,7 +582,8 @@ def cache_set_gzip_json(key: str, value: Any, ttl: Optional[int] = None) -> bool
     Args:
         key: Cache key
         value: Value to serialize, compress, and cache (must be JSON-serializable)
-        ttl: Time-to-live in seconds (defaults to REDIS_DEFAULT_TTL_SECONDS)
+        ttl: Seconds until the soft expiry (defaults to REDIS_DEFAULT_TTL_SECONDS);
+            the value stays readable as stale for REDIS_STALE_TTL_SECONDS more
         
     Returns:
         True if successful, False otherwise
@@ -194,13 +597,16 @@ def cache_set_gzip_json(key: str, value: Any, ttl: Optional[int] = None) -> bool
         ttl = ttl or REDIS_DEFAULT_TTL_SECONDS
         
         # Serialize to JSON
-        json_str = json.dumps(value)
-        json_bytes = json_str.encode('utf-8')
+        json_bytes = serialization.dumps(value)
         
-        # Compress
-        compressed = gzip.compress(json_bytes, compresslevel=6)
+        # Compress (always gzip, so hits can be sent as Content-Encoding: gzip;
+        # the level follows the payload size and how hot the key is)
+        compressed, codec = _encode(key, json_bytes, gzip_only=True)
         
-        redis.setex(full_key, ttl, compressed)
+        sealed, hard_ttl = _seal(compressed, ttl, codec)
+        redis.setex(full_key, hard_ttl, sealed)
+        _l1_put_sealed(full_key, value, len(json_bytes), sealed)
+        _l1_put_sealed(full_key + _RAW_SUFFIX, compressed, len(compressed), sealed)
         return True
     except (TypeError, ValueError) as e:
         logger.warning(f"Redis set_gzip_json: failed to serialize value for key {key}: {e}")
@@ -226,6 +632,7 @@ def cache_delete(key: str) -> bool:
     
     try:
         full_key = _make_key(key)
+        _l1.discard(full_key)
         redis.delete(full_key)
         return True
     except Exception as e:
@@ -251,6 +658,7 @@ def cache_delete_pattern(pattern: str) -> int:
     
     try:
         full_pattern = _make_key(pattern)
+        _l1.discard_matching(full_pattern)
         count = 0
         # Use SCAN to avoid blocking
         cursor = 0
@@ -265,3 +673,120 @@ def cache_delete_pattern(pattern: str) -> int:
         logger.warning(f"Redis delete_pattern failed for pattern {pattern}: {e}")
         return 0
 
+
+def cache_try_lock(key: str, ttl_ms: Optional[int] = None) -> Optional[str]:
+    """
+    Try to take the regeneration lock for a cache key (SET NX PX).
+    
+    The lock expires after ttl_ms, so a builder that crashes or hangs never
+    blocks the key for longer than its lease.
+    
+    Args:
+        key: Cache key the lock guards
+        ttl_ms: Lease in milliseconds (defaults to REDIS_LOCK_TTL_MS)
+        
+    Returns:
+        Token to pass to cache_release_lock(), or None if the lock is held
+        elsewhere or Redis is unavailable
+    """
+    redis = get_redis()
+    if not redis:
+        return None
+    
+    try:
+        return _acquire_lock(redis, key, ttl_ms)
+    except Exception as e:
+        logger.warning(f"Redis lock failed for key {key}: {e}")
+        return None
+
+
+def _acquire_lock(redis, key: str, ttl_ms: Optional[int]) -> Optional[str]:
+    token = uuid.uuid4().hex
+    if redis.set(_make_key(f"lock:{key}"), token, nx=True, px=ttl_ms or REDIS_LOCK_TTL_MS):
+        return token
+    return None
+
+
+def cache_release_lock(key: str, token: str) -> bool:
+    """
+    Release a lock taken by cache_try_lock(), atomically and only if still ours.
+    
+    Args:
+        key: Cache key the lock guards
+        token: Token returned by cache_try_lock()
+        
+    Returns:
+        True if the lock was released, False if it had expired or is held elsewhere
+    """
+    redis = get_redis()
+    if not redis:
+        return False
+    
+    try:
+        return bool(redis.eval(_RELEASE_LOCK_SCRIPT, 1, _make_key(f"lock:{key}"), token))
+    except Exception as e:
+        logger.warning(f"Redis unlock failed for key {key}: {e}")
+        return False
+
+
+def cache_get_or_lock(key: str, read: Callable[[str], Optional[Any]],
+                      lock_ttl_ms: Optional[int] = None, wait: Optional[float] = None,
+                      poll: float = 0.05,
+                      stale: Optional[Callable[[str], Optional[Any]]] = None) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    Read a cached value, or become the one worker that rebuilds it.
+    
+    On a miss the caller tries to take the key's regeneration lock. If
+    another worker holds it, the caller serves the stale value when one is
+    available, and otherwise polls until the value appears or the lock
+    frees up (builder finished without caching, or its lease expired), up
+    to wait seconds.
+    
+    Args:
+        key: Cache key
+        read: Reader for the key, e.g. cache_get_json or cache_get_gzip_json
+        lock_ttl_ms: Lock lease in milliseconds (defaults to REDIS_LOCK_TTL_MS)
+        wait: Longest time to wait for another worker's rebuild
+            (defaults to REDIS_LOCK_WAIT_SECONDS)
+        poll: Seconds between polls while waiting
+        stale: Optional reader for an outdated copy to serve while another
+            worker rebuilds
+        
+    Returns:
+        (value, None) if a value was found (fresh, built elsewhere, or stale);
+        (None, token) if the caller holds the lock and must build, cache and
+        then cache_release_lock(); (None, None) if Redis is unavailable or
+        the wait timed out, in which case the caller builds without the lock
+    """
+    value = read(key)
+    redis = get_redis()
+    if value is not None or not redis:
+        return value, None
+    
+    deadline = time.monotonic() + (REDIS_LOCK_WAIT_SECONDS if wait is None else wait)
+    served_stale = False
+    while True:
+        try:
+            token = _acquire_lock(redis, key, lock_ttl_ms)
+        except Exception as e:
+            logger.warning(f"Redis lock failed for key {key}: {e}")
+            return None, None
+        if token is not None:
+            # The previous holder may have finished between our read and the lock
+            value = read(key)
+            if value is not None:
+                cache_release_lock(key, token)
+                return value, None
+            return None, token
+        if stale is not None and not served_stale:
+            served_stale = True
+            value = stale(key)
+            if value is not None:
+                return value, None
+        if time.monotonic() >= deadline:
+            logger.warning(f"Timed out waiting for another worker to rebuild {key}")
+            return None, None
+        time.sleep(poll)
+        value = read(key)
+        if value is not None:
+            return value, None
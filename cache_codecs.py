@@ -0,0 +1,228 @@
+"""
+Compression codecs for cached values.
+
+Each stored value records the codec it was written with (see the envelope
+in cache.py), so codecs can be mixed freely in Redis and changed without
+flushing it. choose_codec() picks one per write from the payload size and
+how often that kind of key is read.
+"""
+import gzip
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional: zlib is used instead
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # lz4 is optional: hot keys fall back to zstd or zlib
+    lz4_frame = None
+
+logger = logging.getLogger("bot")
+
+CACHE_CODEC = os.getenv("CACHE_CODEC", "auto").lower()  # "auto" or a codec name to force
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))  # smaller values stay uncompressed
+CACHE_HOT_READS_PER_MINUTE = int(os.getenv("CACHE_HOT_READS_PER_MINUTE", "60"))  # key family counts as hot above this
+CACHE_ZSTD_DICT = os.getenv("CACHE_ZSTD_DICT", "")  # path of a dictionary trained with train_zstd_dictionary()
+
+# Codec ids are stored in Redis: never renumber them
+IDENTITY = 0
+GZIP = 1
+ZLIB = 2
+ZSTD = 3
+ZSTD_DICT = 4
+LZ4 = 5
+
+# Dictionaries pay off on small payloads; large ones build their own context
+ZSTD_DICT_MAX_BYTES = 128 * 1024
+# Above this, gzip trades a little ratio for a much faster rebuild
+LARGE_PAYLOAD_BYTES = 1024 * 1024
+
+
+def _zstd_compressor(level: int, dict_data=None):
+    return zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+
+
+_zstd_dict = None
+if zstandard is not None and CACHE_ZSTD_DICT:
+    try:
+        with open(CACHE_ZSTD_DICT, "rb") as f:
+            _zstd_dict = zstandard.ZstdCompressionDict(f.read())
+        logger.info(f"Loaded zstd dictionary {CACHE_ZSTD_DICT} (id {_zstd_dict.dict_id()})")
+    except (OSError, zstandard.ZstdError) as e:
+        logger.warning(f"Could not load zstd dictionary {CACHE_ZSTD_DICT}: {e}")
+
+
+def _compress_zstd(data: bytes, level: int) -> bytes:
+    return _zstd_compressor(level).compress(data)
+
+
+def _decompress_zstd(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _compress_zstd_dict(data: bytes, level: int) -> bytes:
+    return _zstd_compressor(level, _zstd_dict).compress(data)
+
+
+def _decompress_zstd_dict(data: bytes) -> bytes:
+    if _zstd_dict is None:
+        raise ValueError("value was compressed with a zstd dictionary that is not loaded")
+    return zstandard.ZstdDecompressor(dict_data=_zstd_dict).decompress(data)
+
+
+def _compress_lz4(data: bytes, level: int) -> bytes:
+    return lz4_frame.compress(data, compression_level=level)
+
+
+# id -> (name, compress(data, level), decompress(data), default level)
+_CODECS: Dict[int, Tuple[str, Callable[[bytes, int], bytes], Callable[[bytes], bytes], int]] = {
+    IDENTITY: ("identity", lambda data, level: data, lambda data: data, 0),
+    GZIP: ("gzip", lambda data, level: gzip.compress(data, compresslevel=level), gzip.decompress, 6),
+    ZLIB: ("zlib", lambda data, level: zlib.compress(data, level), zlib.decompress, 6),
+}
+if zstandard is not None:
+    _CODECS[ZSTD] = ("zstd", _compress_zstd, _decompress_zstd, 3)
+    if _zstd_dict is not None:
+        _CODECS[ZSTD_DICT] = ("zstd-dict", _compress_zstd_dict, _decompress_zstd_dict, 3)
+if lz4_frame is not None:
+    _CODECS[LZ4] = ("lz4", _compress_lz4, lz4_frame.decompress, 0)
+
+_BY_NAME = {name: codec_id for codec_id, (name, _, _, _) in _CODECS.items()}
+if CACHE_CODEC != "auto" and CACHE_CODEC not in _BY_NAME:
+    logger.warning(f"CACHE_CODEC={CACHE_CODEC} is not available (have {sorted(_BY_NAME)}), using auto")
+
+
+def codec_name(codec_id: int) -> str:
+    """Name of a codec id, e.g. "zstd"."""
+    codec = _CODECS.get(codec_id)
+    return codec[0] if codec else f"unknown-{codec_id}"
+
+
+def available_codecs() -> List[str]:
+    """Names of the codecs usable in this process."""
+    return [name for name, _, _, _ in _CODECS.values()]
+
+
+def compress(data: bytes, codec_id: int, level: Optional[int] = None) -> bytes:
+    """Compress data with a codec (at its default level unless given)."""
+    _, fn, _, default_level = _CODECS[codec_id]
+    return fn(data, default_level if level is None else level)
+
+
+def decompress(data: bytes, codec_id: int) -> bytes:
+    """
+    Decompress data written with compress().
+
+    Raises:
+        ValueError: If the codec is not available in this process (e.g. a
+            value written by a worker that has zstd installed)
+    """
+    codec = _CODECS.get(codec_id)
+    if codec is None:
+        raise ValueError(f"codec {codec_id} is not available")
+    return codec[2](data)
+
+
+def gzip_level(size: int, hot: bool) -> int:
+    """gzip level for a value that must stay gzip (served as Content-Encoding: gzip)."""
+    if hot:
+        return 9  # written once, sent many times: spend the CPU on the ratio
+    if size >= LARGE_PAYLOAD_BYTES:
+        return 4
+    return 6
+
+
+def choose_codec(size: int, hot: bool) -> Tuple[int, Optional[int]]:
+    """
+    Pick a codec and level for a value of size bytes.
+
+    - tiny values are stored as-is (compression would not pay for itself)
+    - hot key families get LZ4 (fastest to decompress, read most often)
+    - small values get zstd with the trained dictionary when one is loaded
+    - everything else gets zstd, or zlib without zstandard installed
+
+    CACHE_CODEC=<name> forces one codec for every value above the minimum.
+
+    Args:
+        size: Uncompressed payload size in bytes
+        hot: Whether the key's family is read often (see AccessTracker)
+
+    Returns:
+        (codec id, level or None for the codec's default)
+    """
+    if size < CACHE_COMPRESS_MIN_BYTES:
+        return IDENTITY, None
+    if CACHE_CODEC in _BY_NAME:
+        return _BY_NAME[CACHE_CODEC], None
+    if hot and LZ4 in _CODECS:
+        return LZ4, None
+    if size <= ZSTD_DICT_MAX_BYTES and ZSTD_DICT in _CODECS:
+        return ZSTD_DICT, None
+    if ZSTD in _CODECS:
+        return ZSTD, 1 if size >= LARGE_PAYLOAD_BYTES else None
+    return ZLIB, 4 if size >= LARGE_PAYLOAD_BYTES else None
+
+
+def train_zstd_dictionary(samples: Iterable[bytes], dict_size: int = 112 * 1024) -> bytes:
+    """
+    Train a zstd dictionary on representative payloads (e.g. per-player maps).
+
+    Write the result to a file and point CACHE_ZSTD_DICT at it on every
+    worker; values compressed with a dictionary cannot be read without it.
+
+    Raises:
+        RuntimeError: If zstandard is not installed
+    """
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed")
+    return zstandard.train_dictionary(dict_size, list(samples)).as_bytes()
+
+
+class AccessTracker:
+    """
+    Approximate read rate per key family ("regions", "markers", ...).
+
+    Counts reads in fixed windows; a family is hot if the current or the
+    previous window reached the threshold. Counters are updated without a
+    lock and may drop an increment under contention, which is fine for a
+    codec hint.
+    """
+
+    def __init__(self, threshold: int = CACHE_HOT_READS_PER_MINUTE, window: float = 60.0):
+        self.threshold = threshold
+        self.window = window
+        self._started = time.monotonic()
+        self._current: Dict[str, int] = {}
+        self._previous: Dict[str, int] = {}
+        self._rotate_lock = threading.Lock()
+
+    @staticmethod
+    def family(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def _rotate(self, now: float) -> None:
+        with self._rotate_lock:
+            elapsed = now - self._started
+            if elapsed < self.window:
+                return
+            self._previous = self._current if elapsed < 2 * self.window else {}
+            self._current = {}
+            self._started = now
+
+    def record(self, key: str) -> None:
+        now = time.monotonic()
+        if now - self._started >= self.window:
+            self._rotate(now)
+        family = self.family(key)
+        self._current[family] = self._current.get(family, 0) + 1
+
+    def is_hot(self, key: str) -> bool:
+        family = self.family(key)
+        return max(self._current.get(family, 0), self._previous.get(family, 0)) >= self.threshold
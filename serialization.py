@@ -0,0 +1,107 @@
+"""
+JSON serialization for API responses and cached values.
+
+Uses orjson or msgspec when installed (several times faster than the
+standard library on large village lists) and falls back to json otherwise.
+Output is compact UTF-8 JSON with keys in insertion order.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional: msgspec or json is used instead
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec is optional
+    msgspec = None
+
+logger = logging.getLogger("bot")
+
+JSON_BACKEND_PREFERENCE = os.getenv("JSON_BACKEND", "auto").lower()  # "auto", "orjson", "msgspec" or "json"
+
+Default = Optional[Callable[[Any], Any]]
+
+
+def _stdlib_dumps(obj: Any, default: Default = None) -> bytes:
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+if orjson is not None:
+    # Non-str keys are stringified like json does; datetimes go through
+    # default (Flask formats them as HTTP dates, orjson would use ISO 8601)
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _orjson_dumps(obj: Any, default: Default = None) -> bytes:
+        try:
+            return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which json handles
+            return _stdlib_dumps(obj, default)
+
+if msgspec is not None:
+    _msgspec_decoder = msgspec.json.Decoder()
+
+    def _msgspec_dumps(obj: Any, default: Default = None) -> bytes:
+        try:
+            return msgspec.json.encode(obj, enc_hook=default)
+        except (TypeError, OverflowError):
+            return _stdlib_dumps(obj, default)
+
+    def _msgspec_loads(data: Union[bytes, str]) -> Any:
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+_BACKENDS = {"json": (_stdlib_dumps, _stdlib_loads)}
+if msgspec is not None:
+    _BACKENDS["msgspec"] = (_msgspec_dumps, _msgspec_loads)
+if orjson is not None:
+    _BACKENDS["orjson"] = (_orjson_dumps, orjson.loads)
+
+if JSON_BACKEND_PREFERENCE in _BACKENDS:
+    BACKEND = JSON_BACKEND_PREFERENCE
+else:
+    if JSON_BACKEND_PREFERENCE != "auto":
+        logger.warning(f"JSON_BACKEND={JSON_BACKEND_PREFERENCE} is not installed, picking one automatically")
+    BACKEND = next(name for name in ("orjson", "msgspec", "json") if name in _BACKENDS)
+
+_dumps, _loads = _BACKENDS[BACKEND]
+
+
+def dumps(obj: Any, default: Default = None) -> bytes:
+    """
+    Serialize obj to compact UTF-8 JSON.
+
+    Args:
+        obj: JSON-compatible value
+        default: Called for objects the backend cannot serialize natively;
+            returns a serializable replacement or raises TypeError
+
+    Returns:
+        JSON bytes
+
+    Raises:
+        TypeError: If obj contains values that cannot be serialized
+    """
+    return _dumps(obj, default)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Parse JSON bytes or text.
+
+    Raises:
+        ValueError: If data is not valid JSON
+    """
+    return _loads(data)
@@ -0,0 +1,36 @@
+"""Query strings built by backend.supabase_paging for PostgREST."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+postgrest = pytest.importorskip("postgrest")
+
+from backend.supabase_paging import _after_filter, sorted_page  # noqa: E402
+
+
+def _query(count=None):
+    return postgrest.SyncPostgrestClient("http://localhost:3000").rpc("rpc_marker_rows", {})
+
+
+def test_sorted_page_orders_every_column_nulls_last():
+    order = (("population", True), ("village_id", False))
+    query = sorted_page(_query, order, after=None, offset=0, size=100)
+    assert query.request.params["order"] == "population.desc.nullslast,village_id.asc.nullslast"
+    assert query.request.params["limit"] == "100"
+
+
+def test_sorted_page_seeks_after_cursor():
+    order = (("x", False), ("y", False), ("village_id", False))
+    query = sorted_page(_query, order, after=(1, None, 7), offset=0, size=10)
+    assert query.request.params["order"] == "x.asc.nullslast,y.asc.nullslast,village_id.asc.nullslast"
+    assert query.request.params["or"] == "(or(x.gt.1,x.is.null),and(x.eq.1,y.is.null,village_id.gt.7))"
+
+
+def test_after_filter_skips_columns_after_null():
+    order = (("victory_points", True), ("village_id", False))
+    assert _after_filter(order, (None, 7)) == "and(victory_points.is.null,village_id.gt.7)"
+    assert _after_filter(order, (3, 7)) == (
+        "or(victory_points.lt.3,victory_points.is.null),and(victory_points.eq.3,village_id.gt.7)")